@@ -1,3 +1,132 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from library.models import Approach, Category, Exercise, Lesson, LessonGroup, LessonType
+from users.models import User
+
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Session, user, curriculum version, the drill-down row, the group
+# breadcrumb and the child level (or the lessons of a leaf group).  The
+# sidebar summary is cached per curriculum version.
+DASHBOARD_QUERY_BUDGET = 6
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class LessonDashboardQueryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher', password='pw', user_type='teacher')
+        cls.category = Category.objects.create(name=Category.TONAL)
+        cls.approach = Approach.objects.create(category=cls.category, name=Approach.ABSOLUTE)
+        cls.lesson_type = LessonType.objects.create(approach=cls.approach, name='Intervals', slug='intervals')
+        cls.root = LessonGroup.objects.create(lesson_type=cls.lesson_type, name='Octave')
+        cls.exercises = Exercise.objects.bulk_create([Exercise() for _ in range(3)])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.teacher)
+
+    def add_children(self, parent, count):
+        for i in range(count):
+            child = LessonGroup.objects.create(parent=parent, name=f'Group {i}')
+            leaf = LessonGroup.objects.create(parent=child, name=f'Leaf {i}')
+            lesson = Lesson.objects.create(group=leaf, folder_name=f'lesson_{i}')
+            lesson.exercises.set(self.exercises[:i % 3 + 1])
+
+    def get(self, **params):
+        self.client.get('/lessons/', params)  # warm the sidebar summary
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/lessons/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), DASHBOARD_QUERY_BUDGET, [q['sql'] for q in queries])
+        return response
+
+    def test_group_level_within_budget_for_any_number_of_children(self):
+        self.add_children(self.root, 2)
+        self.get(group=self.root.pk)
+        self.add_children(self.root, 25)
+        response = self.get(group=self.root.pk)
+        self.assertEqual(len(response.context['child_items']), 27)
+
+    def test_every_level_within_budget(self):
+        self.add_children(self.root, 5)
+        leaf = LessonGroup.objects.filter(parent__parent=self.root).first()
+        self.get(category=self.category.pk)
+        self.get(approach=self.approach.pk)
+        self.get(lesson_type=self.lesson_type.pk)
+        response = self.get(group=leaf.pk)
+        self.assertEqual(len(response.context['lessons']), 1)
+
+    def test_counts_cover_the_subtree(self):
+        self.add_children(self.root, 4)
+        response = self.get(lesson_type=self.lesson_type.pk)
+        [root] = response.context['child_items']
+        self.assertEqual((root.child_count, root.lesson_count, root.exercise_count), (4, 4, 3))
+
+        response = self.get()
+        [category] = response.context['child_items']
+        self.assertEqual((category.child_count, category.lesson_count, category.exercise_count), (1, 4, 3))
+        self.assertEqual(response.context['total_lessons'], 4)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ConditionalPageTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher', password='pw', user_type='teacher')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.teacher)
+        self.client.cookies['csrftoken'] = 'a' * 32
+
+    def test_not_modified_while_the_csrf_secret_holds(self):
+        first = self.client.get('/lessons/')
+        self.assertContains(first, 'name="csrf-token"')
+        again = self.client.get('/lessons/', headers={'if-none-match': first['ETag']})
+        self.assertEqual(again.status_code, 304)
+
+    def test_rotated_csrf_secret_renders_a_fresh_token(self):
+        first = self.client.get('/lessons/')
+        self.client.cookies['csrftoken'] = 'b' * 32
+        response = self.client.get('/lessons/', headers={'if-none-match': first['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ExerciseDashboardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher', password='pw', user_type='teacher')
+        # Media written without signals: its thumbnail is stale
+        Exercise.objects.create()
+        Exercise.objects.update(svg='svg/scale.svg')
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def test_page_does_not_make_thumbnails(self):
+        with mock.patch('library.thumbnails.make') as make:
+            response = self.client.get('/exercises/')
+        self.assertEqual(response.status_code, 200)
+        make.assert_not_called()
+        self.assertEqual(Exercise.objects.get().thumbnail_source, '')
+
+
+class UrlNameTests(SimpleTestCase):
+
+    def test_api_routes_do_not_shadow_page_names(self):
+        self.assertEqual(reverse('lesson-detail', args=[1]), '/lessons/1/')
+        self.assertEqual(reverse('api-lesson-detail', args=[1]), '/api/lessons/1/')
+        self.assertEqual(reverse('api-lesson-list'), '/api/lessons/')
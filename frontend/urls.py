@@ -24,4 +24,10 @@ urlpatterns = [
     # Lesson routes
     path('lessons/', views.LessonViewSet.as_view({'get': 'lesson_dashboard'}), name='lesson-dashboard'),
     path('lessons/<int:pk>/', views.LessonViewSet.as_view({'get': 'lesson_detail'}), name='lesson-detail'),
+    path('lessons/<int:pk>/download/', views.LessonViewSet.as_view({'get': 'lesson_download'}), name='lesson-download'),
+    path('lessons/groups/<int:pk>/download/', views.LessonViewSet.as_view({'get': 'group_download'}), name='lesson-group-download'),
+    path('lessons/types/<int:pk>/download/', views.LessonViewSet.as_view({'get': 'lesson_type_download'}), name='lesson-type-download'),
+
+    # Progress routes (teacher analytics)
+    path('progress/', views.ProgressViewSet.as_view({'get': 'overview'}), name='progress-overview'),
 ]
\ No newline at end of file
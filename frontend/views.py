@@ -1,15 +1,37 @@
 # frontend/views.py
+from datetime import timedelta
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.expressions import RawSQL
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.utils.text import slugify
 from rest_framework import viewsets
 from users import permissions
 from rest_framework.decorators import action
-from users.models import User, Instrument, UserInstrument
+from users import counters as site_counters
+from users.models import User, Instrument, SiteCounter, UserInstrument
 from .forms import CustomUserCreationForm, LoginForm, UserInstrumentForm, ExerciseForm
 from library.models import Exercise, Lesson, Category, Approach, LessonType, LessonGroup
+from library.pagination import ExercisePagination
 from library.serializers import ExerciseSerializer
+from library import search as lesson_search
+from library.archive import curriculum_archive
+from library import versioning
+from library.versioning import conditional
+from practice import rollups
+from practice.models import ProgressRollup
+
+
+# Lesson dashboard search shows this many matches, in rank order
+DASHBOARD_SEARCH_LIMIT = 60
 
 
 def home(request):
@@ -22,14 +44,13 @@ def landing_page(request):
     if request.user.is_authenticated:
         return redirect('dashboard')
 
-    instruments_count = Instrument.objects.count()
-    teachers_count = User.objects.filter(user_type='teacher').count()
-    students_count = User.objects.filter(user_type='student').count()
+    # Denormalised totals, cached (users/counters.py)
+    counts = site_counters.get_counts()
 
     context = {
-        'instruments_count': instruments_count,
-        'teachers_count': teachers_count,
-        'students_count': students_count,
+        'instruments_count': counts[SiteCounter.INSTRUMENTS],
+        'teachers_count': counts[SiteCounter.TEACHERS],
+        'students_count': counts[SiteCounter.STUDENTS],
     }
     return render(request, 'frontend/landing_page.html', context)
 
@@ -135,6 +156,28 @@ def add_instrument_view(request):
 # Exercise ViewSet
 # ---------------------------------------------------------------------------
 
+EXERCISE_CATEGORIES = dict(Exercise._meta.get_field('category').choices)
+
+
+class ExerciseDashboardPagination(ExercisePagination):
+    page_size = 24
+    max_page_size = 96
+
+
+def _exercise_counts(version):
+    """Exercise totals per category, cached per curriculum version."""
+    key = f'exercise-dashboard-counts:{version}'
+    counts = cache.get(key)
+    if counts is None:
+        per_category = dict(
+            Exercise.objects.order_by().values_list('category').annotate(n=Count('pk'))
+        )
+        counts = {name: per_category.get(name, 0) for name in EXERCISE_CATEGORIES}
+        counts['total'] = sum(per_category.values())
+        cache.set(key, counts, settings.RESPONSE_CACHE_TIMEOUT)
+    return counts
+
+
 class ExerciseViewSet(viewsets.ModelViewSet):
     """ViewSet for viewing and editing Exercise instances."""
 
@@ -145,26 +188,41 @@ class ExerciseViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         queryset = super().get_queryset()
 
-        context = self.request.query_params.get('context')
-        if context:
-            queryset = queryset.filter(context=context)
-
+        # Unknown values are ignored rather than matching nothing
         category = self.request.query_params.get('category')
-        if category:
+        if category in EXERCISE_CATEGORIES:
             queryset = queryset.filter(category=category)
 
         polyphonic = self.request.query_params.get('polyphonic')
-        if polyphonic:
-            queryset = queryset.filter(polyphonic=polyphonic)
+        if polyphonic in ('0', '1'):
+            queryset = queryset.filter(polyphonic=polyphonic == '1')
 
         return queryset
 
     @action(detail=False, methods=['get'])
+    @method_decorator(conditional)
     def dashboard(self, request):
+        """
+        Exercise browser, one keyset page at a time (newest first):
+            ?category=pitch|rhythm   – filter by category
+            ?polyphonic=0|1          – mono or polyphonic exercises only
+            ?cursor=<token>          – page links; ?page_size= up to 96
+        Cards show small thumbnails (library/thumbnails.py), made when an
+        exercise is saved or by the make_thumbnails command — never here.
+        """
+        paginator = ExerciseDashboardPagination()
+        exercises = paginator.paginate_queryset(self.get_queryset(), request, view=self)
+
+        counts = _exercise_counts(versioning.for_request(request).version)
         context = {
-            'exercises': self.get_queryset(),
-            'pitch_exercises': Exercise.objects.filter(category='pitch').count(),
-            'rhythm_exercises': Exercise.objects.filter(category='rhythm').count(),
+            'exercises':        exercises,
+            'next_url':         paginator.get_next_link(),
+            'previous_url':     paginator.get_previous_link(),
+            'category':         request.query_params.get('category', ''),
+            'polyphonic':       request.query_params.get('polyphonic', ''),
+            'total_exercises':  counts['total'],
+            'pitch_exercises':  counts['pitch'],
+            'rhythm_exercises': counts['rhythm'],
         }
         return render(request, 'exercises/dashboard.html', context)
 
@@ -233,6 +291,7 @@ class LessonViewSet(viewsets.ViewSet):
     permission_classes = [permissions.IsTeacherOrAdmin]
 
     @action(detail=False, methods=['get'])
+    @method_decorator(conditional)
     def lesson_dashboard(self, request):
         """
         Hierarchical lesson browser. Drills down via query params:
@@ -240,7 +299,9 @@ class LessonViewSet(viewsets.ViewSet):
             ?approach=<id>       – enter an Approach
             ?lesson_type=<id>    – enter a LessonType
             ?group=<id>          – enter a LessonGroup node
-            ?search=<term>       – full-text search across lesson titles
+            ?search=<term>       – full-text search (see library/search.py); with a
+                                   search, ?category, ?approach, ?lesson_type, ?key
+                                   and ?mode narrow the results as facets instead
         """
         active_category    = None
         active_approach    = None
@@ -253,68 +314,85 @@ class LessonViewSet(viewsets.ViewSet):
         grp_id = request.query_params.get('group')
         search = request.query_params.get('search', '').strip()
 
-        if cat_id:
-            active_category = get_object_or_404(Category, pk=cat_id)
-        if app_id:
-            active_approach = get_object_or_404(Approach, pk=app_id)
-        if lt_id:
-            active_lesson_type = get_object_or_404(LessonType, pk=lt_id)
-        if grp_id:
-            active_group = get_object_or_404(LessonGroup, pk=grp_id)
+        if search:
+            try:
+                selected_facets = lesson_search.parse_facets(request.query_params)
+            except ValueError:
+                selected_facets = {}
+        else:
+            if cat_id:
+                active_category = get_object_or_404(Category, pk=cat_id)
+            if app_id:
+                active_approach = get_object_or_404(Approach, pk=app_id)
+            if lt_id:
+                active_lesson_type = get_object_or_404(LessonType, pk=lt_id)
+            if grp_id:
+                # Its child count decides between subfolders and lessons
+                active_group = get_object_or_404(_with_counts(LessonGroup.objects.all(), 'group'), pk=grp_id)
+
+        # Sidebar categories and totals, cached per curriculum version
+        summary = _dashboard_summary(versioning.for_request(request).version)
 
         # Determine what to display at the current drill-down level
         child_items = None
         child_type  = None   # 'category' | 'approach' | 'lesson_type' | 'group'
         lessons     = None
 
+        search_total  = 0
+        search_facets = []
         if search:
-            lessons = (
+            # Ranked full-text match; hits carry the highlighted title and path
+            results = lesson_search.search(search, limit=DASHBOARD_SEARCH_LIMIT, facets=selected_facets)
+            search_total  = results.total
+            search_facets = _search_facets(request.query_params, results.facets)
+            found = (
                 Lesson.objects
-                .filter(title__icontains=search)
-                .select_related(
-                    'group',
-                    'group__lesson_type',
-                    'group__lesson_type__approach',
-                    'group__lesson_type__approach__category',
-                    'group__key',
-                )
-                .prefetch_related('exercises')
-                .order_by('order', 'folder_name')
+                .select_related('group', 'group__key')
+                .annotate(exercise_count=Count('exercises'))
+                .in_bulk([hit.lesson_id for hit in results.hits])
             )
+            lessons = []
+            for hit in results.hits:
+                lesson = found.get(hit.lesson_id)
+                if lesson is not None:
+                    lesson.search_hit = hit
+                    lessons.append(lesson)
 
         elif active_group:
-            child_groups = LessonGroup.objects.filter(parent=active_group).order_by('order', 'name')
-            if child_groups.exists():
-                child_items = child_groups
+            if active_group.child_count:
+                child_items = _with_counts(
+                    LessonGroup.objects.filter(parent=active_group).order_by('order', 'name'), 'group'
+                )
                 child_type  = 'group'
             else:
                 lessons = (
                     Lesson.objects
                     .filter(group=active_group)
-                    .prefetch_related('exercises')
+                    .select_related('group__key')
+                    .annotate(exercise_count=Count('exercises'))
                     .order_by('order', 'folder_name')
                 )
 
         elif active_lesson_type:
-            child_items = LessonGroup.objects.filter(
+            child_items = _with_counts(LessonGroup.objects.filter(
                 lesson_type=active_lesson_type, parent=None
-            ).order_by('order', 'name')
+            ).order_by('order', 'name'), 'group')
             child_type = 'group'
 
         elif active_approach:
-            child_items = LessonType.objects.filter(
+            child_items = _with_counts(LessonType.objects.filter(
                 approach=active_approach
-            ).order_by('order', 'name')
+            ).order_by('order', 'name'), 'lesson_type')
             child_type = 'lesson_type'
 
         elif active_category:
-            child_items = Approach.objects.filter(
+            child_items = _with_counts(Approach.objects.filter(
                 category=active_category
-            ).order_by('name')
+            ).order_by('name'), 'approach')
             child_type = 'approach'
 
         else:
-            child_items = Category.objects.all().order_by('name')
+            child_items = summary['categories']
             child_type  = 'category'
 
         # Breadcrumb for the current drill-down path
@@ -322,16 +400,6 @@ class LessonViewSet(viewsets.ViewSet):
             active_category, active_approach, active_lesson_type, active_group
         )
 
-        # Stats
-        total_lessons   = Lesson.objects.count()
-        total_exercises = Exercise.objects.count()
-        category_counts = {
-            c.pk: Lesson.objects.filter(
-                group__lesson_type__approach__category=c
-            ).count()
-            for c in Category.objects.all()
-        }
-
         context = {
             'active_category':    active_category,
             'active_approach':    active_approach,
@@ -341,15 +409,17 @@ class LessonViewSet(viewsets.ViewSet):
             'child_type':         child_type,
             'lessons':            lessons,
             'search':             search,
+            'search_total':       search_total,
+            'search_facets':      search_facets,
             'breadcrumb':         breadcrumb,
-            'all_categories':     Category.objects.all().order_by('name'),
-            'total_lessons':      total_lessons,
-            'total_exercises':    total_exercises,
-            'category_counts':    category_counts,
+            'all_categories':     summary['categories'],
+            'total_lessons':      summary['total_lessons'],
+            'total_exercises':    summary['total_exercises'],
         }
         return render(request, 'lessons/dashboard.html', context)
 
     @action(detail=True, methods=['get'])
+    @method_decorator(conditional)
     def lesson_detail(self, request, pk=None):
         """Detail view for a single Lesson and its exercises."""
         lesson = get_object_or_404(
@@ -388,35 +458,272 @@ class LessonViewSet(viewsets.ViewSet):
         }
         return render(request, 'lessons/detail.html', context)
 
+    @action(detail=True, methods=['get'])
+    def lesson_download(self, request, pk=None):
+        """Stream a ZIP of every MIDI/SVG file in a Lesson."""
+        lesson = get_object_or_404(Lesson.objects.select_related('group'), pk=pk)
+        return _zip_response(lesson, lesson.title or lesson.folder_name)
+
+    @action(detail=True, methods=['get'])
+    def group_download(self, request, pk=None):
+        """Stream a ZIP of every MIDI/SVG file below a LessonGroup."""
+        group = get_object_or_404(LessonGroup, pk=pk)
+        return _zip_response(group, group.name)
+
+    @action(detail=True, methods=['get'])
+    def lesson_type_download(self, request, pk=None):
+        """Stream a ZIP of every MIDI/SVG file below a LessonType."""
+        lesson_type = get_object_or_404(
+            LessonType.objects.select_related('approach', 'approach__category'), pk=pk
+        )
+        return _zip_response(lesson_type, lesson_type.name)
+
+
+# ---------------------------------------------------------------------------
+# Progress ViewSet (teacher analytics)
+# ---------------------------------------------------------------------------
+
+class ProgressViewSet(viewsets.ViewSet):
+    """
+    Class progress across the curriculum tree, read from the materialised
+    ProgressRollup table (see practice/rollups.py) rather than raw attempts.
+    """
+
+    permission_classes = [permissions.IsTeacherOrAdmin]
+
+    PERIODS = [7, 30, 90, 365]
+
+    @action(detail=False, methods=['get'])
+    def overview(self, request):
+        """
+        Per-node and per-student progress. Drills down like lesson_dashboard:
+            ?category=<id> | ?approach=<id> | ?lesson_type=<id> | ?group=<id>
+            ?days=<n>            – look-back window (7, 30, 90 or 365; default 30)
+        """
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            days = 30
+        if days not in self.PERIODS:
+            days = 30
+        since = timezone.localdate() - timedelta(days=days - 1)
+
+        active_category    = None
+        active_approach    = None
+        active_lesson_type = None
+        active_group       = None
+
+        cat_id = request.query_params.get('category')
+        app_id = request.query_params.get('approach')
+        lt_id  = request.query_params.get('lesson_type')
+        grp_id = request.query_params.get('group')
+
+        if grp_id:
+            active_group = get_object_or_404(LessonGroup, pk=grp_id)
+            node_type, node_ids = ProgressRollup.GROUP, [active_group.pk]
+            children = list(LessonGroup.objects.filter(parent=active_group).order_by('order', 'name'))
+            child_type = 'group'
+            if not children:
+                children = list(Lesson.objects.filter(group=active_group).order_by('order', 'folder_name'))
+                child_type = 'lesson'
+        elif lt_id:
+            active_lesson_type = get_object_or_404(LessonType, pk=lt_id)
+            node_type, node_ids = ProgressRollup.LESSON_TYPE, [active_lesson_type.pk]
+            children = list(LessonGroup.objects.filter(
+                lesson_type=active_lesson_type, parent=None
+            ).order_by('order', 'name'))
+            child_type = 'group'
+        elif app_id:
+            active_approach = get_object_or_404(Approach, pk=app_id)
+            node_type, node_ids = ProgressRollup.APPROACH, [active_approach.pk]
+            children = list(LessonType.objects.filter(approach=active_approach).order_by('order', 'name'))
+            child_type = 'lesson_type'
+        elif cat_id:
+            active_category = get_object_or_404(Category, pk=cat_id)
+            node_type, node_ids = ProgressRollup.CATEGORY, [active_category.pk]
+            children = list(Approach.objects.filter(category=active_category).order_by('name'))
+            child_type = 'approach'
+        else:
+            # Every attempt is counted under exactly one category, so the
+            # categories together give each student's overall totals
+            children = list(Category.objects.all().order_by('name'))
+            node_type, node_ids = ProgressRollup.CATEGORY, [c.pk for c in children]
+            child_type = 'category'
+
+        child_totals = rollups.node_totals(child_type, [c.pk for c in children], since)
+        context = {
+            'active_category':    active_category,
+            'active_approach':    active_approach,
+            'active_lesson_type': active_lesson_type,
+            'active_group':       active_group,
+            'child_type':         child_type,
+            'child_rows':         [(child, child_totals.get(child.pk)) for child in children],
+            'students':           rollups.student_totals(node_type, node_ids, since),
+            'days':               days,
+            'periods':            self.PERIODS,
+            'since':              since,
+            'breadcrumb':         _build_dashboard_breadcrumb(
+                active_category, active_approach, active_lesson_type, active_group,
+                root_label='Progress', base='/progress/',
+            ),
+        }
+        return render(request, 'progress/overview.html', context)
+
+
+def _zip_response(node, name):
+    """Wrap the streamed archive for ``node`` in a download response."""
+    response = StreamingHttpResponse(curriculum_archive(node), content_type='application/zip')
+    filename = f"{slugify(name) or 'lessons'}.zip"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+# ---------------------------------------------------------------------------
+# Search facet helpers
+# ---------------------------------------------------------------------------
+
+FACET_LABELS = {
+    'category':    'Category',
+    'approach':    'Approach',
+    'lesson_type': 'Lesson type',
+    'key':         'Key',
+    'mode':        'Mode',
+}
+
+
+def _search_facets(params, facets):
+    """``[(label, options)]`` for the dashboard, each option linking to its toggle."""
+    groups = []
+    for name, options in facets.items():
+        if not options:
+            continue
+        for option in options:
+            query = params.copy()
+            if option['selected']:
+                query.pop(name, None)
+            else:
+                query[name] = option['value']
+            option['url'] = '?' + query.urlencode()
+        groups.append((FACET_LABELS[name], options))
+    return groups
+
+
+# ---------------------------------------------------------------------------
+# Drill-down counts
+# ---------------------------------------------------------------------------
+
+# Per level: (direct children of a row, root groups of a row's subtree),
+# correlated on the level's table.  Lesson and exercise counts cover the
+# whole subtree, whatever its depth.
+_DRILL_DOWN_SQL = {
+    'category': (
+        'SELECT COUNT(*) FROM library_approach a WHERE a.category_id = library_category.id',
+        """SELECT g.id FROM library_lessongroup g
+           JOIN library_lessontype lt ON lt.id = g.lesson_type_id
+           JOIN library_approach a ON a.id = lt.approach_id
+           WHERE a.category_id = library_category.id""",
+    ),
+    'approach': (
+        'SELECT COUNT(*) FROM library_lessontype lt WHERE lt.approach_id = library_approach.id',
+        """SELECT g.id FROM library_lessongroup g
+           JOIN library_lessontype lt ON lt.id = g.lesson_type_id
+           WHERE lt.approach_id = library_approach.id""",
+    ),
+    'lesson_type': (
+        'SELECT COUNT(*) FROM library_lessongroup g WHERE g.lesson_type_id = library_lessontype.id',
+        'SELECT g.id FROM library_lessongroup g WHERE g.lesson_type_id = library_lessontype.id',
+    ),
+    'group': (
+        'SELECT COUNT(*) FROM library_lessongroup g WHERE g.parent_id = library_lessongroup.id',
+        'SELECT library_lessongroup.id',
+    ),
+}
+
+_SUBTREE_LESSONS_SQL = """
+    WITH RECURSIVE sub(id) AS (
+        {roots}
+        UNION ALL
+        SELECT c.id FROM library_lessongroup c JOIN sub ON c.parent_id = sub.id
+    )
+    SELECT {count} FROM library_lesson l {join}
+    WHERE l.group_id IN (SELECT id FROM sub)
+"""
+
+
+def _with_counts(queryset, level):
+    """
+    ``queryset`` annotated with ``child_count``, ``lesson_count`` and
+    ``exercise_count`` — correlated subqueries, so the level is still one
+    query however many rows it has.
+    """
+    children, roots = _DRILL_DOWN_SQL[level]
+    lessons = _SUBTREE_LESSONS_SQL.format(roots=roots, count='COUNT(*)', join='')
+    exercises = _SUBTREE_LESSONS_SQL.format(
+        roots=roots,
+        count='COUNT(DISTINCT le.exercise_id)',
+        join='JOIN library_lesson_exercises le ON le.lesson_id = l.id',
+    )
+    return queryset.annotate(
+        child_count=RawSQL(children, ()),
+        lesson_count=RawSQL(lessons, ()),
+        exercise_count=RawSQL(exercises, ()),
+    )
+
+
+def _dashboard_summary(version):
+    """Categories with their counts plus the page totals, cached per curriculum version."""
+    key = f'lesson-dashboard-summary:{version}'
+    summary = cache.get(key)
+    if summary is None:
+        summary = {
+            'categories':      list(_with_counts(Category.objects.order_by('name'), 'category')),
+            'total_lessons':   Lesson.objects.count(),
+            'total_exercises': Exercise.objects.count(),
+        }
+        cache.set(key, summary, settings.RESPONSE_CACHE_TIMEOUT)
+    return summary
+
 
 # ---------------------------------------------------------------------------
 # Breadcrumb helpers
 # ---------------------------------------------------------------------------
 
-def _build_dashboard_breadcrumb(category, approach, lesson_type, group):
+def _build_dashboard_breadcrumb(category, approach, lesson_type, group,
+                               root_label='Lessons', base='/lessons/'):
     """Ordered (label, url) list for the dashboard drill-down."""
-    crumbs = [('Lessons', '/lessons/')]
+    crumbs = [(root_label, base)]
 
     if category:
-        crumbs.append((str(category), f'/lessons/?category={category.pk}'))
+        crumbs.append((str(category), f'{base}?category={category.pk}'))
     if approach:
-        crumbs.append((approach.get_name_display(), f'/lessons/?approach={approach.pk}'))
+        crumbs.append((approach.get_name_display(), f'{base}?approach={approach.pk}'))
     if lesson_type:
-        crumbs.append((lesson_type.name, f'/lessons/?lesson_type={lesson_type.pk}'))
+        crumbs.append((lesson_type.name, f'{base}?lesson_type={lesson_type.pk}'))
     if group:
-        # Walk up to collect ancestor groups
-        chain = []
-        node = group
-        while node is not None:
-            chain.append(node)
-            node = node.parent
-        chain.reverse()
-        for grp in chain:
-            crumbs.append((grp.name, f'/lessons/?group={grp.pk}'))
+        for grp in _group_ancestry(group):
+            crumbs.append((grp.name, f'{base}?group={grp.pk}'))
 
     return crumbs
 
 
+def _group_ancestry(group):
+    """``group`` and every group above it, root first, in one query."""
+    return list(LessonGroup.objects.raw(
+        """
+        WITH RECURSIVE up(id, depth) AS (
+            SELECT %s, 0
+            UNION ALL
+            SELECT g.parent_id, up.depth + 1
+            FROM library_lessongroup g JOIN up ON g.id = up.id
+            WHERE g.parent_id IS NOT NULL
+        )
+        SELECT g.id, g.name, g.parent_id FROM up JOIN library_lessongroup g ON g.id = up.id
+        ORDER BY up.depth DESC
+        """,
+        [group.pk],
+    ))
+
+
 def _build_lesson_breadcrumb(lesson):
     """Ordered (label, url) list from Category down to the Lesson."""
     crumbs = [('Lessons', '/lessons/')]
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Category, Approach, LessonType, Key, LessonGroup, Lesson, Exercise
+from .models import (
+    Category, Approach, LessonType, Key, LessonGroup, Lesson, Exercise,
+    DictationRule, DictationExercise,
+)
 
 
 @admin.register(Exercise)
@@ -52,4 +55,31 @@ class LessonAdmin(admin.ModelAdmin):
     search_fields = ["title", "folder_name"]
     raw_id_fields = ["group"]
     filter_horizontal = ["exercises"]
-    readonly_fields = ["created", "modified"]
\ No newline at end of file
+    readonly_fields = ["created", "modified"]
+
+
+@admin.register(DictationRule)
+class DictationRuleAdmin(admin.ModelAdmin):
+    list_display = ["name", "kind", "lesson_type", "key", "meter", "measures", "pool_size"]
+    list_filter = ["kind", "lesson_type__approach__category", "key__mode"]
+    search_fields = ["name"]
+    raw_id_fields = ["lesson_type", "key"]
+    readonly_fields = ["created", "modified"]
+    actions = ["regenerate_pool"]
+
+    # Fields the generated notes depend on
+    GENERATION_FIELDS = {"kind", "key", "meter", "measures", "note_values", "scale_degrees", "intervals", "seed"}
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Generating a pool can take a while, so it is left to the
+        # generate_dictations cron job; a stale pool is discarded now
+        if change and not self.GENERATION_FIELDS.intersection(form.changed_data):
+            return
+        obj.pool.all().delete()
+        self.message_user(request, "The exercise pool is generated within a few minutes.")
+
+    @admin.action(description="Regenerate pool")
+    def regenerate_pool(self, request, queryset):
+        deleted, _ = DictationExercise.objects.filter(rule__in=queryset).delete()
+        self.message_user(request, f"Discarded {deleted} dictation exercises; new ones are generated within a few minutes.")
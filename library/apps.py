@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class LibraryConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "library"
+
+    def ready(self):
+        # Connects the signals that bump the curriculum version, keep the
+        # full-text search index in step and make exercise thumbnails
+        from . import search, thumbnails, versioning  # noqa: F401
@@ -0,0 +1,210 @@
+"""
+Streaming ZIP export of curriculum subtrees.
+
+A Lesson, LessonGroup or LessonType is turned into a ZIP archive whose folder
+layout mirrors the original midi_lessons tree:
+
+    <Category>/<Approach>/<LessonType>/[group …]/<lesson_folder>/<file>
+
+The archive is never materialised.  Each exercise file is read from storage
+in fixed-size chunks and pushed through ``zipfile`` into a tiny non-seekable
+sink that is drained after every chunk, so memory use stays constant no
+matter how large the export is.  Because the sink cannot seek, ``zipfile``
+writes sizes and CRCs in data descriptors after each entry.
+"""
+
+import os
+import zipfile
+
+from django.utils import timezone
+
+from .models import LessonType, LessonGroup, Lesson
+
+
+CHUNK_SIZE = 64 * 1024
+
+# Keep id lists well below SQLite's bound-parameter limit
+BATCH_SIZE = 500
+
+
+# ---------------------------------------------------------------------------
+# ZIP writer
+# ---------------------------------------------------------------------------
+
+class _ZipSink:
+    """Write-only, non-seekable file object that hands back what was written."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries, chunk_size: int = CHUNK_SIZE):
+    """
+    Yield the bytes of a ZIP archive built from ``entries``.
+
+    ``entries`` is an iterable of ``(arcname, field_file, modified)`` tuples.
+    Files missing from storage are skipped, as are repeated arcnames.
+    """
+    sink = _ZipSink()
+    seen = set()
+
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for arcname, field_file, modified in entries:
+            if arcname in seen:
+                continue
+            storage = field_file.storage
+            if not storage.exists(field_file.name):
+                continue
+            seen.add(arcname)
+
+            info = zipfile.ZipInfo(
+                arcname, date_time=timezone.localtime(modified).timetuple()[:6]
+            )
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.file_size = storage.size(field_file.name)
+
+            with storage.open(field_file.name, "rb") as src, zf.open(info, "w") as dst:
+                while True:
+                    chunk = src.read(chunk_size)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            yield sink.drain()
+
+    # Central directory
+    yield sink.drain()
+
+
+# ---------------------------------------------------------------------------
+# Curriculum → archive entries
+# ---------------------------------------------------------------------------
+
+def _batched(seq, size=BATCH_SIZE):
+    for start in range(0, len(seq), size):
+        yield seq[start:start + size]
+
+
+def _group_segment(group) -> str:
+    return group.folder_name or group.name
+
+
+def _lesson_type_path(lesson_type) -> tuple:
+    """Archive path segments for a LessonType (Category / Approach / LessonType)."""
+    approach = lesson_type.approach
+    category = approach.category
+    return (
+        category.label or category.get_name_display(),
+        approach.get_name_display(),
+        lesson_type.name,
+    )
+
+
+def _group_path(group) -> tuple:
+    """Archive path segments from the Category down to ``group`` (inclusive)."""
+    chain = []
+    node = group
+    while node is not None:
+        chain.append(node)
+        node = node.parent
+    chain.reverse()
+
+    root = chain[0]
+    base = _lesson_type_path(root.lesson_type) if root.lesson_type_id else ()
+    return base + tuple(_group_segment(g) for g in chain)
+
+
+def _subtree_group_paths(roots, base: tuple) -> dict:
+    """
+    Map every group id in the subtrees rooted at ``roots`` to its path.
+
+    Walks the tree one level at a time, so the query count is bounded by
+    the tree depth rather than the number of groups.
+    """
+    paths = {}
+    frontier = []
+    for group in roots:
+        paths[group.pk] = base + (_group_segment(group),)
+        frontier.append(group.pk)
+
+    while frontier:
+        next_frontier = []
+        for batch in _batched(frontier):
+            children = (
+                LessonGroup.objects
+                .filter(parent_id__in=batch)
+                .only("id", "parent_id", "name", "folder_name")
+                .order_by("order", "name")
+            )
+            for child in children:
+                paths[child.pk] = paths[child.parent_id] + (_group_segment(child),)
+                next_frontier.append(child.pk)
+        frontier = next_frontier
+
+    return paths
+
+
+def _lesson_entries(lesson, group_path: tuple):
+    # import_lessons creates a leaf group named after the lesson folder; don't
+    # repeat that folder in the archive path.
+    if group_path and group_path[-1] == lesson.folder_name:
+        lesson_path = group_path
+    else:
+        lesson_path = group_path + (lesson.folder_name,)
+
+    for exercise in lesson.exercises.all():
+        for field_file in (exercise.midi, exercise.svg):
+            if field_file:
+                arcname = "/".join(lesson_path + (os.path.basename(field_file.name),))
+                yield arcname, field_file, exercise.modified
+
+
+def _entries_for_groups(group_paths: dict):
+    group_ids = list(group_paths)
+    for batch in _batched(group_ids):
+        lessons = (
+            Lesson.objects
+            .filter(group_id__in=batch)
+            .prefetch_related("exercises")
+            .order_by("group_id", "order", "folder_name")
+        )
+        for lesson in lessons.iterator(chunk_size=BATCH_SIZE):
+            yield from _lesson_entries(lesson, group_paths[lesson.group_id])
+
+
+def curriculum_entries(node):
+    """
+    Yield ``(arcname, field_file, modified)`` for every MIDI/SVG file under
+    ``node``, which may be a Lesson, LessonGroup or LessonType.
+    """
+    if isinstance(node, Lesson):
+        yield from _lesson_entries(node, _group_path(node.group))
+    elif isinstance(node, LessonGroup):
+        base = _group_path(node)[:-1]
+        yield from _entries_for_groups(_subtree_group_paths([node], base))
+    elif isinstance(node, LessonType):
+        roots = node.root_groups.filter(parent=None).order_by("order", "name")
+        yield from _entries_for_groups(
+            _subtree_group_paths(roots, _lesson_type_path(node))
+        )
+    else:
+        raise TypeError(f"Cannot archive {type(node).__name__} instances.")
+
+
+def curriculum_archive(node, chunk_size: int = CHUNK_SIZE):
+    """Stream a ZIP of every exercise file under a Lesson, LessonGroup or LessonType."""
+    return stream_zip(curriculum_entries(node), chunk_size=chunk_size)
@@ -0,0 +1,153 @@
+"""
+Prefix autocomplete over curriculum names.
+
+Each worker keeps a sorted prefix index of every lesson title (or folder
+name), group name, lesson type and key.  A label is entered once per word
+it contains, so "Absolute formula inverse" completes "abs", "form" and
+"inv"; names are case- and accent-folded and split on punctuation the same
+way as the full-text index (library/search.py), so "af-8" completes
+"1_AF-8_1_dio".
+
+Entries are packed ints (label index << 8 | start offset) in an array kept
+in order of the suffix they point at, so a 100k-lesson curriculum costs a
+few megabytes and a lookup is a bisect plus a short forward scan — no
+database access.
+
+The index is rebuilt when the curriculum version (library/versioning.py)
+changes.  Reading the version is a query of its own, so a worker checks it
+at most once every RECHECK_SECONDS; completions may lag an edit by that
+long, plus the rebuild itself (about a second for 100k lessons).
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from array import array
+
+from . import versioning
+from .models import Key, Lesson, LessonGroup, LessonType
+
+
+RECHECK_SECONDS = 2.0
+MAX_SUGGESTIONS = 20
+# Stop scanning after this many matching entries; enough to rank from
+SCAN_LIMIT = 400
+
+LESSON, GROUP, LESSON_TYPE, KEY = "lesson", "group", "lesson_type", "key"
+# Ties in match quality go to the broader curriculum level
+KIND_ORDER = {LESSON_TYPE: 0, KEY: 1, GROUP: 2, LESSON: 3}
+
+_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def normalise(text: str) -> str:
+    """Casefolded, accent-free, words separated by single spaces."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _SEPARATORS.sub(" ", text).strip()
+
+
+class PrefixIndex:
+    """Sorted word-start suffixes of a fixed list of ``(kind, label, id)`` entries."""
+
+    def __init__(self, entries, version=None):
+        self.version = version
+        self.labels = []  # (kind, label, id), distinct per (kind, label)
+        self.folded = []  # normalised label, same index
+        seen = set()
+        for kind, label, pk in entries:
+            folded = normalise(label or "")
+            if not folded or (kind, folded) in seen:
+                continue
+            seen.add((kind, folded))
+            self.labels.append((kind, label, pk))
+            self.folded.append(folded[:255])
+
+        packed = []
+        for i, folded in enumerate(self.folded):
+            packed.append(i << 8)
+            start = folded.find(" ")
+            while start != -1:
+                packed.append(i << 8 | start + 1)
+                start = folded.find(" ", start + 1)
+        folded_labels = self.folded
+        packed.sort(key=lambda e: folded_labels[e >> 8][e & 0xFF:])
+        self.entries = array("q", packed)
+
+    def _suffix(self, entry):
+        return self.folded[entry >> 8][entry & 0xFF:]
+
+    def _lower_bound(self, prefix):
+        """First entry whose suffix sorts at or after ``prefix``."""
+        low, high = 0, len(self.entries)
+        while low < high:
+            middle = (low + high) // 2
+            if self._suffix(self.entries[middle]) < prefix:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def complete(self, prefix: str, limit: int = 10):
+        """Up to ``limit`` ``(kind, label, id)`` completing ``prefix``, best first."""
+        prefix = normalise(prefix)
+        if not prefix:
+            return []
+
+        candidates = {}
+        position = self._lower_bound(prefix)
+        for entry in self.entries[position:position + SCAN_LIMIT]:
+            if not self._suffix(entry).startswith(prefix):
+                break
+            index, offset = entry >> 8, entry & 0xFF
+            # Matches at the start of the label first, then shorter labels
+            score = (offset > 0, KIND_ORDER[self.labels[index][0]], len(self.folded[index]), self.folded[index])
+            if index not in candidates or score < candidates[index]:
+                candidates[index] = score
+
+        ranked = sorted(candidates, key=candidates.get)[:limit]
+        return [self.labels[index] for index in ranked]
+
+
+def curriculum_entries():
+    """Every completable name in the curriculum, as ``(kind, label, id)``."""
+    for pk, name in LessonType.objects.values_list("id", "name").iterator():
+        yield LESSON_TYPE, name, pk
+    for key in Key.objects.all():
+        yield KEY, str(key), key.pk
+    for pk, name in LessonGroup.objects.values_list("id", "name").iterator():
+        yield GROUP, name, pk
+    lessons = Lesson.objects.values_list("id", "title", "folder_name").order_by("id")
+    for pk, title, folder_name in lessons.iterator(chunk_size=5000):
+        yield LESSON, title or folder_name, pk
+
+
+_index = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_index() -> PrefixIndex:
+    """This worker's index, rebuilt if the curriculum changed since it was built."""
+    global _index, _checked_at
+    now = time.monotonic()
+    if _index is not None and now - _checked_at < RECHECK_SECONDS:
+        return _index
+
+    # While one thread rebuilds, the others keep answering from the old index
+    if not _lock.acquire(blocking=_index is None):
+        return _index
+    try:
+        if _index is None or now - _checked_at >= RECHECK_SECONDS:
+            version = versioning.current().version
+            if _index is None or _index.version != version:
+                _index = PrefixIndex(curriculum_entries(), version=version)
+            _checked_at = time.monotonic()
+    finally:
+        _lock.release()
+    return _index
+
+
+def complete(prefix: str, limit: int = 10):
+    return get_index().complete(prefix, limit=min(limit, MAX_SUGGESTIONS))
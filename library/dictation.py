@@ -0,0 +1,196 @@
+"""
+Procedural rhythmic / melodic dictation.
+
+``generate_notes(rule, seed)`` is a pure function of a DictationRule's
+parameters and a seed, so every pool entry can be reproduced exactly from
+its stored seed.  Pools are filled ahead of time with ``fill_pool`` (called
+by the ``generate_dictations`` command, which cron runs every few minutes to
+fill pools the admin has emptied), and ``draw`` serves an exercise with a
+single indexed (rule, index) lookup.
+
+Notes use the library.midi shape:  {"pitch": 60, "beat": 0.0, "duration": 1.0}
+"""
+
+import hashlib
+import random
+
+from django.db import transaction
+
+from .midi import parse_meter
+from .models import MIN_NOTE_VALUE, DictationRule, DictationExercise
+
+
+DEFAULT_NOTE_VALUES = [1, 0.5]
+DEFAULT_SCALE_DEGREES = [1, 2, 3, 4, 5, 6, 7, 8]
+DEFAULT_INTERVALS = [1, 2]
+
+# Semitone offsets of the scale degrees 1–7
+MAJOR_SCALE = [0, 2, 4, 5, 7, 9, 11]
+MINOR_SCALE = [0, 2, 3, 5, 7, 8, 10]  # natural minor
+
+_PITCH_CLASS = {"c": 0, "d": 2, "e": 4, "f": 5, "g": 7, "a": 9, "b": 11, "h": 11}
+
+BATCH_SIZE = 500
+
+
+# ---------------------------------------------------------------------------
+# Pitch helpers
+# ---------------------------------------------------------------------------
+
+def tonic_pitch(key, octave: int = 4) -> int:
+    """MIDI pitch of the key's tonic in ``octave`` (C4 = 60). ``None`` → C."""
+    if key is None:
+        return 12 * (octave + 1)
+    tonic = key.tonic.strip().lower()
+    pitch_class = _PITCH_CLASS[tonic[0]]
+    suffix = tonic[1:]
+    if suffix == "is":
+        pitch_class += 1
+    elif suffix in ("es", "s"):
+        pitch_class -= 1
+    else:
+        for ch in suffix:
+            if ch in "#♯":
+                pitch_class += 1
+            elif ch in "b♭":
+                pitch_class -= 1
+    return 12 * (octave + 1) + pitch_class
+
+
+def degree_pitch(degree: int, tonic: int, minor: bool = False) -> int:
+    """MIDI pitch of a 1-based scale degree; degrees above 7 continue upwards."""
+    scale = MINOR_SCALE if minor else MAJOR_SCALE
+    octave, step = divmod(degree - 1, 7)
+    return tonic + 12 * octave + scale[step]
+
+
+def pitch_range(key, degrees):
+    """Lowest and highest MIDI pitch a melody over ``degrees`` in ``key`` can reach."""
+    tonic = tonic_pitch(key)
+    minor = key is not None and key.mode == key.MINOR
+    pitches = [degree_pitch(degree, tonic, minor) for degree in degrees]
+    return min(pitches), max(pitches)
+
+
+def derive_seed(base: int, index: int) -> int:
+    """Stable per-entry seed for pool position ``index`` (fits a BigIntegerField)."""
+    digest = hashlib.sha256(f"{base}:{index}".encode()).digest()
+    return int.from_bytes(digest[:6], "big")
+
+
+# ---------------------------------------------------------------------------
+# Generation
+# ---------------------------------------------------------------------------
+
+def beats_per_measure(meter: str) -> float:
+    numerator, denominator = parse_meter(meter)
+    return numerator * 4 / denominator
+
+
+def _rhythm(rng, note_values, measure_beats: float, measures: int):
+    """Durations filling ``measures`` bars exactly, drawn from ``note_values``."""
+    if min(note_values) < MIN_NOTE_VALUE:
+        raise ValueError(f"Note values must be at least {MIN_NOTE_VALUE:g} beats.")
+    durations = []
+    for _ in range(measures):
+        remaining = measure_beats
+        while remaining > 1e-9:
+            fitting = [v for v in note_values if v <= remaining + 1e-9]
+            value = rng.choice(fitting) if fitting else remaining
+            durations.append(value)
+            remaining -= value
+    return durations
+
+
+def _melody(rng, degrees, intervals, count: int):
+    """Scale-degree walk of ``count`` notes moving only by allowed intervals."""
+    allowed = set(degrees)
+    pool = sorted(allowed)
+    current = 1 if 1 in allowed else rng.choice(pool)
+    walk = [current]
+    while len(walk) < count:
+        options = [
+            current + direction * step
+            for step in intervals
+            for direction in (1, -1)
+            if current + direction * step in allowed
+        ]
+        current = rng.choice(options) if options else rng.choice(pool)
+        walk.append(current)
+    return walk
+
+
+def generate_notes(rule, seed: int):
+    """Generate the note list for ``rule`` from ``seed``."""
+    rng = random.Random(seed)
+    note_values = sorted(float(v) for v in (rule.note_values or DEFAULT_NOTE_VALUES))
+    durations = _rhythm(rng, note_values, beats_per_measure(rule.meter), rule.measures)
+
+    tonic = tonic_pitch(rule.key)
+    minor = rule.key is not None and rule.key.mode == rule.key.MINOR
+
+    if rule.kind == DictationRule.RHYTHMIC:
+        pitches = [tonic] * len(durations)
+    else:
+        degrees = _melody(
+            rng,
+            rule.scale_degrees or DEFAULT_SCALE_DEGREES,
+            rule.intervals or DEFAULT_INTERVALS,
+            len(durations),
+        )
+        pitches = [degree_pitch(d, tonic, minor) for d in degrees]
+
+    notes = []
+    beat = 0.0
+    for pitch, duration in zip(pitches, durations):
+        notes.append({"pitch": pitch, "beat": beat, "duration": duration})
+        beat += duration
+    return notes
+
+
+# ---------------------------------------------------------------------------
+# Pools
+# ---------------------------------------------------------------------------
+
+def check_rule(rule) -> None:
+    """Raise ValidationError unless ``rule``'s parameters can be generated from."""
+    rule.clean_fields(exclude=["lesson_type", "key"])
+    rule.clean()
+
+
+def fill_pool(rule, rebuild: bool = False) -> int:
+    """
+    Generate any missing pool entries for ``rule`` and trim entries beyond
+    ``pool_size``.  With ``rebuild`` the existing pool is discarded first
+    (use after changing the rule's parameters).  Returns the number created.
+
+    Raises ValidationError for a rule with invalid parameters.
+    """
+    check_rule(rule)
+    with transaction.atomic():
+        if rebuild:
+            rule.pool.all().delete()
+        else:
+            rule.pool.filter(index__gte=rule.pool_size).delete()
+
+        existing = set(rule.pool.values_list("index", flat=True))
+        entries = []
+        for index in range(rule.pool_size):
+            if index in existing:
+                continue
+            seed = derive_seed(rule.seed, index)
+            entries.append(
+                DictationExercise(rule=rule, index=index, seed=seed, notes=generate_notes(rule, seed))
+            )
+        DictationExercise.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+    return len(entries)
+
+
+def draw(rule, index=None):
+    """
+    Fetch one pool entry — a random one unless ``index`` is given.
+    Raises DictationExercise.DoesNotExist if the pool hasn't been generated.
+    """
+    if index is None:
+        index = random.randrange(rule.pool_size) if rule.pool_size else 0
+    return DictationExercise.objects.get(rule_id=rule.pk, index=index)
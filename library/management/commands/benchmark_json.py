@@ -0,0 +1,132 @@
+"""
+Management command: benchmark_json
+
+Compares DRF's stdlib JSONRenderer / JSONParser with the orjson-backed
+FastJSONRenderer / FastJSONParser (rea/renderers.py) on the largest API
+payloads: full lesson detail (LessonSerializer with nested group, lesson
+type and exercises), an exercise list page, and the whole group tree.
+Serializer data is built once beforehand; only rendering and parsing are
+timed.  Both renderers' output is compared byte for byte.
+
+When the database holds fewer rows than requested, synthetic rows are
+created inside a transaction that is rolled back afterwards.
+
+Usage
+-----
+    python manage.py benchmark_json
+    python manage.py benchmark_json --rows 5000 --repeat 10
+
+Options
+-------
+    --rows      Lessons / exercises per payload (default: 1000).
+    --repeat    Timed runs per side; the best is reported (default: 5).
+"""
+
+import io
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory, override_settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from rea.renderers import FastJSONParser, FastJSONRenderer, orjson
+from ...models import Exercise, Lesson, LessonGroup
+from ...serializers import ExerciseSerializer, LessonGroupSerializer, LessonSerializer
+from .benchmark_serializers import Rollback, best_of, fill
+
+EXERCISES_PER_LESSON = 4
+
+
+def attach_exercises(lessons, exercises):
+    """Give every lesson in ``lessons`` without exercises a few of ``exercises``."""
+    through = Lesson.exercises.through
+    bare = set(lessons.values_list("pk", flat=True)) - set(
+        through.objects.filter(lesson__in=lessons).values_list("lesson_id", flat=True)
+    )
+    exercise_ids = list(exercises.values_list("pk", flat=True))
+    through.objects.bulk_create([
+        through(lesson_id=lesson_id, exercise_id=exercise_ids[(i + j) % len(exercise_ids)])
+        for i, lesson_id in enumerate(sorted(bare))
+        for j in range(min(EXERCISES_PER_LESSON, len(exercise_ids)))
+    ])
+
+
+class Command(BaseCommand):
+    help = "Benchmark the orjson renderer and parser against DRF's stdlib JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000,
+                            help="Lessons / exercises per payload (default: 1000).")
+        parser.add_argument("--repeat", type=int, default=5,
+                            help="Timed runs per side; the best is reported (default: 5).")
+
+    @override_settings(JSON_BACKEND="orjson")
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError("orjson is not installed.")
+        rows, repeat = options["rows"], options["repeat"]
+        context = {"request": Request(RequestFactory().get("/api/"))}
+
+        self.stdout.write(f"Rows per payload: {rows}  |  Best of {repeat}\n")
+        self.stdout.write(
+            f"  {'Payload':<16}{'KB':>8}{'Render ms':>11}{'Fast ms':>9}{'Speed-up':>10}"
+            f"{'Parse ms':>10}{'Fast ms':>9}{'Speed-up':>10}  Output"
+        )
+
+        try:
+            with transaction.atomic():
+                fill(rows)
+                lessons = Lesson.objects.order_by("order", "folder_name", "id")[:rows]
+                attach_exercises(lessons, Exercise.objects.order_by("id")[:50])
+
+                payloads = [
+                    (
+                        "Lesson detail",
+                        LessonSerializer(
+                            lessons
+                            .select_related("group__key", "group__parent")
+                            .prefetch_related("exercises"),
+                            many=True, context=context,
+                        ).data,
+                    ),
+                    (
+                        "Exercise list",
+                        ExerciseSerializer(
+                            Exercise.objects.order_by("-created", "id")[:rows], many=True, context=context
+                        ).data,
+                    ),
+                    (
+                        "Group tree",
+                        LessonGroupSerializer(
+                            LessonGroup.objects.select_related("key", "parent").order_by("id"),
+                            many=True, context=context,
+                        ).data,
+                    ),
+                ]
+                raise Rollback
+        except Rollback:
+            pass
+
+        all_identical = True
+        for name, data in payloads:
+            regular_s, regular_out = best_of(repeat, lambda: JSONRenderer().render(data))
+            fast_s, fast_out = best_of(repeat, lambda: FastJSONRenderer().render(data))
+            parse_s, _ = best_of(repeat, lambda: JSONParser().parse(io.BytesIO(regular_out)))
+            fast_parse_s, _ = best_of(repeat, lambda: FastJSONParser().parse(io.BytesIO(regular_out)))
+            identical = regular_out == fast_out
+            all_identical &= identical
+
+            line = (
+                f"  {name:<16}{len(regular_out) / 1024:>8.0f}"
+                f"{regular_s * 1000:>11.1f}{fast_s * 1000:>9.1f}{regular_s / fast_s:>9.1f}×"
+                f"{parse_s * 1000:>10.1f}{fast_parse_s * 1000:>9.1f}{parse_s / fast_parse_s:>9.1f}×  "
+            )
+            self.stdout.write(line + ("✓  identical" if identical else self.style.ERROR("✗  differs")))
+
+        self.stdout.write("")
+        style = self.style.SUCCESS if all_identical else self.style.ERROR
+        self.stdout.write(style(
+            f"Done.  Payloads: {len(payloads)}  |  Output {'identical' if all_identical else 'DIFFERS'}"
+        ))
@@ -0,0 +1,276 @@
+"""
+Management command: benchmark_pitch
+
+Scores pitch-detector settings on the synthetic signal suite in
+library/pitch_signals.py, using the NumPy port of static/js/pitch_detector.js
+in library/pitch.py.  Frames are analysed the way the browser sees them
+(trailing analyser buffer), so latency figures include buffering delay.
+
+For every combination of the --grid values it reports:
+
+    RPA       raw pitch accuracy: voiced frames detected within 50 cents
+    Oct       octave errors among detected voiced frames
+    FA        false alarms: frames whose whole buffer is silent but which
+              are reported as voiced
+    Cents     median absolute error of correctly detected frames
+    Lock      median latency from a note's onset to the first locked
+              (``decideOnNote``) reading of the right note, and the
+              percentage of notes that never locked
+    Frames/s  analysis throughput of this process
+
+Usage
+-----
+    python manage.py benchmark_pitch
+    python manage.py benchmark_pitch --grid threshold=0.1,0.15,0.2 --grid fft_size=4096,8192
+    python manage.py benchmark_pitch --signals vibrato --signals noise_10db --per-signal
+    python manage.py benchmark_pitch --verify
+    python manage.py benchmark_pitch --csv results.csv
+
+Options
+-------
+    --grid          name=v1,v2,… (repeatable). Parameters: fft_size, window_size,
+                    threshold, smoothing, frame_rate, min_freq, max_freq,
+                    buffer_size. Unlisted parameters keep the JS defaults.
+    --signals       Only run the named signals (repeatable).
+    --sample-rate   Sample rate of the synthetic signals (default: 44100).
+    --seed          Random seed for the signal suite (default: 0).
+    --per-signal    Also print a row per signal for every configuration.
+    --csv           Write per-signal results for every configuration to a file.
+    --verify        Check the vectorised YIN against the literal port first.
+"""
+
+import csv
+import itertools
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import pitch
+from ...pitch_signals import DEFAULT_SAMPLE_RATE, suite
+
+
+DEFAULTS = {
+    "fft_size": pitch.FFT_SIZE,
+    "window_size": pitch.WINDOW_SIZE,
+    "threshold": pitch.YIN_THRESHOLD,
+    "smoothing": pitch.SMOOTHING_FACTOR,
+    "frame_rate": pitch.BROWSER_FRAME_RATE,
+    "min_freq": pitch.MIN_FREQ,
+    "max_freq": pitch.MAX_FREQ,
+    "buffer_size": pitch.NOTE_BUFFER_SIZE,
+}
+INT_PARAMS = {"fft_size", "window_size", "buffer_size"}
+
+# Used when no --grid is given
+DEFAULT_GRID = {
+    "threshold": [0.1, 0.15, 0.2],
+    "smoothing": [0.5, 0.7],
+    "fft_size": [4096, 8192],
+}
+
+CORRECT_CENTS = 50
+
+
+def evaluate(signal, config):
+    """Metrics for one signal under one configuration."""
+    started = time.perf_counter()
+    track = pitch.track_pitch(
+        signal.samples,
+        signal.sample_rate,
+        frame_rate=config["frame_rate"],
+        fft_size=config["fft_size"],
+        window_size=config["window_size"],
+        trailing=True,
+        min_freq=config["min_freq"],
+        max_freq=config["max_freq"],
+        threshold=config["threshold"],
+        smoothing=config["smoothing"],
+    )
+    elapsed = time.perf_counter() - started
+
+    # Accuracy is judged against the pitch in the middle of the analysed
+    # window; latency (below) against the frame time itself.
+    centre = track.times - config["fft_size"] / 2 / signal.sample_rate
+    truth = signal.truth_at(centre)
+    sung = truth > 0
+    detected = track.voiced & (track.frequency > 0)
+
+    # A false alarm needs the whole analyser buffer to be silent
+    voiced_samples = np.concatenate(([0], np.cumsum(signal.f0 > 0)))
+    buffer_end = np.clip((track.times * signal.sample_rate).astype(int), 0, len(signal.f0))
+    buffer_start = np.clip(buffer_end - config["fft_size"], 0, None)
+    silent = voiced_samples[buffer_end] == voiced_samples[buffer_start]
+
+    error = np.full(len(truth), np.nan)
+    both = sung & detected
+    error[both] = 12 * np.log2(track.frequency[both] / truth[both])
+    correct = both & (np.abs(error) * 100 < CORRECT_CENTS)
+    octave = both & (np.abs(np.abs(error) - 12) < 1)
+
+    # Latency to lock: first locked reading of the right note after each onset
+    locks = pitch.lock_notes(track, buffer_size=config["buffer_size"])
+    lock_times = np.array([track.times[i] for i, _ in locks])
+    lock_notes = np.array([note for _, note in locks])
+    ends = [onset for onset, _ in signal.onsets[1:]] + [signal.duration]
+    latencies, missed = [], 0
+    for (onset, midi), end in zip(signal.onsets, ends):
+        hits = np.flatnonzero((lock_times >= onset) & (lock_times < end) & (lock_notes == midi))
+        if len(hits):
+            latencies.append(lock_times[hits[0]] - onset)
+        else:
+            missed += 1
+
+    return {
+        "frames": len(track.times),
+        "seconds": elapsed,
+        "sung": int(sung.sum()),
+        "silent": int(silent.sum()),
+        "correct": int(correct.sum()),
+        "detected_sung": int(both.sum()),
+        "octave": int(octave.sum()),
+        "false_alarms": int((detected & silent).sum()),
+        "cents": (np.abs(error[correct]) * 100).tolist(),
+        "latencies": latencies,
+        "notes": len(signal.onsets),
+        "missed": missed,
+    }
+
+
+def combine(results):
+    """Aggregate ``evaluate`` dicts into the reported figures."""
+    total = {key: sum(r[key] for r in results) for key in
+             ("frames", "seconds", "sung", "silent", "correct", "detected_sung",
+              "octave", "false_alarms", "notes", "missed")}
+    cents = [c for r in results for c in r["cents"]]
+    latencies = [lat for r in results for lat in r["latencies"]]
+
+    def pct(part, whole):
+        return 100 * part / whole if whole else 0.0
+
+    return {
+        "rpa": pct(total["correct"], total["sung"]),
+        "octave": pct(total["octave"], total["detected_sung"]),
+        "false_alarm": pct(total["false_alarms"], total["silent"]),
+        "cents": float(np.median(cents)) if cents else float("nan"),
+        "lock_ms": 1000 * float(np.median(latencies)) if latencies else float("nan"),
+        "lock_missed": pct(total["missed"], total["notes"]),
+        "fps": total["frames"] / total["seconds"] if total["seconds"] else 0.0,
+    }
+
+
+def parse_grid(specs):
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        name = name.strip().replace("-", "_")
+        if name not in DEFAULTS or not values:
+            raise CommandError(
+                f"Bad --grid {spec!r}; expected name=v1,v2 with name one of {', '.join(DEFAULTS)}."
+            )
+        cast = int if name in INT_PARAMS else float
+        try:
+            grid[name] = [cast(v) for v in values.split(",") if v.strip()]
+        except ValueError:
+            raise CommandError(f"Non-numeric value in --grid {spec!r}.")
+    return grid
+
+
+class Command(BaseCommand):
+    help = "Benchmark pitch-detector settings on synthetic sung signals."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grid", action="append", default=[],
+                            help="Parameter values to sweep, e.g. threshold=0.1,0.15 (repeatable).")
+        parser.add_argument("--signals", action="append", default=[],
+                            help="Only run the named signals (repeatable).")
+        parser.add_argument("--sample-rate", type=int, default=DEFAULT_SAMPLE_RATE,
+                            help=f"Sample rate of the test signals (default: {DEFAULT_SAMPLE_RATE}).")
+        parser.add_argument("--seed", type=int, default=0,
+                            help="Random seed for the signal suite (default: 0).")
+        parser.add_argument("--per-signal", action="store_true", default=False,
+                            help="Print a row per signal for every configuration.")
+        parser.add_argument("--csv", default=None,
+                            help="Write per-signal results to this CSV file.")
+        parser.add_argument("--verify", action="store_true", default=False,
+                            help="Check yin_frames against the literal reference port first.")
+
+    def handle(self, *args, **options):
+        grid = parse_grid(options["grid"]) or DEFAULT_GRID
+        signals = suite(options["sample_rate"], options["seed"])
+        if options["signals"]:
+            known = {s.name for s in signals}
+            unknown = set(options["signals"]) - known
+            if unknown:
+                raise CommandError(f"Unknown signal(s): {', '.join(sorted(unknown))}. Known: {', '.join(sorted(known))}")
+            signals = [s for s in signals if s.name in options["signals"]]
+
+        if options["verify"]:
+            self.verify(signals)
+
+        names = list(grid)
+        configs = []
+        for values in itertools.product(*(grid[n] for n in names)):
+            config = {**DEFAULTS, **dict(zip(names, values))}
+            if config["window_size"] > config["fft_size"]:
+                self.stdout.write(self.style.WARNING(
+                    f"  Skipping window_size {config['window_size']} > fft_size {config['fft_size']}"
+                ))
+                continue
+            configs.append(config)
+
+        self.stdout.write(
+            f"Signals: {len(signals)} ({sum(s.duration for s in signals):.1f} s)  |  "
+            f"Configurations: {len(configs)}\n"
+        )
+
+        header = "  ".join(f"{n:>11}" for n in names)
+        columns = f"{'RPA %':>6} {'Oct %':>6} {'FA %':>6} {'Cents':>6} {'Lock ms':>8} {'Miss %':>7} {'Frames/s':>9}"
+        self.stdout.write(f"{header}  {'':<12}{columns}")
+
+        rows = []
+        for config in configs:
+            results = []
+            for signal in signals:
+                result = evaluate(signal, config)
+                results.append(result)
+                rows.append({**{n: config[n] for n in DEFAULTS}, "signal": signal.name, **combine([result])})
+                if options["per_signal"]:
+                    self.stdout.write(self.format_row(names, config, signal.name, combine([result])))
+            self.stdout.write(self.format_row(names, config, "ALL", combine(results), bold=True))
+
+        if options["csv"]:
+            with open(options["csv"], "w", newline="") as fh:
+                writer = csv.DictWriter(fh, fieldnames=list(rows[0]) if rows else list(DEFAULTS))
+                writer.writeheader()
+                writer.writerows(rows)
+            self.stdout.write(f"\n  ✓  Wrote {len(rows)} rows to {options['csv']}")
+
+        self.stdout.write("")
+        self.stdout.write(self.style.SUCCESS(f"Done.  Configurations: {len(configs)}  |  Signals: {len(signals)}"))
+
+    def format_row(self, names, config, label, m, bold=False):
+        values = "  ".join(f"{config[n]:>11g}" for n in names)
+        row = (
+            f"{values}  {label:<12}{m['rpa']:>6.1f} {m['octave']:>6.1f} {m['false_alarm']:>6.1f} "
+            f"{m['cents']:>6.1f} {m['lock_ms']:>8.0f} {m['lock_missed']:>7.1f} {m['fps']:>9.0f}"
+        )
+        return self.style.MIGRATE_LABEL(row) if bold else row
+
+    def verify(self, signals, frames_per_signal=8):
+        """Compare yin_frames with yin_reference on frames from every signal."""
+        worst_freq = worst_conf = 0.0
+        hann = np.hanning(pitch.WINDOW_SIZE)
+        for signal in signals:
+            starts = np.linspace(0, len(signal.samples) - pitch.WINDOW_SIZE, frames_per_signal).astype(int)
+            frames = np.stack([signal.samples[s:s + pitch.WINDOW_SIZE] * hann for s in starts])
+            fast_freq, fast_conf = pitch.yin_frames(frames, signal.sample_rate)
+            for frame, f, c in zip(frames, fast_freq, fast_conf):
+                ref_freq, ref_conf = pitch.yin_reference(frame, signal.sample_rate)
+                worst_freq = max(worst_freq, abs(f - ref_freq))
+                worst_conf = max(worst_conf, abs(c - ref_conf))
+
+        style = self.style.SUCCESS if worst_freq < 0.01 and worst_conf < 1e-3 else self.style.ERROR
+        self.stdout.write(style(
+            f"Verify: max |Δf| = {worst_freq:.2e} Hz, max |Δconfidence| = {worst_conf:.2e}\n"
+        ))
@@ -0,0 +1,161 @@
+"""
+Management command: benchmark_serializers
+
+Compares the regular DRF serializers with the ``.values()`` fast path
+(rea/fastlist.py) on list pages of LessonListSerializer, ExerciseSerializer
+and UserInstrumentSerializer.  Both sides include their queries — the
+regular side with the joins and prefetches the viewsets apply — and the
+rendered JSON of both is compared byte for byte.
+
+When the database holds fewer rows than requested, synthetic rows are
+created inside a transaction that is rolled back afterwards.
+
+Usage
+-----
+    python manage.py benchmark_serializers
+    python manage.py benchmark_serializers --rows 5000 --repeat 10
+
+Options
+-------
+    --rows      Rows per page (default: 1000).
+    --repeat    Timed runs per side; the best is reported (default: 5).
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from users.models import Instrument, User, UserInstrument
+from users.serializers import UserInstrumentSerializer
+from ...models import Approach, Category, Exercise, Lesson, LessonGroup, LessonType
+from ...serializers import ExerciseSerializer, LessonListSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+def fill(rows):
+    """Top up every benchmarked table to at least ``rows`` rows."""
+    missing = rows - Exercise.objects.count()
+    if missing > 0:
+        Exercise.objects.bulk_create([Exercise(polyphonic=i % 2 == 0) for i in range(missing)])
+
+    missing = rows - Lesson.objects.count()
+    if missing > 0:
+        category, _ = Category.objects.get_or_create(name=Category.TONAL)
+        approach, _ = Approach.objects.get_or_create(category=category, name=Approach.ABSOLUTE)
+        lesson_type, _ = LessonType.objects.get_or_create(
+            approach=approach, slug="benchmark", defaults={"name": "Benchmark"}
+        )
+        root = LessonGroup.objects.create(lesson_type=lesson_type, name="Benchmark")
+        groups = [LessonGroup.objects.create(parent=root, name=f"Group {i}") for i in range(10)]
+        Lesson.objects.bulk_create([
+            Lesson(group=groups[i % 10], folder_name=f"benchmark_{i}", title=f"Benchmark {i}", order=i % 7)
+            for i in range(missing)
+        ])
+
+    missing = rows - UserInstrument.objects.count()
+    if missing > 0:
+        instruments = Instrument.objects.bulk_create([
+            Instrument(name=f"Benchmark {i}", family="Benchmark") for i in range(50)
+        ])
+        users = User.objects.bulk_create([
+            User(username=f"benchmark_{i}") for i in range(missing // len(instruments) + 1)
+        ])
+        UserInstrument.objects.bulk_create([
+            UserInstrument(user=user, instrument=instrument)
+            for user in users for instrument in instruments
+        ][:missing])
+
+
+def best_of(repeat, func):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = "Benchmark the .values() fast path against the regular list serializers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000,
+                            help="Rows per page (default: 1000).")
+        parser.add_argument("--repeat", type=int, default=5,
+                            help="Timed runs per side; the best is reported (default: 5).")
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+        context = {"request": Request(RequestFactory().get("/api/"))}
+
+        targets = [
+            (
+                "LessonListSerializer",
+                LessonListSerializer,
+                Lesson.objects.order_by("order", "folder_name", "id"),
+                ["group", "group__key", "group__parent__key"],
+                [],
+            ),
+            (
+                "ExerciseSerializer",
+                ExerciseSerializer,
+                Exercise.objects.order_by("-created", "id"),
+                [],
+                [],
+            ),
+            (
+                "UserInstrumentSerializer",
+                UserInstrumentSerializer,
+                UserInstrument.objects.order_by("id"),
+                ["instrument"],
+                [],
+            ),
+        ]
+
+        self.stdout.write(f"Rows per page: {rows}  |  Best of {repeat}\n")
+        self.stdout.write(
+            f"  {'Serializer':<26}{'Regular ms':>11}{'Fast ms':>9}{'Regular rows/s':>16}"
+            f"{'Fast rows/s':>13}{'Speed-up':>10}  Output"
+        )
+
+        try:
+            with transaction.atomic():
+                fill(rows)
+                all_identical = True
+                for name, serializer_class, queryset, select, prefetch in targets:
+                    page = queryset[:rows]
+
+                    def regular():
+                        qs = page.select_related(*select).prefetch_related(*prefetch)
+                        return serializer_class(qs, many=True, context=context).data
+
+                    def fast():
+                        return serializer_class(context=context).render_queryset(page)
+
+                    regular_s, regular_data = best_of(repeat, regular)
+                    fast_s, fast_data = best_of(repeat, fast)
+                    identical = JSONRenderer().render(regular_data) == JSONRenderer().render(fast_data)
+                    all_identical &= identical
+
+                    count = len(fast_data)
+                    line = (
+                        f"  {name:<26}{regular_s * 1000:>11.1f}{fast_s * 1000:>9.1f}"
+                        f"{count / regular_s:>16.0f}{count / fast_s:>13.0f}{regular_s / fast_s:>9.1f}×  "
+                    )
+                    self.stdout.write(line + ("✓  identical" if identical else self.style.ERROR("✗  differs")))
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write("")
+        style = self.style.SUCCESS if all_identical else self.style.ERROR
+        self.stdout.write(style(
+            f"Done.  Serializers: {len(targets)}  |  Output {'identical' if all_identical else 'DIFFERS'}"
+        ))
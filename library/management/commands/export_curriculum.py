@@ -0,0 +1,60 @@
+"""
+Management command: export_curriculum
+
+Writes the whole curriculum — categories down to lessons, exercises and
+dictation pools — and its exercise media to one portable snapshot file
+(see library/snapshot.py), e.g. to clone production into staging.
+
+Usage
+-----
+    python manage.py export_curriculum
+    python manage.py export_curriculum /tmp/curriculum.zip
+    python manage.py export_curriculum --no-media
+
+Options
+-------
+    path         Output file (default: curriculum-<date>.zip).
+    --no-media   Leave exercise files out; rows keep their file names.
+"""
+
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ... import snapshot
+
+
+class Command(BaseCommand):
+    help = "Export the curriculum and its media to a portable snapshot file."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            nargs="?",
+            help="Output file (default: curriculum-<date>.zip).",
+        )
+        parser.add_argument(
+            "--no-media",
+            action="store_true",
+            default=False,
+            help="Leave exercise files out of the snapshot.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"] or f"curriculum-{timezone.localdate():%Y-%m-%d}.zip"
+
+        started = time.perf_counter()
+        manifest = snapshot.export(path, media=not options["no_media"])
+        elapsed = time.perf_counter() - started
+
+        for entry in manifest["models"]:
+            self.stdout.write(f"  ✓  {entry['model']}: {entry['rows']}")
+
+        size = os.path.getsize(path)
+        self.stdout.write("")
+        self.stdout.write(self.style.SUCCESS(
+            f"Done.  {path}  |  Rows: {sum(e['rows'] for e in manifest['models'])}  |  "
+            f"Blobs: {manifest['blobs']}  |  {size / 1024 / 1024:.1f} MB in {elapsed:.1f}s"
+        ))
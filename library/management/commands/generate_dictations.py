@@ -0,0 +1,68 @@
+"""
+Management command: generate_dictations
+
+Fills the pre-generated pool of every DictationRule (or the given ones) so
+dictation exercises can be served with a single row fetch.  Saving a rule in
+the admin only discards its stale pool; cron runs this command every few
+minutes to generate the new one (see rea.cron).  Rules with invalid
+parameters are reported and skipped.
+
+Usage
+-----
+    python manage.py generate_dictations
+    python manage.py generate_dictations --rule 3 --rule 7
+    python manage.py generate_dictations --rebuild
+
+Options
+-------
+    --rule      Only process the DictationRule with this id (repeatable).
+    --rebuild   Discard existing pool entries and regenerate them (use after
+                changing a rule's parameters outside the admin).
+"""
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from ...dictation import fill_pool
+from ...models import DictationRule
+
+
+class Command(BaseCommand):
+    help = "Generate the pre-built exercise pools for dictation rules."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rule",
+            type=int,
+            action="append",
+            dest="rules",
+            help="DictationRule id to process (may be given more than once).",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            default=False,
+            help="Regenerate pools from scratch instead of only filling gaps.",
+        )
+
+    def handle(self, *args, **options):
+        rules = DictationRule.objects.select_related("key").order_by("pk")
+        if options["rules"]:
+            rules = rules.filter(pk__in=options["rules"])
+            missing = set(options["rules"]) - set(rules.values_list("pk", flat=True))
+            if missing:
+                raise CommandError(f"Unknown DictationRule id(s): {sorted(missing)}")
+
+        total = 0
+        for rule in rules:
+            try:
+                created = fill_pool(rule, rebuild=options["rebuild"])
+            except ValidationError as exc:
+                self.stdout.write(self.style.WARNING(f"  Skipping {rule}: {'; '.join(exc.messages)}"))
+                continue
+            total += created
+            if created:
+                self.stdout.write(f"  ✓  {rule}: {created} generated")
+
+        self.stdout.write("")
+        self.stdout.write(self.style.SUCCESS(f"Done.  Exercises generated: {total}"))
@@ -30,11 +30,13 @@ Options
 
 import os
 import re
+from django.core.files import File
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from django.utils.text import slugify
 
 from ...models import Category, Approach, LessonType, LessonGroup, Lesson, Exercise
+from ...storage import exercise_storage
 
 
 # ---------------------------------------------------------------------------
@@ -167,16 +169,29 @@ def get_or_create_lesson(group: "LessonGroup", folder_name: str, order: int, dry
     return obj
 
 
-def get_or_create_exercise(midi_path: str, dry_run: bool) -> "Exercise":
-    """Create or retrieve an Exercise by its midi file path."""
-    # Store path relative to the midi root so it matches Django's upload_to
+def get_or_create_exercise(midi_path: str, source_path: str, dry_run: bool) -> "Exercise":
+    """
+    Create or retrieve an Exercise for a midi file.
+
+    The file is copied into media storage under its path relative to the midi
+    root plus a content fingerprint, so re-importing unchanged files matches
+    the existing Exercise and changed files get a fresh, cache-safe URL.
+    An Exercise still stored under the plain relative path (imported before
+    fingerprinting) is renamed in place rather than duplicated.
+    """
     if dry_run:
         return Exercise(midi=midi_path)
-    obj, _ = Exercise.objects.get_or_create(
-        midi=midi_path,
-        defaults={"category": "pitch"},
-    )
-    return obj
+    with open(source_path, "rb") as fh:
+        name = exercise_storage.save(midi_path, File(fh))
+    obj = Exercise.objects.filter(midi=name).first()
+    if obj is not None:
+        return obj
+    obj = Exercise.objects.filter(midi=midi_path).first()
+    if obj is not None:
+        obj.midi.name = name
+        obj.save(update_fields=["midi"])
+        return obj
+    return Exercise.objects.create(midi=name, category="pitch")
 
 
 # ---------------------------------------------------------------------------
@@ -263,7 +278,7 @@ def walk_midi_root(midi_root: str, dry_run: bool, stdout, style):
         for midi_file in mid_files:
             # Store relative path from midi_root for portability
             rel_midi = os.path.join(rel, midi_file)
-            exercise = get_or_create_exercise(rel_midi, dry_run)
+            exercise = get_or_create_exercise(rel_midi, os.path.join(dirpath, midi_file), dry_run)
             if not dry_run:
                 lesson.exercises.add(exercise)
             exercises_created += 1
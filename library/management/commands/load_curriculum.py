@@ -0,0 +1,74 @@
+"""
+Management command: load_curriculum
+
+Loads a snapshot written by export_curriculum (see library/snapshot.py).
+Rows are bulk-inserted with their original ids in one transaction, media
+blobs are written to exercise storage, and the curriculum version and
+search index are refreshed.
+
+The curriculum tables must be empty unless --replace is given.  Practice
+data that references lessons or exercises missing from the snapshot makes
+the load fail and roll back.
+
+Usage
+-----
+    python manage.py load_curriculum curriculum-2026-10-19.zip
+    python manage.py load_curriculum curriculum-2026-10-19.zip --replace
+
+Options
+-------
+    path        Snapshot file to load.
+    --replace   Delete the current curriculum first (in the same transaction).
+"""
+
+import time
+import zipfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from ... import snapshot
+
+
+class Command(BaseCommand):
+    help = "Load a curriculum snapshot written by export_curriculum."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Snapshot file to load.")
+        parser.add_argument(
+            "--replace",
+            action="store_true",
+            default=False,
+            help="Delete the current curriculum before loading.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            archive = zipfile.ZipFile(options["path"])
+        except (OSError, zipfile.BadZipFile) as exc:
+            raise CommandError(f"Cannot open snapshot: {exc}")
+
+        started = time.perf_counter()
+        try:
+            with archive, transaction.atomic():
+                if options["replace"]:
+                    snapshot.clear()
+                elif not snapshot.is_empty():
+                    raise CommandError("The curriculum is not empty; use --replace to overwrite it.")
+
+                loaded = snapshot.load(
+                    archive,
+                    on_model=lambda label, rows: self.stdout.write(f"  ✓  {label}: {rows}"),
+                )
+        except snapshot.SnapshotError as exc:
+            raise CommandError(str(exc))
+        except IntegrityError as exc:
+            raise CommandError(
+                f"Load rolled back — existing rows reference curriculum missing from the snapshot: {exc}"
+            )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write("")
+        self.stdout.write(self.style.SUCCESS(
+            f"Done.  Rows: {sum(loaded.values())}  |  {elapsed:.1f}s"
+        ))
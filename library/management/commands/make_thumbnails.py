@@ -0,0 +1,50 @@
+"""
+Management command: make_thumbnails
+
+Makes the list thumbnails (see library/thumbnails.py) of every exercise
+whose thumbnail is missing or was made from an older svg / midi.  Saving an
+exercise makes its own once the transaction commits; this catches rows
+written without signals — bulk writes, imports and prune_media renaming
+files — and runs from cron every few minutes (see rea.cron).
+
+Usage
+-----
+    python manage.py make_thumbnails
+    python manage.py make_thumbnails --dry-run
+
+Options
+-------
+    --dry-run   Report how many exercises need a thumbnail without making any.
+"""
+
+from django.core.management.base import BaseCommand
+
+from ... import thumbnails
+
+
+BATCH_SIZE = 100
+
+
+class Command(BaseCommand):
+    help = "Make the missing or outdated exercise list thumbnails."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            default=False,
+            help="Report what would be made without writing anything.",
+        )
+
+    def handle(self, *args, **options):
+        exercises = thumbnails.stale().order_by("pk")
+        if options["dry_run"]:
+            self.stdout.write(f"Exercises needing a thumbnail: {exercises.count()}")
+            return
+
+        total = 0
+        for exercise in exercises.iterator(chunk_size=BATCH_SIZE):
+            thumbnails.ensure([exercise])
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Done.  Exercises updated: {total}"))
@@ -0,0 +1,177 @@
+"""
+Management command: prune_media
+
+Garbage-collects superseded exercise media.
+
+Exercise files are stored under content-fingerprinted names (see
+library/storage.py), so replacing a MIDI or SVG leaves the previous version
+on disk under its old name, and so does the list thumbnail made from it
+(see library/thumbnails.py).  This command deletes fingerprinted files that
+no Exercise references any more.  Files younger than --min-age are kept so
+uploads whose row hasn't been committed yet are never collected.
+
+Run it on a schedule (see rea.cron).
+
+Usage
+-----
+    python manage.py prune_media
+    python manage.py prune_media --dry-run
+    python manage.py prune_media --min-age 72
+    python manage.py prune_media --fingerprint
+
+Options
+-------
+    --dry-run       Report what would be changed without touching anything.
+    --min-age       Minimum age in hours before an unreferenced file is deleted
+                    (default: 24).
+    --fingerprint   First re-store referenced files that predate fingerprinting
+                    (e.g. older imports) under content-hash names and point their
+                    Exercise rows at the new names.
+"""
+
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ...models import Exercise
+from ...storage import exercise_storage, is_fingerprinted
+
+
+FILE_FIELDS = ("midi", "svg", "thumbnail")
+BATCH_SIZE = 500
+
+
+def referenced_names() -> set:
+    names = set()
+    for row in Exercise.objects.values_list(*FILE_FIELDS).iterator(chunk_size=2000):
+        names.update(name for name in row if name)
+    return names
+
+
+def media_roots(names) -> set:
+    """
+    Top-level media directories that hold exercise files.
+
+    Covers the fields' upload_to folders plus the first path segment of
+    every referenced name (imports keep the midi_lessons folder layout).
+    Only these directories are scanned; the rest of MEDIA_ROOT is left alone.
+    """
+    roots = {Exercise._meta.get_field(f).upload_to for f in FILE_FIELDS}
+    for name in names:
+        head = name.replace("\\", "/").split("/", 1)[0]
+        if head and head != name:
+            roots.add(head)
+    return roots
+
+
+def fingerprint_legacy(dry_run: bool, stdout, style) -> int:
+    """Re-store un-fingerprinted files under hashed names. Returns rows updated."""
+    pending = []
+    updated = 0
+
+    legacy = Exercise.objects.only("id", *FILE_FIELDS).iterator(chunk_size=BATCH_SIZE)
+    for exercise in legacy:
+        changed = False
+        for field in FILE_FIELDS:
+            field_file = getattr(exercise, field)
+            if not field_file or is_fingerprinted(field_file.name):
+                continue
+            if not exercise_storage.exists(field_file.name):
+                stdout.write(style.WARNING(f"  Missing file for exercise {exercise.pk}: {field_file.name}"))
+                continue
+            if dry_run:
+                stdout.write(f"  [DRY RUN] Would fingerprint: {field_file.name}")
+                continue
+            with exercise_storage.open(field_file.name, "rb") as src:
+                new_name = exercise_storage.save(field_file.name, src)
+            stdout.write(f"  ✓  {field_file.name} → {new_name}")
+            setattr(exercise, field, new_name)
+            changed = True
+
+        if changed:
+            pending.append(exercise)
+        if len(pending) >= BATCH_SIZE:
+            Exercise.objects.bulk_update(pending, FILE_FIELDS)
+            updated += len(pending)
+            pending = []
+
+    if pending:
+        Exercise.objects.bulk_update(pending, FILE_FIELDS)
+        updated += len(pending)
+    return updated
+
+
+class Command(BaseCommand):
+    help = "Delete exercise media files that are no longer referenced by any Exercise."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            default=False,
+            help="Report what would be deleted without touching the filesystem.",
+        )
+        parser.add_argument(
+            "--min-age",
+            type=float,
+            default=24,
+            help="Only delete unreferenced files older than this many hours (default: 24).",
+        )
+        parser.add_argument(
+            "--fingerprint",
+            action="store_true",
+            default=False,
+            help="Re-store referenced files that lack a content hash before pruning.",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        min_age = options["min_age"]
+        if min_age < 0:
+            raise CommandError("--min-age must not be negative.")
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING("--- DRY RUN — nothing will be changed ---\n"))
+
+        if options["fingerprint"]:
+            self.stdout.write("Fingerprinting legacy exercise files…")
+            with transaction.atomic():
+                updated = fingerprint_legacy(dry_run, self.stdout, self.style)
+            self.stdout.write(self.style.SUCCESS(f"  Exercises updated: {updated}\n"))
+
+        names = referenced_names()
+        cutoff = time.time() - min_age * 3600
+        deleted = kept = 0
+        freed = 0
+
+        for root in sorted(media_roots(names)):
+            root_path = exercise_storage.path(root)
+            if not os.path.isdir(root_path):
+                continue
+            for dirpath, _dirnames, filenames in os.walk(root_path):
+                for filename in filenames:
+                    if not is_fingerprinted(filename):
+                        continue
+                    full_path = os.path.join(dirpath, filename)
+                    name = os.path.relpath(full_path, exercise_storage.location).replace(os.sep, "/")
+                    if name in names:
+                        continue
+                    stat = os.stat(full_path)
+                    if stat.st_mtime > cutoff:
+                        kept += 1
+                        continue
+                    if dry_run:
+                        self.stdout.write(f"    [DRY RUN] Would delete: {name}")
+                    else:
+                        exercise_storage.delete(name)
+                        self.stdout.write(f"  ✗  {name}")
+                    deleted += 1
+                    freed += stat.st_size
+
+        self.stdout.write("")
+        self.stdout.write(self.style.SUCCESS(
+            f"Done.  Deleted: {deleted} ({freed / 1024 / 1024:.1f} MB)  |  "
+            f"Kept (younger than {min_age:g}h): {kept}"
+        ))
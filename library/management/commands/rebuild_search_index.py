@@ -0,0 +1,34 @@
+"""
+Management command: rebuild_search_index
+
+Rebuilds the full-text lesson search index (see library/search.py) from
+the curriculum tables.  Saves and deletes keep the index current; run this
+after writes that bypass signals (raw SQL, ``QuerySet.update`` on group
+names, deleting keys) or to compact the index.
+
+Usage
+-----
+    python manage.py rebuild_search_index
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ... import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text lesson search index."
+
+    def handle(self, *args, **options):
+        if not search.available():
+            raise CommandError("Full-text search needs the SQLite backend (FTS5).")
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            indexed = search.rebuild()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(f"Done.  Lessons indexed: {indexed}  |  {elapsed:.2f}s"))
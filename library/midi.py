@@ -0,0 +1,223 @@
+"""
+Minimal Standard MIDI File support.
+
+Notes are plain dicts measured in quarter-note beats:
+
+    {"pitch": 60, "beat": 0.0, "duration": 1.0}
+
+which is the shape generated dictations are stored in.  Only what the app
+needs is implemented: a single-track (format 0) writer with tempo and time
+signature meta events, and a reader that extracts notes (with start/end
+times in seconds from the file's tempo map) from format 0/1 files.
+"""
+
+import struct
+
+
+PPQ = 480
+
+# The tempo meta event holds microseconds per quarter note in three bytes
+MAX_TEMPO_US = 0xFFFFFF
+MIN_TEMPO = -(-60_000_000 // MAX_TEMPO_US)  # 4 BPM
+MAX_TEMPO = 60_000_000  # one microsecond per beat
+
+
+def _var_len(value: int) -> bytes:
+    """Encode ``value`` as a MIDI variable-length quantity."""
+    buf = [value & 0x7F]
+    value >>= 7
+    while value:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    return bytes(reversed(buf))
+
+
+def parse_meter(meter: str):
+    """
+    ``(numerator, denominator)`` of a time signature such as "6/8".
+
+    Raises ValueError unless both fit a MIDI time signature event: a
+    numerator of 1–255 and a power-of-two denominator.
+    """
+    try:
+        numerator, denominator = (int(part) for part in meter.split("/"))
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid meter {meter!r}; expected e.g. '4/4'.") from None
+    if not 0 < numerator <= 0xFF or denominator <= 0 or denominator & (denominator - 1):
+        raise ValueError(f"Invalid meter {meter!r}; expected e.g. '4/4'.")
+    return numerator, denominator
+
+
+def check_tempo(tempo) -> None:
+    """Raise ValueError unless ``tempo`` (BPM) fits a MIDI tempo event."""
+    if not MIN_TEMPO <= tempo <= MAX_TEMPO:
+        raise ValueError(f"Tempo must be between {MIN_TEMPO} and {MAX_TEMPO} BPM, got {tempo}.")
+
+
+def write_midi(notes, tempo: int = 120, meter: str = "4/4", velocity: int = 90) -> bytes:
+    """
+    Render ``notes`` as a format-0 MIDI file and return its bytes.
+
+    Raises ValueError for a tempo or meter a MIDI file cannot express.
+    """
+    check_tempo(tempo)
+    numerator, denominator = parse_meter(meter)
+
+    events = []  # (tick, order, bytes) — note-offs sort before note-ons at equal ticks
+    for note in notes:
+        start = round(note["beat"] * PPQ)
+        end = start + max(1, round(note["duration"] * PPQ))
+        events.append((start, 1, bytes((0x90, note["pitch"], velocity))))
+        events.append((end, 0, bytes((0x80, note["pitch"], 0))))
+    events.sort(key=lambda e: (e[0], e[1]))
+
+    track = bytearray()
+    track += b"\x00\xff\x51\x03" + (60_000_000 // tempo).to_bytes(3, "big")
+    track += b"\x00\xff\x58\x04" + bytes(
+        (numerator, denominator.bit_length() - 1, 24, 8)
+    )
+
+    last_tick = 0
+    for tick, _order, data in events:
+        track += _var_len(tick - last_tick) + data
+        last_tick = tick
+    track += b"\x00\xff\x2f\x00"
+
+    header = b"MThd" + struct.pack(">IHHH", 6, 0, 1, PPQ)
+    return header + b"MTrk" + struct.pack(">I", len(track)) + bytes(track)
+
+
+# ---------------------------------------------------------------------------
+# Reader
+# ---------------------------------------------------------------------------
+
+DEFAULT_TEMPO_US = 500_000  # 120 BPM
+
+
+def _read_var_len(data: bytes, pos: int):
+    value = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            return value, pos
+
+
+def _parse_track(data: bytes):
+    """Yield (tick, status, payload) for every event in one MTrk chunk."""
+    pos = 0
+    tick = 0
+    running = None
+    while pos < len(data):
+        delta, pos = _read_var_len(data, pos)
+        tick += delta
+        status = data[pos]
+        if status & 0x80:
+            pos += 1
+        elif running is None:
+            raise ValueError("MIDI data byte without running status.")
+        else:
+            status = running
+
+        if status == 0xFF:
+            meta_type = data[pos]
+            length, pos = _read_var_len(data, pos + 1)
+            yield tick, (0xFF, meta_type), data[pos:pos + length]
+            pos += length
+        elif status in (0xF0, 0xF7):
+            length, pos = _read_var_len(data, pos)
+            pos += length
+        else:
+            running = status
+            size = 1 if status & 0xF0 in (0xC0, 0xD0) else 2
+            yield tick, status, data[pos:pos + size]
+            pos += size
+
+
+def read_midi(data: bytes):
+    """
+    Extract notes from a Standard MIDI File.
+
+    Returns a list of dicts sorted by onset::
+
+        {"pitch": 60, "beat": 0.0, "duration": 1.0, "start": 0.0, "end": 0.5}
+
+    where ``beat``/``duration`` are in quarter notes and ``start``/``end`` in
+    seconds according to the file's tempo map.  Raises ValueError for
+    anything that is not a well-formed file, truncated uploads included.
+    """
+    try:
+        return _read_midi(data)
+    except (IndexError, struct.error) as exc:
+        raise ValueError("Truncated or malformed MIDI file.") from exc
+
+
+def _read_midi(data: bytes):
+    if data[:4] != b"MThd":
+        raise ValueError("Not a Standard MIDI File.")
+    header_len, _fmt, n_tracks, division = struct.unpack(">IHHH", data[4:14])
+    if division & 0x8000:
+        raise ValueError("SMPTE time division is not supported.")
+    if division == 0:
+        raise ValueError("MIDI file has no ticks per quarter note.")
+
+    pos = 8 + header_len
+    tempo_changes = []  # (tick, microseconds per quarter)
+    raw_notes = []      # (start_tick, end_tick, pitch)
+
+    for _ in range(n_tracks):
+        if data[pos:pos + 4] != b"MTrk":
+            raise ValueError("Malformed MIDI track chunk.")
+        (length,) = struct.unpack(">I", data[pos + 4:pos + 8])
+        track = data[pos + 8:pos + 8 + length]
+        pos += 8 + length
+
+        sounding = {}  # (channel, pitch) → [start ticks]
+        for tick, status, payload in _parse_track(track):
+            if status == (0xFF, 0x51):
+                tempo_changes.append((tick, int.from_bytes(payload, "big")))
+                continue
+            if not isinstance(status, int):
+                continue
+            kind, channel = status & 0xF0, status & 0x0F
+            if kind == 0x90 and payload[1] > 0:
+                sounding.setdefault((channel, payload[0]), []).append(tick)
+            elif kind == 0x80 or (kind == 0x90 and payload[1] == 0):
+                starts = sounding.get((channel, payload[0]))
+                if starts:
+                    raw_notes.append((starts.pop(0), tick, payload[0]))
+
+    tempo_changes.sort()
+    if not tempo_changes or tempo_changes[0][0] != 0:
+        tempo_changes.insert(0, (0, DEFAULT_TEMPO_US))
+
+    def seconds(tick):
+        elapsed = 0.0
+        for i, (change_tick, tempo) in enumerate(tempo_changes):
+            next_tick = tempo_changes[i + 1][0] if i + 1 < len(tempo_changes) else None
+            if next_tick is not None and tick > next_tick:
+                elapsed += (next_tick - change_tick) * tempo / division / 1e6
+                continue
+            return elapsed + (tick - change_tick) * tempo / division / 1e6
+        return elapsed
+
+    notes = [
+        {
+            "pitch": pitch,
+            "beat": start / division,
+            "duration": (end - start) / division,
+            "start": seconds(start),
+            "end": seconds(end),
+        }
+        for start, end, pitch in sorted(raw_notes)
+    ]
+    return notes
+
+
+def retime(notes, tempo: float):
+    """Recompute ``start``/``end`` (seconds) of read_midi notes at a fixed tempo."""
+    for note in notes:
+        note["start"] = note["beat"] * 60 / tempo
+        note["end"] = (note["beat"] + note["duration"]) * 60 / tempo
+    return notes
@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-19 10:19
+
+from django.db import migrations, models
+import library.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0006_approach_category_key_lessontype_lessongroup_and_more"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="exercise",
+            name="midi",
+            field=models.FileField(
+                blank=True,
+                null=True,
+                storage=library.storage.ContentHashStorage(),
+                upload_to="midi",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="exercise",
+            name="svg",
+            field=models.FileField(
+                blank=True,
+                null=True,
+                storage=library.storage.ContentHashStorage(),
+                upload_to="svg",
+            ),
+        ),
+    ]
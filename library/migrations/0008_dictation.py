@@ -0,0 +1,99 @@
+# Generated by Django 4.2 on 2026-10-19 10:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0007_exercise_content_hash_storage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DictationRule",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=120)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("rhythmic", "Rhythmic"), ("melodic", "Melodic")],
+                        default="melodic",
+                        max_length=10,
+                    ),
+                ),
+                ("meter", models.CharField(default="4/4", max_length=5)),
+                ("measures", models.PositiveSmallIntegerField(default=2)),
+                ("tempo", models.PositiveSmallIntegerField(default=90)),
+                ("note_values", models.JSONField(blank=True, default=list)),
+                ("scale_degrees", models.JSONField(blank=True, default=list)),
+                ("intervals", models.JSONField(blank=True, default=list)),
+                ("seed", models.PositiveIntegerField(default=0)),
+                ("pool_size", models.PositiveIntegerField(default=200)),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("modified", models.DateTimeField(auto_now=True)),
+                (
+                    "key",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Tonality for melodic material. Defaults to C Major when empty.",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="dictation_rules",
+                        to="library.key",
+                    ),
+                ),
+                (
+                    "lesson_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="dictation_rules",
+                        to="library.lessontype",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["lesson_type", "name"],
+            },
+        ),
+        migrations.CreateModel(
+            name="DictationExercise",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("index", models.PositiveIntegerField()),
+                ("seed", models.BigIntegerField()),
+                ("notes", models.JSONField()),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                (
+                    "rule",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pool",
+                        to="library.dictationrule",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["rule", "index"],
+                "unique_together": {("rule", "index")},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-19 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0008_dictation"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="exercise",
+            index=models.Index(
+                fields=["-created", "id"], name="exercise_created_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(
+                fields=["order", "folder_name", "id"], name="lesson_order_folder_id_idx"
+            ),
+        ),
+    ]
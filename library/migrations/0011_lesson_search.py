@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-19 15:40
+
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    # FTS5 is SQLite-only; elsewhere search falls back to LIKE (library/search.py)
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    from library import search
+
+    search.rebuild()
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS library_lesson_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0010_curriculum_version"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
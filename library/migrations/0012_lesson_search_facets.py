@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-19 16:20
+
+from django.db import migrations
+
+
+def create_facets(apps, schema_editor):
+    # Creates the facet table beside the FTS index and refills both
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    from library import search
+
+    search.rebuild()
+
+
+def drop_facets(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS library_lesson_search_facets")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0011_lesson_search"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_facets, drop_facets),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2 on 2026-10-19 16:45
+
+from django.db import migrations, models
+import library.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0012_lesson_search_facets"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exercise",
+            name="thumbnail",
+            field=models.FileField(
+                blank=True,
+                editable=False,
+                storage=library.storage.ContentHashStorage(),
+                upload_to="thumbnails",
+            ),
+        ),
+        migrations.AddField(
+            model_name="exercise",
+            name="thumbnail_source",
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2 on 2026-10-19 17:30
+
+import django.core.validators
+from django.db import migrations, models
+import library.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0013_exercise_thumbnail"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="dictationrule",
+            name="meter",
+            field=models.CharField(
+                default="4/4", max_length=5, validators=[library.models.validate_meter]
+            ),
+        ),
+        migrations.AlterField(
+            model_name="dictationrule",
+            name="tempo",
+            field=models.PositiveSmallIntegerField(
+                default=90, validators=[django.core.validators.MinValueValidator(4)]
+            ),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2 on 2026-10-19 17:45
+
+import django.core.validators
+from django.db import migrations, models
+import library.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0014_dictationrule_tempo_meter_validators"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="dictationrule",
+            name="intervals",
+            field=models.JSONField(
+                blank=True, default=list, validators=[library.models.validate_steps]
+            ),
+        ),
+        migrations.AlterField(
+            model_name="dictationrule",
+            name="measures",
+            field=models.PositiveSmallIntegerField(
+                default=2,
+                validators=[
+                    django.core.validators.MinValueValidator(1),
+                    django.core.validators.MaxValueValidator(32),
+                ],
+            ),
+        ),
+        migrations.AlterField(
+            model_name="dictationrule",
+            name="note_values",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                validators=[library.models.validate_note_values],
+            ),
+        ),
+        migrations.AlterField(
+            model_name="dictationrule",
+            name="pool_size",
+            field=models.PositiveIntegerField(
+                default=200, validators=[django.core.validators.MaxValueValidator(2000)]
+            ),
+        ),
+        migrations.AlterField(
+            model_name="dictationrule",
+            name="scale_degrees",
+            field=models.JSONField(
+                blank=True, default=list, validators=[library.models.validate_steps]
+            ),
+        ),
+    ]
@@ -13,7 +13,15 @@ class Exercise(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(auto_now=True)
 
+import math
+
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
+
+from .midi import MIN_TEMPO, parse_meter
+from .storage import exercise_storage
 
 
 class Module(models.Model):
@@ -25,8 +33,9 @@ class Module(models.Model):
 
 
 class Exercise(models.Model):
-    midi = models.FileField(upload_to="midi", blank=True, null=True)
-    svg = models.FileField(upload_to="svg", blank=True, null=True)
+    # Content-fingerprinted names: a media URL never changes its bytes
+    midi = models.FileField(upload_to="midi", storage=exercise_storage, blank=True, null=True)
+    svg = models.FileField(upload_to="svg", storage=exercise_storage, blank=True, null=True)
     category = models.CharField(
         max_length=6,
         choices=(("pitch", "Intonation"), ("rhythm", "Rhythm")),
@@ -35,6 +44,15 @@ class Exercise(models.Model):
     polyphonic = models.BooleanField(default=False)
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(auto_now=True)
+    # Small list preview made from svg or midi (see library/thumbnails.py);
+    # thumbnail_source is the file it was made from, so a new one is made
+    # only when that changes
+    thumbnail = models.FileField(upload_to="thumbnails", storage=exercise_storage, blank=True, editable=False)
+    thumbnail_source = models.CharField(max_length=100, blank=True, editable=False)
+
+    class Meta:
+        # Matches ExercisePagination's keyset ordering
+        indexes = [models.Index(fields=["-created", "id"], name="exercise_created_id_idx")]
 
 
 # ---------------------------------------------------------------------------
@@ -263,6 +281,187 @@ class Lesson(models.Model):
     class Meta:
         ordering = ["order", "folder_name"]
         unique_together = ("group", "folder_name")
+        # Matches LessonPagination's keyset ordering
+        indexes = [
+            models.Index(fields=["order", "folder_name", "id"], name="lesson_order_folder_id_idx")
+        ]
+
+    def __str__(self):
+        return f"{self.group} › {self.title or self.folder_name}"
+
+    @property
+    def lesson_type(self):
+        """
+        The owning LessonType, set on the root group above this lesson.
+
+        Serializers resolve it for a whole page at once and cache it as
+        ``_lesson_type`` (see library/serializers.py attach_ancestry).
+        """
+        if hasattr(self, "_lesson_type"):
+            return self._lesson_type
+        node = self.group
+        while node is not None:
+            if node.lesson_type_id is not None:
+                return node.lesson_type
+            node = node.parent
+        return None
+
+# ---------------------------------------------------------------------------
+# Curriculum version
+#
+# A single row whose counter goes up on every change to the curriculum
+# (categories down to lessons and exercises).  Conditional GET and response
+# caches key on it instead of inspecting the data; see library/versioning.py.
+# ---------------------------------------------------------------------------
+
+
+class CurriculumVersion(models.Model):
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"v{self.version} ({self.changed_at:%Y-%m-%d %H:%M:%S})"
+
+
+# ---------------------------------------------------------------------------
+# Generated dictation
+#
+#   DictationRule      – parameter set for procedurally generated rhythmic or
+#                        melodic dictation, tied to a LessonType (and a Key
+#                        for tonal material)
+#   DictationExercise  – one pre-generated, seeded exercise in a rule's pool
+#
+# Pools are filled ahead of time by `manage.py generate_dictations`, so
+# serving an exercise is a single (rule, index) lookup.
+# ---------------------------------------------------------------------------
+
+
+# Bounds on a rule's generated material, so a pool fills in bounded time
+MAX_MEASURES = 32
+MAX_POOL_SIZE = 2000
+MIN_NOTE_VALUE = 1 / 16  # a sixty-fourth note, in quarter-note beats
+MAX_MIDI_PITCH = 127
+
+
+def validate_meter(value):
+    try:
+        parse_meter(value)
+    except ValueError as exc:
+        raise ValidationError(str(exc))
+
+
+def validate_note_values(value):
+    if not isinstance(value, list) or not all(
+        isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v) for v in value
+    ):
+        raise ValidationError("Enter a list of durations in quarter-note beats, e.g. [1, 0.5].")
+    if any(v < MIN_NOTE_VALUE for v in value):
+        raise ValidationError(f"Durations must be at least {MIN_NOTE_VALUE:g} beats.")
+
+
+def validate_steps(value):
+    """A list of scale degrees or intervals: whole numbers from 0 to 127."""
+    if not isinstance(value, list) or not all(
+        isinstance(v, int) and not isinstance(v, bool) and 0 <= v <= MAX_MIDI_PITCH for v in value
+    ):
+        raise ValidationError(f"Enter a list of whole numbers from 0 to {MAX_MIDI_PITCH}.")
+
+
+class DictationRule(models.Model):
+    """Parameters for generating one family of dictation exercises."""
+
+    RHYTHMIC = "rhythmic"
+    MELODIC = "melodic"
+
+    KIND_CHOICES = [
+        (RHYTHMIC, "Rhythmic"),
+        (MELODIC, "Melodic"),
+    ]
+
+    lesson_type = models.ForeignKey(
+        LessonType, on_delete=models.CASCADE, related_name="dictation_rules"
+    )
+    key = models.ForeignKey(
+        Key,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="dictation_rules",
+        help_text="Tonality for melodic material. Defaults to C Major when empty.",
+    )
+    name = models.CharField(max_length=120)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default=MELODIC)
+
+    meter = models.CharField(max_length=5, default="4/4", validators=[validate_meter])
+    measures = models.PositiveSmallIntegerField(
+        default=2, validators=[MinValueValidator(1), MaxValueValidator(MAX_MEASURES)]
+    )
+    tempo = models.PositiveSmallIntegerField(default=90, validators=[MinValueValidator(MIN_TEMPO)])
+    # Durations in quarter-note beats, e.g. [1, 0.5] = quarters and eighths
+    note_values = models.JSONField(default=list, blank=True, validators=[validate_note_values])
+    # Scale degrees the melody may use (1 = tonic, 8 = upper tonic)
+    scale_degrees = models.JSONField(default=list, blank=True, validators=[validate_steps])
+    # Allowed melodic steps in scale degrees (1 = second, 2 = third …)
+    intervals = models.JSONField(default=list, blank=True, validators=[validate_steps])
+
+    seed = models.PositiveIntegerField(default=0)
+    pool_size = models.PositiveIntegerField(default=200, validators=[MaxValueValidator(MAX_POOL_SIZE)])
+
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["lesson_type", "name"]
+
+    def __str__(self):
+        return f"{self.lesson_type} › {self.name}"
+
+    def clean(self):
+        # dictation.py imports this module
+        from .dictation import DEFAULT_NOTE_VALUES, DEFAULT_SCALE_DEGREES, beats_per_measure, pitch_range
+
+        errors = {}
+        try:
+            validate_meter(self.meter)
+            validate_note_values(self.note_values)
+        except ValidationError:
+            pass  # reported by the field validators
+        else:
+            measure = beats_per_measure(self.meter)
+            if any(v > measure for v in self.note_values or DEFAULT_NOTE_VALUES):
+                errors["note_values"] = f"Durations must fit a {self.meter} measure ({measure:g} beats)."
+
+        if self.kind == self.MELODIC:
+            try:
+                validate_steps(self.scale_degrees)
+            except ValidationError:
+                pass
+            else:
+                low, high = pitch_range(self.key, self.scale_degrees or DEFAULT_SCALE_DEGREES)
+                if low < 0 or high > MAX_MIDI_PITCH:
+                    errors["scale_degrees"] = (
+                        f"These degrees reach MIDI pitches {low}–{high}; they must stay within 0–{MAX_MIDI_PITCH}."
+                    )
+        if errors:
+            raise ValidationError(errors)
+
+
+class DictationExercise(models.Model):
+    """A single pre-generated dictation in a DictationRule's pool."""
+
+    rule = models.ForeignKey(
+        DictationRule, on_delete=models.CASCADE, related_name="pool"
+    )
+    index = models.PositiveIntegerField()
+    seed = models.BigIntegerField()
+    # [{"pitch": 60, "beat": 0.0, "duration": 1.0}, …]
+    notes = models.JSONField()
+
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["rule", "index"]
+        unique_together = ("rule", "index")
 
     def __str__(self):
-        return f"{self.group} › {self.title or self.folder_name}"
\ No newline at end of file
+        return f"{self.rule} #{self.index}"
@@ -0,0 +1,185 @@
+"""
+Keyset (cursor) pagination for the curriculum endpoints.
+
+DRF's PageNumberPagination runs a COUNT(*) over the filtered join on every
+page and reaches deep pages with a growing OFFSET; its CursorPagination only
+keys on the first ordering field and falls back to an offset among ties —
+and most lessons share the same ``order``.  KeysetPagination instead encodes
+the full sort key of the last row (ordering fields plus the primary key as a
+tie-breaker) and continues with
+
+    WHERE a >= :a AND (a > :a OR (a = :a AND b > :b) OR (…  id > :id))
+    ORDER BY a, b, id LIMIT page_size + 1
+
+so, backed by a composite index on the same columns, any page costs the same
+as the first.  Responses have the CursorPagination shape
+(``next`` / ``previous`` / ``results``); ``?page_size=`` is honoured up to
+``max_page_size``.
+
+Ordering fields must be non-null columns.
+"""
+
+import json
+from base64 import b64decode, b64encode
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode_value(value):
+    # Full precision: DjangoJSONEncoder truncates datetimes to milliseconds,
+    # which would make the cursor land between rows
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _flip(field: str) -> str:
+    return field[1:] if field.startswith("-") else f"-{field}"
+
+
+class KeysetPagination(CursorPagination):
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+
+        pk_name = self.model._meta.pk.name
+        ordering = list(self.get_ordering(request, queryset, view))
+        if not any(f.lstrip("-") in (pk_name, "pk") for f in ordering):
+            ordering.append(pk_name)
+        self.key_fields = ordering
+
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor["reverse"])
+        order = [_flip(f) for f in ordering] if reverse else ordering
+
+        queryset = queryset.order_by(*order)
+        if self.cursor is not None:
+            queryset = queryset.filter(self._after(order, self.cursor["values"]))
+
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        if reverse:
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        return rows
+
+    # ------------------------------------------------------------------
+    # Key handling
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _after(order, values):
+        """Rows strictly after ``values`` in ``order`` (a lexicographic comparison)."""
+        clauses = []
+        equal = {}
+        for field, value in zip(order, values):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            clauses.append(Q(**equal, **{f"{name}__{lookup}": value}))
+            equal[name] = value
+
+        # A plain range on the leading column lets the index seek straight
+        # to the cursor instead of scanning from the start
+        first = order[0]
+        lead = Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": values[0]})
+        return lead & reduce(or_, clauses)
+
+    def key_columns(self, request, queryset, view=None):
+        """Columns a ``.values()`` page must include for its cursors."""
+        pk_name = queryset.model._meta.pk.name
+        columns = [f.lstrip("-") for f in self.get_ordering(request, queryset, view)]
+        return [pk_name if c == "pk" else c for c in columns] + [pk_name]
+
+    def _key(self, obj):
+        if isinstance(obj, dict):
+            # A .values() row (see rea/fastlist.py)
+            return [obj[field.lstrip("-")] for field in self.key_fields]
+        values = []
+        for field in self.key_fields:
+            value = obj
+            for part in field.lstrip("-").split("__"):
+                value = getattr(value, part)
+            values.append(value)
+        return values
+
+    def _field(self, name):
+        *path, last = name.split("__")
+        model = self.model
+        for part in path:
+            model = model._meta.get_field(part).related_model
+        return model._meta.get_field(last if last != "pk" else model._meta.pk.name)
+
+    # ------------------------------------------------------------------
+    # Cursor encoding
+    # ------------------------------------------------------------------
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            payload = json.loads(b64decode(encoded.encode("ascii")).decode("utf-8"))
+            values = payload["v"]
+            if len(values) != len(self.key_fields):
+                raise ValueError
+            values = [
+                self._field(f.lstrip("-")).to_python(value)
+                for f, value in zip(self.key_fields, values)
+            ]
+            return {"values": values, "reverse": bool(payload.get("r"))}
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, reverse=False):
+        payload = {"v": self._key(obj)}
+        if reverse:
+            payload["r"] = 1
+        encoded = b64encode(json.dumps(payload, default=_encode_value).encode("utf-8")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_html_context(self):
+        return {
+            "previous_url": self.get_previous_link(),
+            "next_url": self.get_next_link(),
+        }
+
+
+class LessonPagination(KeysetPagination):
+    """Lessons in curriculum order; backed by the (order, folder_name, id) index."""
+
+    ordering = ("order", "folder_name", "id")
+
+
+class ExercisePagination(KeysetPagination):
+    """Newest exercises first; backed by the (-created, id) index."""
+
+    ordering = ("-created", "id")
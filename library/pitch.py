@@ -0,0 +1,415 @@
+"""
+Server-side pitch tracking and assessment.
+
+A NumPy port of the browser detector in static/js/pitch_detector.js.  The
+YIN difference function is computed for every analysis frame of a recording
+at once (via a batched real FFT), and the threshold / local-minimum /
+parabolic-interpolation steps of ``yinPitchDetection`` are applied as array
+operations over all frames, so a full take costs a handful of large NumPy
+calls rather than a Python loop per frame.
+
+Only ``applySmoothingFilter`` and the note-lock buffer of ``decideOnNote``
+(``lock_notes``) run per frame: both are recurrences on previous state, and
+a plain loop over a few thousand floats is cheaper than any vectorised
+reformulation.  ``yin_reference`` is a literal single-frame port kept to
+verify the vectorised code.
+
+Detector settings can be compared on synthetic signals with
+``manage.py benchmark_pitch`` (see library/pitch_signals.py).
+"""
+
+import math
+import wave
+from dataclasses import dataclass
+
+import numpy as np
+
+
+# Defaults mirrored from PitchDetector (static/js/pitch_detector.js)
+A4 = 440.0
+FFT_SIZE = 8192                 # analyser buffer; signal level is measured over it
+WINDOW_SIZE = 4096              # Hann-windowed YIN frame, centred in the buffer
+MIN_FREQ = 80.0
+MAX_FREQ = 1200.0
+YIN_THRESHOLD = 0.15
+SMOOTHING_FACTOR = 0.7
+SMOOTHING_MAX_JUMP = 50.0       # Hz — larger jumps reset the smoother
+NOTE_CONFIDENCE_THRESHOLD = 0.6
+NOTE_STABILITY_PITCH_THRESHOLD = 0.5   # semitones between buffered readings
+NOTE_BUFFER_SIZE = 6                   # stable frames before a note locks
+MIN_LEVEL_DB = -60.0
+BROWSER_FRAME_RATE = 60.0       # requestAnimationFrame cadence
+
+# Grading needs fewer frames than live feedback: 30 per second still puts
+# several frames inside a sixteenth note at 120 BPM, at half the FFT cost.
+FRAME_RATE = 30.0
+
+# Frames are processed in blocks to bound peak memory on long takes
+BLOCK_FRAMES = 512
+
+# Longest recording decoded for grading
+MAX_TAKE_SECONDS = 300
+
+# Only the middle of each expected note is graded, allowing for attack lag
+NOTE_EDGE_TRIM = 0.1
+# Semitone distance at which a frame still counts as the expected note
+# (equivalent to the client's note-name match)
+PITCH_TOLERANCE = 0.5
+
+
+@dataclass
+class PitchTrack:
+    """Per-frame detector output for a recording."""
+
+    times: np.ndarray        # frame centre, seconds
+    frequency: np.ndarray    # smoothed Hz (0 where nothing was detected)
+    confidence: np.ndarray
+    level_db: np.ndarray
+    voiced: np.ndarray       # bool — passes the confidence and level gates
+
+    @property
+    def midi(self) -> np.ndarray:
+        """Fractional MIDI pitch per frame, NaN where unvoiced."""
+        out = np.full(self.frequency.shape, np.nan)
+        mask = self.voiced & (self.frequency > 0)
+        out[mask] = 69 + 12 * np.log2(self.frequency[mask] / A4)
+        return out
+
+
+# ---------------------------------------------------------------------------
+# Audio input
+# ---------------------------------------------------------------------------
+
+def read_wav(fileobj, max_seconds=MAX_TAKE_SECONDS):
+    """
+    Decode a PCM WAV file to mono float32 in [-1, 1]. Returns (samples, rate).
+
+    The length is taken from the header before anything is decoded, and a
+    recording longer than ``max_seconds`` is rejected with ValueError.
+    """
+    try:
+        with wave.open(fileobj, "rb") as wav:
+            channels = wav.getnchannels()
+            width = wav.getsampwidth()
+            rate = wav.getframerate()
+            if rate <= 0:
+                raise ValueError("WAV file has no sample rate.")
+            if wav.getnframes() > max_seconds * rate:
+                raise ValueError(f"Recordings may be at most {max_seconds} seconds long.")
+            raw = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError) as exc:
+        raise ValueError("Recording must be an uncompressed PCM WAV file.") from exc
+    # A truncated upload yields fewer bytes than the header promised
+    raw = raw[:len(raw) - len(raw) % (width * channels)]
+
+    if width == 1:
+        data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        data = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+    elif width == 3:
+        bytes3 = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = bytes3[:, 0] | (bytes3[:, 1] << 8) | (bytes3[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - (1 << 24), ints)
+        data = ints.astype(np.float32) / (1 << 23)
+    elif width == 4:
+        data = np.frombuffer(raw, dtype="<i4").astype(np.float32) / (1 << 31)
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width} bytes.")
+
+    if channels > 1:
+        data = data.reshape(-1, channels).mean(axis=1)
+    return data, rate
+
+
+# ---------------------------------------------------------------------------
+# YIN
+# ---------------------------------------------------------------------------
+
+def _fft_size(n: int) -> int:
+    """Smallest 5-smooth integer ≥ n (fast for NumPy's pocketfft)."""
+    best = 1 << (n - 1).bit_length()
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            size = p35
+            while size < n:
+                size *= 2
+            best = min(best, size)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+def yin_frames(frames, sample_rate, min_freq=MIN_FREQ, max_freq=MAX_FREQ,
+               threshold=YIN_THRESHOLD):
+    """
+    Run ``yinPitchDetection`` on every row of ``frames`` (already windowed).
+
+    Returns ``(frequency, confidence)`` arrays; frequency is 0 where the
+    frame is too short for ``min_freq``.
+    """
+    n_frames, size = frames.shape
+    min_period = int(sample_rate // max_freq)
+    max_period = int(sample_rate // min_freq)
+    if max_period >= size or n_frames == 0:
+        return np.zeros(n_frames), np.zeros(n_frames)
+
+    taus = np.arange(max_period)
+
+    # d(τ) = Σ_{i<W-τ} (x_i - x_{i+τ})²  =  head(τ) + tail(τ) - 2·r(τ)
+    # r(τ) comes from one zero-padded real FFT per frame, in single precision
+    # (twice as fast and well inside the threshold's tolerance).
+    nfft = _fft_size(size + max_period)
+    spectrum = np.fft.rfft(frames.astype(np.float32, copy=False), nfft, axis=1)
+    acf = np.fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, nfft, axis=1)[:, :max_period]
+
+    frames = frames.astype(np.float64, copy=False)
+    energy = np.zeros((n_frames, size + 1))
+    np.cumsum(frames * frames, axis=1, out=energy[:, 1:])
+    head = energy[:, size - taus]
+    tail = energy[:, -1:] - energy[:, taus]
+    diff = np.maximum(head + tail - 2 * acf, 0.0)
+
+    # Cumulative mean normalised difference
+    cmnd = np.zeros_like(diff)
+    running = np.cumsum(diff[:, 1:], axis=1)
+    cmnd[:, 1:] = diff[:, 1:] / (running / taus[1:] + 1e-6)
+
+    # Absolute threshold → walk down to the local minimum; else global minimum
+    search = cmnd[:, min_period:max_period]
+    below = search < threshold
+    has_dip = below.any(axis=1)
+    first = below.argmax(axis=1)
+    rising = np.ones_like(below)
+    rising[:, :-1] = search[:, 1:] >= search[:, :-1]
+    cols = np.arange(search.shape[1])
+    local_min = (rising & (cols >= first[:, None])).argmax(axis=1)
+    period = np.where(has_dip, local_min, search.argmin(axis=1)) + min_period
+
+    # Parabolic interpolation around the chosen period
+    rows = np.arange(n_frames)
+    y1 = cmnd[rows, period]
+    inner = (period > 1) & (period < max_period - 1)
+    y0 = cmnd[rows, np.where(inner, period - 1, period)]
+    y2 = cmnd[rows, np.where(inner, period + 1, period)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shift = (y2 - y0) / (2 * (2 * y1 - y2 - y0))
+    shift = np.where(inner & np.isfinite(shift) & (np.abs(shift) < 1), shift, 0.0)
+
+    frequency = sample_rate / (period + shift)
+    confidence = np.maximum(0.0, 1 - y1)
+    return frequency, confidence
+
+
+def yin_reference(signal, sample_rate, min_freq=MIN_FREQ, max_freq=MAX_FREQ,
+                  threshold=YIN_THRESHOLD):
+    """
+    Line-by-line port of ``yinPitchDetection`` for a single windowed frame.
+
+    Far slower than ``yin_frames``; it exists to check the vectorised
+    version (and any future change to the JS) against the original logic.
+    Returns ``(frequency, confidence)``.
+    """
+    signal = np.asarray(signal, dtype=np.float64)
+    min_period = int(sample_rate // max_freq)
+    max_period = int(sample_rate // min_freq)
+    if max_period >= len(signal):
+        return 0.0, 0.0
+
+    cmnd = np.zeros(max_period)
+    running = 0.0
+    for tau in range(1, max_period):
+        diff = signal[:len(signal) - tau] - signal[tau:]
+        total = float(np.dot(diff, diff))
+        running += total
+        cmnd[tau] = total / (running / tau + 1e-6)
+
+    period = 0
+    for tau in range(min_period, max_period):
+        if cmnd[tau] < threshold:
+            while tau + 1 < max_period and cmnd[tau + 1] < cmnd[tau]:
+                tau += 1
+            period = tau
+            break
+    if period == 0:
+        period = min_period + int(np.argmin(cmnd[min_period:max_period]))
+
+    better = float(period)
+    confidence = 1 - cmnd[period]
+    if 1 < period < max_period - 1:
+        y0, y1, y2 = cmnd[period - 1], cmnd[period], cmnd[period + 1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shift = (y2 - y0) / (2 * (2 * y1 - y2 - y0))
+        if np.isfinite(shift) and abs(shift) < 1:
+            better += shift
+    return sample_rate / better, max(0.0, confidence)
+
+
+def smooth_pitch(frequency, factor=SMOOTHING_FACTOR, max_jump=SMOOTHING_MAX_JUMP,
+                 last=None):
+    """
+    ``applySmoothingFilter`` over a whole track.  ``last`` carries the
+    smoother's state over from a previous call when tracking in chunks.
+    """
+    out = np.empty_like(frequency)
+    for i, value in enumerate(frequency.tolist()):
+        if last is not None and abs(last - value) <= max_jump:
+            value = factor * last + (1 - factor) * value
+        out[i] = last = value
+    return out
+
+
+def track_pitch(samples, sample_rate, frame_rate=FRAME_RATE, fft_size=FFT_SIZE,
+                window_size=WINDOW_SIZE, block_frames=BLOCK_FRAMES, trailing=False,
+                min_freq=MIN_FREQ, max_freq=MAX_FREQ, threshold=YIN_THRESHOLD,
+                smoothing=SMOOTHING_FACTOR, max_jump=SMOOTHING_MAX_JUMP):
+    """
+    Analyse a mono recording the way PitchDetector does, one frame per hop.
+
+    By default each analyser buffer is centred on its frame time, which is
+    best for grading a finished take.  With ``trailing`` the buffer ends at
+    the frame time instead — what the browser's AnalyserNode (and a live
+    stream) sees, including its latency.
+    """
+    hop = max(1, int(round(sample_rate / frame_rate)))
+    samples = np.asarray(samples, dtype=np.float32)
+
+    if trailing:
+        padded = np.pad(samples, (fft_size, 0))
+    else:
+        half = fft_size // 2
+        padded = np.pad(samples, (half, half))
+    n_frames = len(samples) // hop + 1
+    times = np.arange(n_frames) * hop / sample_rate
+
+    # Signal level over the full analyser buffer, from a running energy sum
+    energy = np.concatenate(([0.0], np.cumsum(padded.astype(np.float64) ** 2)))
+    starts = np.arange(n_frames) * hop
+    mean_sq = (energy[starts + fft_size] - energy[starts]) / fft_size
+    with np.errstate(divide="ignore"):
+        level_db = np.where(mean_sq > 0, 10 * np.log10(mean_sq), -100.0)
+
+    window_offset = (fft_size - window_size) // 2
+    windows = np.lib.stride_tricks.sliding_window_view(
+        padded[window_offset:], window_size
+    )[::hop][:n_frames]
+    hann = np.hanning(window_size).astype(np.float32)
+
+    frequency = np.zeros(n_frames)
+    confidence = np.zeros(n_frames)
+    for start in range(0, n_frames, block_frames):
+        block = windows[start:start + block_frames] * hann
+        frequency[start:start + block_frames], confidence[start:start + block_frames] = (
+            yin_frames(block, sample_rate, min_freq, max_freq, threshold)
+        )
+
+    # Keep the smoother's time constant equal to the browser's at 60 fps
+    frequency = smooth_pitch(frequency, smoothing ** (BROWSER_FRAME_RATE / frame_rate), max_jump)
+    voiced = (confidence > NOTE_CONFIDENCE_THRESHOLD) & (level_db > MIN_LEVEL_DB)
+    return PitchTrack(times, frequency, confidence, level_db, voiced)
+
+
+def lock_notes(track, buffer_size=NOTE_BUFFER_SIZE,
+               stability=NOTE_STABILITY_PITCH_THRESHOLD):
+    """
+    Port of ``decideOnNote``'s stability buffer.
+
+    Returns ``[(frame_index, midi), …]`` for every frame on which the
+    browser would emit a locked note (the rounded MIDI number of the mean
+    frequency of the buffer's most common note).
+    """
+    def nearest(frequency):  # Math.round semantics (halves round up)
+        return math.floor(69 + 12 * math.log2(frequency / A4) + 0.5)
+
+    events = []
+    buffer = []  # (nearest midi, frequency)
+    for i, (frequency, voiced) in enumerate(zip(track.frequency.tolist(), track.voiced.tolist())):
+        if not voiced or frequency <= 0:
+            buffer = []
+            continue
+        if buffer and abs(12 * math.log2(frequency / buffer[-1][1])) >= stability:
+            buffer = []
+        buffer.append((nearest(frequency), frequency))
+
+        if len(buffer) >= buffer_size:
+            counts = {}
+            best, mode = 0, buffer[0][0]
+            for note, _f in buffer:
+                counts[note] = counts.get(note, 0) + 1
+                if counts[note] > best:
+                    best, mode = counts[note], note
+            matching = [f for note, f in buffer if note == mode]
+            events.append((i, nearest(sum(matching) / len(matching))))
+            buffer = buffer[-2:]
+    return events
+
+
+# ---------------------------------------------------------------------------
+# Assessment
+# ---------------------------------------------------------------------------
+
+def assess_take(track, notes, offset=0.0, tolerance=PITCH_TOLERANCE):
+    """
+    Grade a pitch track against expected ``notes`` (library.midi.read_midi
+    dicts with ``pitch``/``start``/``end`` in seconds).
+
+    A note counts as correct when at least half of the frames in its graded
+    span are voiced and within ``tolerance`` semitones of the expected pitch.
+    The overall ``score`` is the percentage of correct notes, as in
+    ``calculateAssessmentScore``.
+    """
+    midi = track.midi
+    spans = np.array([graded_span(n, offset) for n in notes], dtype=float).reshape(-1, 2)
+    lo = np.searchsorted(track.times, spans[:, 0], side="left")
+    hi = np.searchsorted(track.times, spans[:, 1], side="left")
+
+    results = [
+        grade_note(note, midi[a:b], tolerance)
+        for note, a, b in zip(notes, lo.tolist(), hi.tolist())
+    ]
+    return summarize(results)
+
+
+def graded_span(note, offset=0.0):
+    """The (start, end) seconds of ``note`` that are graded, after edge trimming."""
+    start = note["start"] + offset
+    end = note["end"] + offset
+    trim = (end - start) * NOTE_EDGE_TRIM
+    return start + trim, end - trim
+
+
+def grade_note(note, span, tolerance=PITCH_TOLERANCE):
+    """
+    Result dict for one note, from the fractional MIDI pitch of every frame
+    in its graded span (NaN for unvoiced frames).
+    """
+    span = np.asarray(span, dtype=float)
+    voiced = span[~np.isnan(span)]
+    deviation = voiced - note["pitch"]
+    in_tune = int(np.count_nonzero(np.abs(deviation) < tolerance))
+    frames = len(span)
+    accuracy = in_tune / frames if frames else 0.0
+    return {
+        "pitch": note["pitch"],
+        "start": round(note["start"], 3),
+        "end": round(note["end"], 3),
+        "frames": frames,
+        "voiced_ratio": round(len(voiced) / frames, 3) if frames else 0.0,
+        "detected": round(float(np.median(voiced)), 2) if len(voiced) else None,
+        "cents": int(round(float(np.median(deviation)) * 100)) if len(voiced) else None,
+        "accuracy": round(accuracy, 3),
+        "correct": accuracy >= 0.5,
+    }
+
+
+def summarize(results):
+    """Overall score for a list of ``grade_note`` results."""
+    correct = sum(1 for r in results if r["correct"])
+    total = len(results)
+    return {
+        "score": round(100 * correct / total, 1) if total else 0.0,
+        "correct_notes": correct,
+        "total_notes": total,
+        "notes": results,
+    }
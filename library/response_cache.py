@@ -0,0 +1,84 @@
+"""
+Versioned response cache for anonymous API reads.
+
+Anonymous GET / HEAD responses of the curriculum endpoints are stored in
+the default cache under a key made of the curriculum version, the scheme,
+host and path, the sorted query string and the negotiated media type —
+responses hold absolute URLs (file fields, pagination links), which differ
+between hosts and between http and https.  Nothing is ever deleted:
+any curriculum write bumps the version (library/versioning.py), after which
+no request computes the old keys again and the stale entries simply expire
+after RESPONSE_CACHE_TIMEOUT seconds.
+
+Only JSON responses are cached — the browsable API embeds a CSRF token.
+"""
+
+from functools import wraps
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.decorators import method_decorator
+from rest_framework.response import Response
+
+from . import versioning
+
+
+CACHED_FORMATS = {"json"}
+
+
+def cache_key(request, version) -> str:
+    query = urlencode(sorted((k, v) for k, values in request.GET.lists() for v in values))
+    variant = f"{request.scheme}://{request.get_host()}{request.path}?{query}|{request.accepted_media_type}"
+    return f"response:{version}:{md5(variant.encode()).hexdigest()}"
+
+
+def _cacheable(request) -> bool:
+    return (
+        request.method in ("GET", "HEAD")
+        and not request.user.is_authenticated
+        and getattr(request.accepted_renderer, "format", None) in CACHED_FORMATS
+    )
+
+
+def cached(view):
+    """Serve a viewset method from the cache; on a miss, mark the response for storing."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _cacheable(request):
+            return view(request, *args, **kwargs)
+
+        key = cache_key(request, versioning.for_request(request).version)
+        hit = cache.get(key)
+        if hit is not None:
+            content, content_type = hit
+            return HttpResponse(content, content_type=content_type)
+
+        request._response_cache_key = key
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+class ResponseCacheMixin:
+    """ViewSet mixin: cache anonymous list and detail responses per curriculum version."""
+
+    @method_decorator(cached)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @method_decorator(cached)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(request, "_response_cache_key", None)
+        if key and isinstance(response, Response) and response.status_code == 200:
+            def store(rendered):
+                cache.set(key, (rendered.content, rendered["Content-Type"]), settings.RESPONSE_CACHE_TIMEOUT)
+            response.add_post_render_callback(store)
+        return response
@@ -0,0 +1,432 @@
+"""
+Full-text lesson search (SQLite FTS5).
+
+``library_lesson_search`` is an FTS5 table with one row per lesson (rowid =
+lesson id) holding the lesson title and folder name, the full group path
+from the root group down ("Octave › Notal › 1_AF-8_1_dio"), the lesson type
+and the key.  A search is one MATCH over that index ranked by bm25, so it
+reads a handful of index pages instead of scanning every title with
+``LIKE '%…%'``.
+
+The index is kept in step with the curriculum by the signal handlers at the
+bottom of this module:
+
+* a lesson save indexes that lesson, a delete removes it;
+* renaming a group, lesson type or key re-indexes the lessons below it.
+
+Bulk writes send no signals — code that uses them must call
+``index_lessons()`` itself (BulkListSerializer does, via the serializer's
+``bulk_saved`` hook).  ``python manage.py rebuild_search_index`` rebuilds
+the whole table.
+
+Results come with facet counts (category, approach, lesson type, key,
+mode) from one grouped query over the matched set; see "Facets" below.
+
+Search terms are split on whitespace and every word becomes a quoted
+prefix phrase, so ``af-8 dio`` finds "1_AF-8_1_dio" and user input can never
+be parsed as FTS5 query syntax.
+
+Every match is ranked; bm25 costs a microsecond or two per matched row, so
+a term matching all of 100,000 lessons takes about 150 ms.
+
+On databases other than SQLite there is no index: searches fall back to a
+case-insensitive match of every word on the title or folder name, in
+curriculum order, without highlights or facets.
+"""
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from rest_framework.filters import SearchFilter
+
+from .models import Approach, Category, Key, Lesson, LessonGroup, LessonType
+
+
+TABLE = "library_lesson_search"
+COLUMNS = ("title", "folder_name", "group_path", "lesson_type", "key")
+# Plain table beside the FTS one: reading unindexed FTS columns for every
+# match is several times slower than a rowid join
+FACET_TABLE = "library_lesson_search_facets"
+# bm25 weights, in COLUMNS order: a hit in the title outranks one in the path
+WEIGHTS = (10.0, 5.0, 2.0, 1.5, 1.5)
+PATH_SEPARATOR = " › "
+
+# Control characters cannot occur in curriculum names; they survive the
+# highlight() call and are swapped for <mark> after HTML-escaping
+_OPEN, _CLOSE = "\x02", "\x03"
+
+CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+        {", ".join(COLUMNS)},
+        tokenize = "unicode61 remove_diacritics 2",
+        prefix = '2 3'
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {FACET_TABLE} (
+        lesson_id INTEGER PRIMARY KEY,
+        lesson_type_id INTEGER,
+        key_id INTEGER
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS {FACET_TABLE}_type ON {FACET_TABLE} (lesson_type_id)",
+    f"CREATE INDEX IF NOT EXISTS {FACET_TABLE}_key ON {FACET_TABLE} (key_id)",
+]
+
+# Walk from each selected lesson's group up to its root, prefixing every
+# ancestor's name to the path and keeping the nearest lesson type and key;
+# rows with next_id NULL are complete.  {where} selects the lessons (alias l).
+_CHAIN_SQL = f"""
+    WITH RECURSIVE up(lesson_id, next_id, path, lesson_type_id, key_id) AS (
+        SELECT l.id, g.parent_id, g.name, g.lesson_type_id, g.key_id
+        FROM library_lesson l JOIN library_lessongroup g ON g.id = l.group_id
+        WHERE {{where}}
+        UNION ALL
+        SELECT up.lesson_id, g.parent_id, g.name || '{PATH_SEPARATOR}' || up.path,
+               COALESCE(up.lesson_type_id, g.lesson_type_id), COALESCE(up.key_id, g.key_id)
+        FROM up JOIN library_lessongroup g ON g.id = up.next_id
+    )
+"""
+
+_INSERT_TEXT_SQL = f"""
+    INSERT INTO {TABLE} (rowid, {", ".join(COLUMNS)})
+    {_CHAIN_SQL}
+    SELECT l.id, l.title, l.folder_name, up.path, COALESCE(lt.name, ''),
+           COALESCE(k.tonic || ' ' || k.mode || ' ' || k.folder_code, '')
+    FROM up
+    JOIN library_lesson l ON l.id = up.lesson_id
+    LEFT JOIN library_lessontype lt ON lt.id = up.lesson_type_id
+    LEFT JOIN library_key k ON k.id = up.key_id
+    WHERE up.next_id IS NULL
+"""
+
+_INSERT_FACETS_SQL = f"""
+    INSERT INTO {FACET_TABLE} (lesson_id, lesson_type_id, key_id)
+    {_CHAIN_SQL}
+    SELECT lesson_id, lesson_type_id, key_id FROM up WHERE next_id IS NULL
+"""
+
+# Lessons anywhere below the groups selected by {where} (alias g)
+_SUBTREE_SQL = """
+    l.group_id IN (
+        WITH RECURSIVE sub(id) AS (
+            SELECT g.id FROM library_lessongroup g WHERE {where}
+            UNION ALL
+            SELECT c.id FROM library_lessongroup c JOIN sub ON c.parent_id = sub.id
+        )
+        SELECT id FROM sub
+    )
+"""
+
+
+def available() -> bool:
+    return connection.vendor == "sqlite"
+
+
+def _delete(cursor, where: str, params) -> None:
+    cursor.execute(f"DELETE FROM {TABLE} WHERE rowid IN ({where})", params)
+    cursor.execute(f"DELETE FROM {FACET_TABLE} WHERE lesson_id IN ({where})", params)
+
+
+def _reindex(where: str, params=()) -> None:
+    """Replace the index rows of the lessons matched by ``where`` (alias l)."""
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        _delete(cursor, f"SELECT l.id FROM library_lesson l WHERE {where}", params)
+        cursor.execute(_INSERT_TEXT_SQL.format(where=where), params)
+        cursor.execute(_INSERT_FACETS_SQL.format(where=where), params)
+
+
+def index_lessons(ids) -> None:
+    ids = list(ids)
+    if ids:
+        _reindex(f"l.id IN ({', '.join(['%s'] * len(ids))})", ids)
+
+
+def index_groups(where: str, params=()) -> None:
+    """Re-index every lesson below the groups matched by ``where`` (alias g)."""
+    _reindex(_SUBTREE_SQL.format(where=where), params)
+
+
+def remove_lessons(ids) -> None:
+    ids = list(ids)
+    if ids and available():
+        with connection.cursor() as cursor:
+            _delete(cursor, ", ".join(["%s"] * len(ids)), ids)
+
+
+def rebuild() -> int:
+    """Rebuild the whole index.  Returns the number of lessons indexed."""
+    if not available():
+        return 0
+    with connection.cursor() as cursor:
+        for statement in CREATE_SQL:
+            cursor.execute(statement)
+        cursor.execute(f"DELETE FROM {TABLE}")
+        cursor.execute(f"DELETE FROM {FACET_TABLE}")
+        cursor.execute(_INSERT_TEXT_SQL.format(where="1"))
+        cursor.execute(_INSERT_FACETS_SQL.format(where="1"))
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {FACET_TABLE}")
+        return cursor.fetchone()[0]
+
+
+# ---------------------------------------------------------------------------
+# Facets
+#
+# Every facet dimension follows from a lesson's (lesson type, key) pair, so
+# one GROUP BY over the matched set yields all of them: category, approach
+# and lesson type through the lesson type, key and mode through the key.
+# Counts are disjunctive — each dimension is counted with every selected
+# filter applied except its own — so the other options of a dimension stay
+# visible after one is picked.
+# ---------------------------------------------------------------------------
+
+FACETS = ("category", "approach", "lesson_type", "key", "mode")
+# Dimensions decided by the lesson type / by the key
+_TYPE_FACETS = ("category", "approach", "lesson_type")
+_KEY_FACETS = ("key", "mode")
+
+# Grouped first, so the name joins run once per group rather than per match
+_FACET_SQL = f"""
+    SELECT f.lesson_type_id, lt.name, a.id, a.name, c.id, c.name,
+           f.key_id, k.tonic, k.mode, f.matches
+    FROM (
+        SELECT facets.lesson_type_id, facets.key_id, count(*) AS matches
+        FROM {TABLE} JOIN {FACET_TABLE} facets ON facets.lesson_id = {TABLE}.rowid
+        WHERE {TABLE} MATCH %s
+        GROUP BY facets.lesson_type_id, facets.key_id
+    ) f
+    LEFT JOIN library_lessontype lt ON lt.id = f.lesson_type_id
+    LEFT JOIN library_approach a ON a.id = lt.approach_id
+    LEFT JOIN library_category c ON c.id = a.category_id
+    LEFT JOIN library_key k ON k.id = f.key_id
+"""
+
+
+def parse_facets(params) -> dict:
+    """Selected facet values from query parameters (ids; ``mode`` by name)."""
+    selected = {}
+    for name in FACETS:
+        value = params.get(name)
+        if not value:
+            continue
+        if name == "mode":
+            if value not in dict(Key.MODE_CHOICES):
+                raise ValueError(f"Unknown mode: {value!r}.")
+            selected[name] = value
+        else:
+            try:
+                selected[name] = int(value)
+            except ValueError:
+                raise ValueError(f"{name} must be an id.")
+    return selected
+
+
+def _facet_rows(cursor, query):
+    categories = dict(Category.CATEGORY_CHOICES)
+    approaches = dict(Approach.APPROACH_CHOICES)
+    modes = dict(Key.MODE_CHOICES)
+    cursor.execute(_FACET_SQL, [query])
+    rows = []
+    for lt_id, lt_name, a_id, a_name, c_id, c_name, k_id, tonic, mode, count in cursor.fetchall():
+        rows.append((
+            {
+                "category": c_id, "approach": a_id, "lesson_type": lt_id,
+                "key": k_id if tonic is not None else None, "mode": mode,
+            },
+            {
+                "category": categories.get(c_name, c_name),
+                "approach": approaches.get(a_name, a_name),
+                "lesson_type": lt_name,
+                "key": f"{tonic} {modes.get(mode, mode)}",
+                "mode": modes.get(mode, mode),
+            },
+            count,
+        ))
+    return rows
+
+
+def _selects(values, selected, skip=None) -> bool:
+    return all(values[name] == value for name, value in selected.items() if name != skip)
+
+
+def facet_counts(rows, selected) -> dict:
+    """``{dimension: [{"value", "label", "count", "selected"}, …]}``, largest first."""
+    facets = {}
+    for name in FACETS:
+        counts, labels = {}, {}
+        for values, names, count in rows:
+            value = values[name]
+            if value is None or not _selects(values, selected, skip=name):
+                continue
+            counts[value] = counts.get(value, 0) + count
+            labels[value] = names[name]
+        facets[name] = [
+            {"value": value, "label": labels[value], "count": count, "selected": selected.get(name) == value}
+            for value, count in sorted(counts.items(), key=lambda item: (-item[1], str(labels[item[0]])))
+        ]
+    return facets
+
+
+def _facet_filter(rows, selected):
+    """SQL narrowing the match to ``selected`` (``"AND …"``), with its parameters."""
+    conditions, params = [], []
+    for names, facet, column in ((_TYPE_FACETS, "lesson_type", "lesson_type_id"), (_KEY_FACETS, "key", "key_id")):
+        chosen = {name: selected[name] for name in names if name in selected}
+        if not chosen:
+            continue
+        allowed = {values[facet] for values, _names, _count in rows if _selects(values, chosen)}
+        allowed = sorted(allowed - {None})
+        if not allowed:
+            return "AND 0", []
+        conditions.append(f"{column} IN ({', '.join(['%s'] * len(allowed))})")
+        params += allowed
+    if not conditions:
+        return "", []
+    return f"AND rowid IN (SELECT lesson_id FROM {FACET_TABLE} WHERE {' AND '.join(conditions)})", params
+
+
+# ---------------------------------------------------------------------------
+# Querying
+# ---------------------------------------------------------------------------
+
+def match_expression(term: str) -> str:
+    """FTS5 query for free text: every word a quoted prefix phrase, all required."""
+    words = term.split()
+    return " ".join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+
+def _highlighted(text: str):
+    return mark_safe(escape(text).replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>"))
+
+
+class Hit:
+    """One ranked match; ``title`` and ``group_path`` carry <mark> highlights."""
+
+    def __init__(self, lesson_id, rank, title, folder_name, group_path, lesson_type, key):
+        self.lesson_id = lesson_id
+        self.rank = rank
+        self.title = _highlighted(title)
+        self.folder_name = _highlighted(folder_name)
+        self.group_path = _highlighted(group_path)
+        self.lesson_type = lesson_type
+        self.key = key
+
+
+class Results:
+    """A page of ranked hits, the total number of matches and the facet counts."""
+
+    def __init__(self, total=0, hits=(), facets=None):
+        self.total = total
+        self.hits = list(hits)
+        self.facets = facets or {name: [] for name in FACETS}
+
+
+def search(term: str, limit: int = 50, offset: int = 0, facets=None) -> Results:
+    """
+    Lessons matching ``term`` and the selected ``facets`` (see parse_facets),
+    best first.  Two queries: facet counts and the page.
+    """
+    query = match_expression(term)
+    if not query:
+        return Results()
+    if not available():
+        return _fallback_search(term, limit, offset)
+    selected = facets or {}
+    highlights = ", ".join(
+        f"highlight({TABLE}, {i}, char(2), char(3))" for i in range(3)
+    )
+    with connection.cursor() as cursor:
+        rows = _facet_rows(cursor, query)
+        total = sum(count for values, _names, count in rows if _selects(values, selected))
+        narrow, narrow_params = _facet_filter(rows, selected)
+        cursor.execute(
+            f"""
+            SELECT rowid, bm25({TABLE}, {", ".join(map(str, WEIGHTS))}) AS score,
+                   {highlights}, lesson_type, key
+            FROM {TABLE} WHERE {TABLE} MATCH %s {narrow}
+            ORDER BY score, rowid LIMIT %s OFFSET %s
+            """,
+            [query] + narrow_params + [limit, offset],
+        )
+        hits = [Hit(*row) for row in cursor.fetchall()]
+    return Results(total, hits, facet_counts(rows, selected))
+
+
+def _fallback_filter(queryset, term: str):
+    """Every word of ``term`` in the title or folder name (no index available)."""
+    for word in term.split():
+        queryset = queryset.filter(Q(title__icontains=word) | Q(folder_name__icontains=word))
+    return queryset
+
+
+def _fallback_search(term: str, limit: int, offset: int) -> Results:
+    lessons = _fallback_filter(Lesson.objects.all(), term)
+    page = lessons.select_related("group").order_by("order", "folder_name", "id")[offset:offset + limit]
+    hits = [
+        Hit(lesson.pk, 0.0, lesson.title, lesson.folder_name, lesson.group.name, "", "")
+        for lesson in page
+    ]
+    return Results(lessons.count(), hits)
+
+
+def matching_ids(term: str) -> RawSQL:
+    """Subquery of the ids of lessons matching ``term``, for ``pk__in=``."""
+    return RawSQL(f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s", [match_expression(term)])
+
+
+class LessonSearchFilter(SearchFilter):
+    """
+    ``?search=`` through the full-text index.  Only narrows the queryset,
+    so the view's ordering and keyset pagination are unaffected.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, "").replace("\x00", "")
+        if not match_expression(term):
+            return queryset
+        if not available():
+            return _fallback_filter(queryset, term)
+        return queryset.filter(pk__in=matching_ids(term))
+
+
+# ---------------------------------------------------------------------------
+# Keeping the index in step
+# ---------------------------------------------------------------------------
+
+def _lesson_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_lessons([instance.pk])
+
+
+def _lesson_deleted(sender, instance, **kwargs):
+    remove_lessons([instance.pk])
+
+
+def _group_saved(sender, instance, created, raw=False, **kwargs):
+    # A new group has no lessons yet
+    if not created and not raw:
+        index_groups("g.id = %s", [instance.pk])
+
+
+def _lesson_type_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        index_groups("g.lesson_type_id = %s", [instance.pk])
+
+
+def _key_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        index_groups("g.key_id = %s", [instance.pk])
+
+
+post_save.connect(_lesson_saved, sender=Lesson, dispatch_uid="search-lesson-save")
+post_delete.connect(_lesson_deleted, sender=Lesson, dispatch_uid="search-lesson-delete")
+post_save.connect(_group_saved, sender=LessonGroup, dispatch_uid="search-group-save")
+post_save.connect(_lesson_type_saved, sender=LessonType, dispatch_uid="search-lesson-type-save")
+post_save.connect(_key_saved, sender=Key, dispatch_uid="search-key-save")
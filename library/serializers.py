@@ -1,10 +1,29 @@
 from typing import List, Optional
 
+from django.db import connection, models, transaction
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Exercise, Category, Approach, LessonType, Key, LessonGroup, Lesson
 
+from rea.fastlist import ValuesListMixin
+from rea.fieldsets import SparseFieldsetMixin
+from . import search, versioning
+from .models import (
+    Exercise, Category, Approach, LessonType, Key, LessonGroup, Lesson,
+    DictationRule, DictationExercise,
+)
 
-class ExerciseSerializer(serializers.ModelSerializer):
+
+MAX_BULK_SIZE = 500
+BULK_BATCH_SIZE = 250
+# Largest value a primary key column holds; bigger ids overflow the query
+MAX_ID = 2 ** 63 - 1
+
+# Five minutes of 48 kHz 16-bit stereo (see pitch.MAX_TAKE_SECONDS)
+MAX_RECORDING_SIZE = 60 * 1024 * 1024
+
+
+class ExerciseSerializer(ValuesListMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Exercise
         fields = [
@@ -19,17 +38,42 @@ class ExerciseSerializer(serializers.ModelSerializer):
         read_only_fields = ["created", "modified"]
 
 
+class AssessmentUploadSerializer(serializers.Serializer):
+    """Input for grading a recorded take of an Exercise."""
+
+    recording = serializers.FileField(help_text="Mono or stereo PCM WAV file.")
+    tempo = serializers.FloatField(
+        required=False,
+        min_value=20,
+        max_value=400,
+        help_text="BPM the take was performed at; defaults to the MIDI file's tempo.",
+    )
+    offset = serializers.FloatField(
+        required=False,
+        default=0.0,
+        min_value=0,
+        help_text="Seconds of lead-in before the first note.",
+    )
+
+    def validate_recording(self, value):
+        if value.size > MAX_RECORDING_SIZE:
+            raise serializers.ValidationError(
+                f"Recordings may be at most {MAX_RECORDING_SIZE // (1024 * 1024)} MB."
+            )
+        return value
+
+
 # ---------------------------------------------------------------------------
 # Lightweight nested read serializers (used inside LessonSerializer)
 # ---------------------------------------------------------------------------
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ["id", "name", "label"]
 
 
-class ApproachSerializer(serializers.ModelSerializer):
+class ApproachSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
 
     class Meta:
@@ -37,7 +81,7 @@ class ApproachSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "category"]
 
 
-class LessonTypeSerializer(serializers.ModelSerializer):
+class LessonTypeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     approach = ApproachSerializer(read_only=True)
 
     class Meta:
@@ -45,13 +89,13 @@ class LessonTypeSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "slug", "approach"]
 
 
-class KeySerializer(serializers.ModelSerializer):
+class KeySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Key
         fields = ["id", "tonic", "mode", "folder_code"]
 
 
-class LessonGroupSerializer(serializers.ModelSerializer):
+class LessonGroupSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Flat representation of a group node.
     Full ancestry is exposed via the read-only `breadcrumb` field so clients
@@ -64,6 +108,7 @@ class LessonGroupSerializer(serializers.ModelSerializer):
     class Meta:
         model = LessonGroup
         fields = ["id", "name", "folder_name", "key", "depth", "breadcrumb"]
+        related_lookups = {"depth": ["parent"], "breadcrumb": ["parent"]}
 
     def get_breadcrumb(self, obj) -> List[str]:
         """Return the chain of group names from root down to this node."""
@@ -79,7 +124,137 @@ class LessonGroupSerializer(serializers.ModelSerializer):
 # Lesson serializers
 # ---------------------------------------------------------------------------
 
-class LessonSerializer(serializers.ModelSerializer):
+def group_keys(group_ids) -> dict:
+    """``{group_id: str(Key)}`` for the nearest Key at or above each group."""
+    groups = {}  # id → (parent_id, key_id)
+    pending = set(group_ids)
+    while pending:
+        rows = LessonGroup.objects.filter(pk__in=pending).values_list("pk", "parent_id", "key_id")
+        for pk, parent_id, key_id in rows:
+            groups[pk] = (parent_id, key_id)
+        pending = {
+            parent for parent, key_id in groups.values()
+            if key_id is None and parent and parent not in groups
+        }
+
+    resolved = {}
+    for group_id in group_ids:
+        node = group_id
+        while node in groups and groups[node][1] is None:
+            node = groups[node][0]
+        if node in groups:
+            resolved[group_id] = groups[node][1]
+
+    names = {key.pk: str(key) for key in Key.objects.filter(pk__in=set(resolved.values()))}
+    return {group_id: names[key_id] for group_id, key_id in resolved.items()}
+
+
+# Walk up from each lesson's group, keeping the nearest lesson type and key,
+# until both are found or the root is reached: that row is the result.
+# UNION (not UNION ALL) stops on a cycle in the tree.
+_NEAREST_SQL = """
+    WITH RECURSIVE up(lesson_id, next_id, lesson_type_id, key_id) AS (
+        SELECT l.id, g.parent_id, g.lesson_type_id, g.key_id
+        FROM library_lesson l JOIN library_lessongroup g ON g.id = l.group_id
+        WHERE l.id IN ({ids})
+        UNION
+        SELECT up.lesson_id, g.parent_id,
+               COALESCE(up.lesson_type_id, g.lesson_type_id), COALESCE(up.key_id, g.key_id)
+        FROM up JOIN library_lessongroup g ON g.id = up.next_id
+        WHERE up.lesson_type_id IS NULL OR up.key_id IS NULL
+    )
+    SELECT lesson_id, lesson_type_id, key_id FROM up
+    WHERE next_id IS NULL OR (lesson_type_id IS NOT NULL AND key_id IS NOT NULL)
+"""
+
+
+def lesson_ancestry(lesson_ids) -> dict:
+    """
+    ``{lesson_id: (LessonType, Key)}`` — the nearest of each set on a group
+    above the lesson (or None), the lesson type with its approach and
+    category.  Three queries however deep the groups are nested.
+    """
+    lesson_ids = list(lesson_ids)
+    if not lesson_ids:
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(_NEAREST_SQL.format(ids=", ".join(["%s"] * len(lesson_ids))), lesson_ids)
+        rows = cursor.fetchall()
+    types = LessonType.objects.select_related("approach__category").in_bulk({row[1] for row in rows if row[1]})
+    keys = Key.objects.in_bulk({row[2] for row in rows if row[2]})
+    return {lesson_id: (types.get(type_id), keys.get(key_id)) for lesson_id, type_id, key_id in rows}
+
+
+# Every group above the groups selected by {ids}
+_ANCESTORS_SQL = """
+    WITH RECURSIVE up(id) AS (
+        SELECT parent_id FROM library_lessongroup WHERE id IN ({ids})
+        UNION
+        SELECT g.parent_id FROM library_lessongroup g JOIN up ON g.id = up.id
+    )
+    SELECT id FROM up WHERE id IS NOT NULL
+"""
+
+
+def link_ancestors(groups) -> None:
+    """
+    Load every group above ``groups`` with one query and link the chains in
+    memory, so walking ``.parent`` (depth, breadcrumb) costs nothing.
+    """
+    groups = [group for group in groups if group is not None]
+    if not groups:
+        return
+    ids = list({group.pk for group in groups})
+    above = LessonGroup.objects.filter(
+        pk__in=RawSQL(_ANCESTORS_SQL.format(ids=", ".join(["%s"] * len(ids))), ids)
+    )
+    by_id = {group.pk: group for group in above}
+    parent_field = LessonGroup._meta.get_field("parent")
+    for group in [*groups, *by_id.values()]:
+        if group.parent_id in by_id:
+            parent_field.set_cached_value(group, by_id[group.parent_id])
+
+
+def attach_ancestry(lessons, groups=False) -> None:
+    """
+    Resolve every lesson's lesson type and key at once, cached on the
+    instances as ``_lesson_type`` (see Lesson.lesson_type) and ``_key``;
+    with ``groups``, also link the chain of groups above each lesson.
+    """
+    lessons = [lesson for lesson in lessons if lesson.pk is not None and not hasattr(lesson, "_key")]
+    if not lessons:
+        return
+    ancestry = lesson_ancestry({lesson.pk for lesson in lessons})
+    for lesson in lessons:
+        lesson._lesson_type, lesson._key = ancestry.get(lesson.pk, (None, None))
+    if groups:
+        link_ancestors(lesson.group for lesson in lessons if lesson.group_id)
+
+
+# Fields read from the groups above a lesson, at any depth
+ANCESTRY_FIELDS = {"lesson_type", "key", "group_detail"}
+
+
+class LessonAncestryListSerializer(serializers.ListSerializer):
+    """Resolves what every lesson in the list needs from the groups above it before rendering."""
+
+    def to_representation(self, data):
+        lessons = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        if ANCESTRY_FIELDS & set(self.child.fields):
+            attach_ancestry(lessons, groups="group_detail" in self.child.fields)
+        return super().to_representation(lessons)
+
+
+class LessonAncestryMixin:
+    """Lesson serializer mixin: lesson type, key and group chain without a query per tree level."""
+
+    def to_representation(self, instance):
+        if ANCESTRY_FIELDS & set(self.fields):
+            attach_ancestry([instance], groups="group_detail" in self.fields)
+        return super().to_representation(instance)
+
+
+class LessonSerializer(LessonAncestryMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Full read/write serializer for Lesson.
 
@@ -89,7 +264,7 @@ class LessonSerializer(serializers.ModelSerializer):
 
     # Read-only expanded fields
     group_detail = LessonGroupSerializer(source="group", read_only=True)
-    lesson_type = serializers.SerializerMethodField(read_only=True)
+    lesson_type = LessonTypeSerializer(read_only=True)
     exercises_detail = ExerciseSerializer(source="exercises", many=True, read_only=True)
 
     # Write fields
@@ -123,23 +298,22 @@ class LessonSerializer(serializers.ModelSerializer):
             "modified",
         ]
         read_only_fields = ["created", "modified"]
+        list_serializer_class = LessonAncestryListSerializer
 
-    def get_lesson_type(self, obj) -> Optional[dict]:
-        """Walk up the group tree to find the owning LessonType."""
-        node = obj.group
-        while node is not None:
-            if node.lesson_type_id is not None:
-                return LessonTypeSerializer(node.lesson_type).data
-            node = node.parent
-        return None
 
-
-class LessonListSerializer(serializers.ModelSerializer):
-    """Compact serializer for list views — avoids heavy nesting."""
+class LessonListSerializer(LessonAncestryMixin, ValuesListMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Compact serializer for list views — avoids heavy nesting.
+    The nested forms of LessonSerializer are available with ?expand=.
+    """
 
     group_name = serializers.CharField(source="group.name", read_only=True)
     key = serializers.SerializerMethodField(read_only=True)
 
+    group_detail = LessonGroupSerializer(source="group", read_only=True)
+    lesson_type = LessonTypeSerializer(read_only=True)
+    exercises_detail = ExerciseSerializer(source="exercises", many=True, read_only=True)
+
     class Meta:
         model = Lesson
         fields = [
@@ -150,12 +324,264 @@ class LessonListSerializer(serializers.ModelSerializer):
             "group_name",
             "key",
             "created",
+            "group_detail",
+            "lesson_type",
+            "exercises_detail",
         ]
+        expandable_fields = ["group_detail", "lesson_type", "exercises_detail"]
+        list_serializer_class = LessonAncestryListSerializer
+        values_columns = {"key": ["group_id"]}
 
     def get_key(self, obj) -> Optional[str]:
+        if hasattr(obj, "_key"):
+            return None if obj._key is None else str(obj._key)
         node = obj.group
         while node is not None:
             if node.key_id is not None:
                 return str(node.key)
             node = node.parent
-        return None
\ No newline at end of file
+        return None
+
+    def values_key(self, rows) -> List[Optional[str]]:
+        """``key`` for .values() rows: one query per group level plus one for the keys."""
+        keys = group_keys({row["group_id"] for row in rows})
+        return [keys.get(row["group_id"]) for row in rows]
+
+
+# ---------------------------------------------------------------------------
+# Bulk writes
+# ---------------------------------------------------------------------------
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    Writes a list payload with a fixed number of queries, whatever its size:
+    ids and references are checked with one query per model, rows are
+    written with one bulk_create and one bulk_update, and many-to-many links
+    with one through-table delete and insert.
+
+    The mode comes from ``context["bulk"]``:
+
+        create  – every item is new
+        update  – every item names an existing ``id``; fields not sent are kept
+        upsert  – items matching an existing row (by ``id``, or else by the
+                  child's ``Meta.bulk_key``) are updated, the rest created
+
+    The child declares the foreign keys and many-to-many fields it accepts
+    as plain ids in ``Meta.bulk_references`` (``{attr: model}``), and may
+    define ``bulk_saved(objs)`` for follow-up work the skipped signals would
+    have done.
+    """
+
+    def validate(self, attrs):
+        if len(attrs) > MAX_BULK_SIZE:
+            raise serializers.ValidationError(f"At most {MAX_BULK_SIZE} items may be sent per request.")
+
+        meta = self.child.Meta
+        model = meta.model
+        mode = self.context.get("bulk", "create")
+
+        for attr, related in getattr(meta, "bulk_references", {}).items():
+            ids = []
+            for item in attrs:
+                value = item.get(attr)
+                if isinstance(value, list):
+                    ids.extend(value)
+                elif value is not None:
+                    ids.append(value)
+            ids = set(self._check_ids(ids, related))
+            known = set(related.objects.filter(pk__in=ids).values_list("pk", flat=True))
+            missing = ids - known
+            if missing:
+                raise serializers.ValidationError(
+                    f"Unknown {related._meta.verbose_name} id(s): {sorted(missing)}"
+                )
+
+        ids = self._check_ids([item["id"] for item in attrs if item.get("id") is not None], model)
+        if mode == "create" and ids:
+            raise serializers.ValidationError("Items to create must not carry an id.")
+        if mode == "update" and len(ids) < len(attrs):
+            raise serializers.ValidationError("Every item to update needs an id.")
+        if len(set(ids)) < len(ids):
+            raise serializers.ValidationError("The same id appears more than once.")
+
+        existing = model.objects.in_bulk(ids)
+        missing = set(ids) - set(existing)
+        if missing:
+            raise serializers.ValidationError(f"Unknown {model._meta.verbose_name} id(s): {sorted(missing)}")
+        self.targets = [existing.get(item.get("id")) for item in attrs]
+
+        key = getattr(meta, "bulk_key", None)
+        if key:
+            self._match_keys(attrs, key, upsert=mode == "upsert")
+        return attrs
+
+    @staticmethod
+    def _check_ids(ids, model):
+        """``ids`` if every one is a positive integer a primary key can hold."""
+        invalid = [
+            value for value in ids
+            if not isinstance(value, int) or isinstance(value, bool) or not 0 < value <= MAX_ID
+        ]
+        if invalid:
+            raise serializers.ValidationError(f"Invalid {model._meta.verbose_name} id(s): {invalid[:10]}")
+        return ids
+
+    def _match_keys(self, attrs, key, upsert):
+        """Reject duplicate natural keys; in upsert mode, match unidentified items by key."""
+        model = self.child.Meta.model
+        seen = set()
+        for item in attrs:
+            if all(k in item for k in key):
+                value = tuple(item[k] for k in key)
+                if value in seen:
+                    raise serializers.ValidationError(f"Duplicate {', '.join(key)}: {value}")
+                seen.add(value)
+
+        new = [i for i, target in enumerate(self.targets) if target is None]
+        if not new:
+            return
+        candidates = model.objects.filter(**{
+            f"{k}__in": {attrs[i][k] for i in new if k in attrs[i]} for k in key
+        })
+        by_key = {tuple(getattr(obj, k) for k in key): obj for obj in candidates}
+        clashes = []
+        for i in new:
+            match = by_key.get(tuple(attrs[i].get(k) for k in key))
+            if match is None:
+                continue
+            if upsert:
+                self.targets[i] = match
+            else:
+                clashes.append(tuple(attrs[i][k] for k in key))
+        if clashes:
+            raise serializers.ValidationError(f"Already exist ({', '.join(key)}): {clashes}")
+
+    def save(self, **kwargs):
+        model = self.child.Meta.model
+        m2m_names = [
+            attr for attr in getattr(self.child.Meta, "bulk_references", {})
+            if model._meta.get_field(attr).many_to_many
+        ]
+        auto_now = [f.name for f in model._meta.concrete_fields if getattr(f, "auto_now", False)]
+        now = timezone.now()
+
+        objs, to_create, to_update, links = [], [], [], []
+        update_fields = set(auto_now)
+        for attrs, instance in zip(self.validated_data, self.targets):
+            attrs = {**attrs, **kwargs}
+            attrs.pop("id", None)
+            m2m = {name: attrs.pop(name) for name in m2m_names if name in attrs}
+            if instance is None:
+                instance = model(**attrs)
+                to_create.append(instance)
+            else:
+                for name, value in attrs.items():
+                    setattr(instance, name, value)
+                for name in auto_now:
+                    setattr(instance, name, now)
+                update_fields.update(attrs)
+                to_update.append(instance)
+            objs.append(instance)
+            links.extend((instance, name, ids) for name, ids in m2m.items())
+
+        with transaction.atomic():
+            model.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+            if to_update:
+                model.objects.bulk_update(to_update, sorted(update_fields), batch_size=BULK_BATCH_SIZE)
+            self._write_links(model, links)
+            # bulk_create / bulk_update send no signals
+            versioning.bump()
+            bulk_saved = getattr(self.child, "bulk_saved", None)
+            if bulk_saved is not None:
+                bulk_saved(objs)
+
+        self.instance = objs
+        return objs
+
+    @staticmethod
+    def _write_links(model, links):
+        """Replace the many-to-many sets in ``links`` with one delete and one insert per field."""
+        for name in {name for _obj, name, _ids in links}:
+            field = model._meta.get_field(name)
+            through = field.remote_field.through
+            source = f"{field.m2m_field_name()}_id"
+            target = f"{field.m2m_reverse_field_name()}_id"
+            owners = {obj.pk: ids for obj, link_name, ids in links if link_name == name}
+
+            through.objects.filter(**{f"{source}__in": owners}).delete()
+            through.objects.bulk_create(
+                [
+                    through(**{source: pk, target: related_id})
+                    for pk, ids in owners.items()
+                    for related_id in dict.fromkeys(ids)
+                ],
+                batch_size=BULK_BATCH_SIZE,
+            )
+
+
+class ExerciseBulkSerializer(serializers.ModelSerializer):
+    """List item for bulk exercise writes (file fields must be uploaded singly)."""
+
+    id = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = Exercise
+        list_serializer_class = BulkListSerializer
+        fields = ["id", "category", "polyphonic", "created", "modified"]
+        read_only_fields = ["created", "modified"]
+
+
+class LessonBulkSerializer(serializers.ModelSerializer):
+    """List item for bulk lesson writes; references are plain ids."""
+
+    id = serializers.IntegerField(required=False)
+    group = serializers.IntegerField(source="group_id")
+    exercise_ids = serializers.ListField(
+        source="exercises",
+        child=serializers.IntegerField(),
+        write_only=True,
+        required=False,
+    )
+
+    class Meta:
+        model = Lesson
+        list_serializer_class = BulkListSerializer
+        fields = ["id", "group", "exercise_ids", "folder_name", "title", "order", "created", "modified"]
+        read_only_fields = ["created", "modified"]
+        # (group, folder_name) is checked for the whole batch at once
+        validators = []
+        bulk_references = {"group_id": LessonGroup, "exercises": Exercise}
+        bulk_key = ("group_id", "folder_name")
+
+    def bulk_saved(self, lessons):
+        # bulk_create / bulk_update bypass the search index signals
+        search.index_lessons(lesson.pk for lesson in lessons)
+
+
+# ---------------------------------------------------------------------------
+# Generated dictation
+# ---------------------------------------------------------------------------
+
+class DictationRuleSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = DictationRule
+        fields = [
+            "id",
+            "name",
+            "kind",
+            "lesson_type",
+            "key",
+            "meter",
+            "measures",
+            "tempo",
+            "note_values",
+            "scale_degrees",
+            "intervals",
+            "pool_size",
+        ]
+
+
+class DictationExerciseSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = DictationExercise
+        fields = ["id", "rule", "index", "seed", "notes"]
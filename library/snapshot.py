@@ -0,0 +1,245 @@
+"""
+Portable curriculum snapshots.
+
+A snapshot is one ZIP file:
+
+    manifest.json            format, creation time, and for every model its
+                             table label, column list and row count
+    data/<model>.jsonl       one JSON array per row, in the manifest's column
+                             order (deflated)
+    blobs/<sha256>           exercise media, stored once per distinct content
+
+Rows keep their primary keys, foreign keys are plain ids, and file fields
+hold ``{"name": …, "sha256": …}`` pointing into blobs/.  Loading bulk-inserts
+each model in dependency order inside one transaction with the ids as they
+were, writes each blob to exercise storage once, and then does what the
+skipped save signals would have done: bumps the curriculum version and
+rebuilds the search index.
+"""
+
+import datetime
+import decimal
+import io
+import json
+import zipfile
+
+from django.core.files.base import ContentFile
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import DateTimeField, FileField
+from django.utils import timezone
+
+from . import search, versioning
+from .models import (
+    Approach, Category, DictationExercise, DictationRule, Exercise, Key, Lesson,
+    LessonGroup, LessonType, Module,
+)
+from .storage import content_digest, exercise_storage
+
+
+FORMAT = "rea-curriculum/1"
+BATCH_SIZE = 1000
+
+# Dependency order; loading inserts in this order and deleting reverses it
+MODELS = [
+    Category,
+    Approach,
+    LessonType,
+    Key,
+    LessonGroup,
+    Exercise,
+    Lesson,
+    Lesson.exercises.through,
+    DictationRule,
+    DictationExercise,
+    Module,
+]
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _label(model) -> str:
+    return model._meta.label_lower
+
+
+def _encode(value):
+    # Full precision: DjangoJSONEncoder would cut datetimes to milliseconds
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def export(path, media: bool = True) -> dict:
+    """Write a snapshot of the whole curriculum to ``path``.  Returns the manifest."""
+    manifest = {
+        "format": FORMAT,
+        "created": timezone.now().isoformat(),
+        "curriculum_version": versioning.current().version,
+        "models": [],
+        "blobs": 0,
+    }
+    blobs = {}  # sha256 -> a file name with that content
+
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for model in MODELS:
+            fields = model._meta.concrete_fields
+            file_fields = {f.attname for f in fields if isinstance(f, FileField)}
+            count = 0
+            with archive.open(f"data/{_label(model)}.jsonl", "w", force_zip64=True) as raw:
+                out = io.TextIOWrapper(raw, encoding="utf-8", newline="\n")
+                rows = model._base_manager.order_by("pk").values_list(*[f.attname for f in fields])
+                for row in rows.iterator(chunk_size=BATCH_SIZE):
+                    values = []
+                    for field, value in zip(fields, row):
+                        if field.attname in file_fields and value:
+                            value = _export_file(blobs, value) if media else {"name": value}
+                        values.append(_encode(value))
+                    out.write(json.dumps(values, ensure_ascii=False, separators=(",", ":")))
+                    out.write("\n")
+                    count += 1
+                out.flush()
+                out.detach()
+            # zipfile allows one open entry at a time: blobs go in afterwards
+            for digest, name in blobs.items():
+                if f"blobs/{digest}" not in archive.NameToInfo:
+                    with exercise_storage.open(name, "rb") as fh:
+                        archive.writestr(f"blobs/{digest}", fh.read())
+            manifest["models"].append({
+                "model": _label(model),
+                "columns": [f.attname for f in fields],
+                "rows": count,
+            })
+
+        manifest["blobs"] = len(blobs)
+        archive.writestr("manifest.json", json.dumps(manifest, indent=2))
+    return manifest
+
+
+def _export_file(blobs, name):
+    if not exercise_storage.exists(name):
+        return {"name": name}
+    with exercise_storage.open(name, "rb") as fh:
+        digest = content_digest(fh)
+    blobs.setdefault(digest, name)
+    return {"name": name, "sha256": digest}
+
+
+# ---------------------------------------------------------------------------
+# Load
+# ---------------------------------------------------------------------------
+
+def read_manifest(archive) -> dict:
+    try:
+        manifest = json.loads(archive.read("manifest.json"))
+    except KeyError:
+        raise SnapshotError("Not a curriculum snapshot: manifest.json is missing.")
+    if manifest.get("format") != FORMAT:
+        raise SnapshotError(f"Unsupported snapshot format: {manifest.get('format')!r}.")
+    return manifest
+
+
+def is_empty() -> bool:
+    return not any(model._base_manager.exists() for model in MODELS)
+
+
+def clear() -> None:
+    """Delete every curriculum row, one statement per table (no signals)."""
+    with connection.cursor() as cursor:
+        for model in reversed(MODELS):
+            cursor.execute(f"DELETE FROM {connection.ops.quote_name(model._meta.db_table)}")
+
+
+def load(archive, on_model=None) -> dict:
+    """
+    Insert every row of an open snapshot ``archive`` (the curriculum tables
+    must be empty).  Call inside a transaction.  Returns ``{label: rows}``.
+    """
+    manifest = read_manifest(archive)
+    by_label = {_label(model): model for model in MODELS}
+    restored = {}  # stored name -> name after restoring
+    loaded = {}
+    # The connection proxy costs a thread-local lookup per use; resolve it once
+    db = connections[DEFAULT_DB_ALIAS]
+
+    for entry in manifest["models"]:
+        model = by_label.get(entry["model"])
+        if model is None:
+            raise SnapshotError(f"Unknown model in snapshot: {entry['model']}.")
+        fields = _fields(model, entry["columns"])
+        converters = [_converter(archive, restored, field, db) for field in fields]
+        # Plain INSERTs rather than bulk_create: no model instances, no
+        # auto_now, and each value is prepared once by its own field
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            connection.ops.quote_name(model._meta.db_table),
+            ", ".join(connection.ops.quote_name(field.column) for field in fields),
+            ", ".join(["%s"] * len(fields)),
+        )
+
+        count = 0
+        with archive.open(f"data/{entry['model']}.jsonl") as raw, connection.cursor() as cursor:
+            batch = []
+            for line in io.TextIOWrapper(raw, encoding="utf-8"):
+                batch.append([
+                    None if value is None else convert(value)
+                    for convert, value in zip(converters, json.loads(line))
+                ])
+                if len(batch) >= BATCH_SIZE:
+                    cursor.executemany(sql, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(sql, batch)
+                count += len(batch)
+
+        loaded[entry["model"]] = count
+        if on_model is not None:
+            on_model(entry["model"], count)
+
+    # Explicit ids leave sequences behind on databases that keep them apart
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), MODELS):
+            cursor.execute(sql)
+
+    # No save signals were sent
+    versioning.bump()
+    search.rebuild()
+    return loaded
+
+
+def _fields(model, columns):
+    by_attname = {field.attname: field for field in model._meta.concrete_fields}
+    missing = [column for column in columns if column not in by_attname]
+    if missing:
+        raise SnapshotError(f"{_label(model)} has no column(s) {', '.join(missing)} in this schema.")
+    return [by_attname[column] for column in columns]
+
+
+def _converter(archive, restored, field, db):
+    """JSON value -> database value for ``field``."""
+    if isinstance(field, FileField):
+        return lambda value: _restore_file(archive, restored, value)
+    if isinstance(field, DateTimeField):
+        # fromisoformat reads our own output several times faster than to_python
+        return lambda value: db.ops.adapt_datetimefield_value(datetime.datetime.fromisoformat(value))
+    return lambda value: field.get_db_prep_save(field.to_python(value), db)
+
+
+def _restore_file(archive, restored, value):
+    if not value:
+        return value  # no file
+    name, digest = value["name"], value.get("sha256")
+    if digest is None:
+        return name  # exported without media
+    if name not in restored:
+        data = archive.read(f"blobs/{digest}")
+        # Content-hashed storage keeps an identical file that is already there
+        restored[name] = exercise_storage.save(name, ContentFile(data))
+    return restored[name]
@@ -0,0 +1,78 @@
+"""
+Content-fingerprinted file storage for exercise media.
+
+Every file is saved as ``<dir>/<stem>.<digest><ext>`` where ``digest`` is a
+prefix of the SHA-256 of its content.  A given URL therefore always serves
+the same bytes, which is what lets nginx send ``/media/`` with
+``Cache-Control: immutable``.  Replacing an exercise file yields a new name;
+the superseded file is left in place until ``prune_media`` collects it.
+"""
+
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+DIGEST_LENGTH = 16
+
+# "<stem>.<16 hex chars>.<ext>" — the fingerprint inserted by ContentHashStorage
+FINGERPRINT_RE = re.compile(r"^(?P<stem>.+)\.(?P<digest>[0-9a-f]{%d})$" % DIGEST_LENGTH)
+
+
+def content_digest(content, chunk_size: int = 64 * 1024) -> str:
+    """SHA-256 hex digest of a Django File (or any object with ``chunks``/``read``)."""
+    sha = hashlib.sha256()
+    if hasattr(content, "seek"):
+        content.seek(0)
+    if hasattr(content, "chunks"):
+        for chunk in content.chunks(chunk_size):
+            sha.update(chunk)
+    else:
+        for chunk in iter(lambda: content.read(chunk_size), b""):
+            sha.update(chunk)
+    if hasattr(content, "seek"):
+        content.seek(0)
+    return sha.hexdigest()
+
+
+def is_fingerprinted(name: str) -> bool:
+    stem, _ = os.path.splitext(os.path.basename(name))
+    return FINGERPRINT_RE.match(stem) is not None
+
+
+def fingerprinted_name(name: str, digest: str) -> str:
+    """Insert ``digest`` into ``name``, replacing any fingerprint already there."""
+    dirname, basename = os.path.split(name)
+    stem, ext = os.path.splitext(basename)
+    match = FINGERPRINT_RE.match(stem)
+    if match:
+        stem = match.group("stem")
+    return os.path.join(dirname, f"{stem}.{digest[:DIGEST_LENGTH]}{ext}")
+
+
+@deconstructible
+class ContentHashStorage(FileSystemStorage):
+    """
+    FileSystemStorage that names files after their content.
+
+    Saving identical bytes twice returns the existing name instead of
+    writing a second copy.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        name = fingerprinted_name(self.generate_filename(name), content_digest(content))
+        if self.exists(name):
+            return name.replace("\\", "/")
+        return super().save(name, content, max_length=max_length)
+
+
+exercise_storage = ContentHashStorage()
@@ -1,3 +1,1095 @@
-from django.test import TestCase
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import struct
+import time
+import wave
+import xml.etree.ElementTree as ET
+import zipfile
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+
+from rea.batch import MAX_BATCH_IDS
+from rea.fastlist import ValuesListMixin
+from users.models import User
+from . import autocomplete, pitch, search, serializers, snapshot, thumbnails, versioning
+from .autocomplete import GROUP, KEY, LESSON, LESSON_TYPE, PrefixIndex
+from .dictation import check_rule, degree_pitch, fill_pool, generate_notes
+from .management.commands.import_lessons import get_or_create_exercise
+from .midi import read_midi, write_midi
+from .models import (
+    MAX_POOL_SIZE, Approach, Category, DictationExercise, DictationRule, Exercise, Key, Lesson, LessonGroup, LessonType,
+)
+from .pitch_signals import sing, suite
+from .storage import exercise_storage, fingerprinted_name, is_fingerprinted
+
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class CurriculumTestMixin:
+    """A lesson type whose lessons sit three group levels below it."""
+
+    @classmethod
+    def make_curriculum(cls):
+        cls.category = Category.objects.create(name=Category.TONAL)
+        cls.approach = Approach.objects.create(category=cls.category, name=Approach.ABSOLUTE)
+        cls.lesson_type = LessonType.objects.create(approach=cls.approach, name="Intervals", slug="intervals")
+        cls.root = LessonGroup.objects.create(lesson_type=cls.lesson_type, name="Octave")
+        cls.middle = LessonGroup.objects.create(parent=cls.root, name="Ascending")
+        cls.leaf = LessonGroup.objects.create(parent=cls.middle, name="Melodic")
+        cls.exercises = Exercise.objects.bulk_create([Exercise() for _ in range(3)])
+
+    @classmethod
+    def add_lessons(cls, group, count, start=0):
+        lessons = [
+            Lesson.objects.create(group=group, folder_name=f"lesson_{i:03}", title=f"Lesson {i}", order=i)
+            for i in range(start, start + count)
+        ]
+        for lesson in lessons:
+            lesson.exercises.set(cls.exercises[:2])
+        return lessons
+
+
+class TemporaryMediaMixin:
+
+    def use_temporary_media(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def write_media(self, name, data, age_hours=0):
+        """Write ``name`` straight to MEDIA_ROOT, bypassing the storage's naming."""
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as fh:
+            fh.write(data)
+        if age_hours:
+            then = time.time() - age_hours * 3600
+            os.utime(path, (then, then))
+        return path
+
+
+def digest(data):
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+class MediaStorageTests(TemporaryMediaMixin, TestCase):
+
+    def setUp(self):
+        self.use_temporary_media()
+
+    def test_names_carry_the_content_digest(self):
+        name = exercise_storage.save("midi/scale.mid", ContentFile(b"MThd one"))
+        self.assertEqual(name, f"midi/scale.{digest(b'MThd one')}.mid")
+        self.assertTrue(is_fingerprinted(name))
+        self.assertFalse(is_fingerprinted("midi/scale.mid"))
+        self.assertFalse(is_fingerprinted("midi/scale.0123.mid"))
+        # Re-saving a fingerprinted name replaces its digest rather than adding one
+        self.assertEqual(fingerprinted_name(name, "f" * 64), f"midi/scale.{'f' * 16}.mid")
+
+    def test_identical_content_is_stored_once(self):
+        first = exercise_storage.save("midi/scale.mid", ContentFile(b"MThd one"))
+        again = exercise_storage.save("midi/scale.mid", ContentFile(b"MThd one"))
+        changed = exercise_storage.save("midi/scale.mid", ContentFile(b"MThd two"))
+        self.assertEqual(again, first)
+        self.assertNotEqual(changed, first)
+        self.assertEqual(sorted(os.listdir(exercise_storage.path("midi"))), sorted(
+            os.path.basename(name) for name in (first, changed)
+        ))
+
+    def test_reimport_matches_a_legacy_name(self):
+        source = self.write_media("import/Tonal/lesson_1/ex.mid", b"MThd one")
+        legacy = Exercise.objects.create(midi="Tonal/lesson_1/ex.mid")
+        exercise = get_or_create_exercise("Tonal/lesson_1/ex.mid", source, dry_run=False)
+        self.assertEqual(exercise.pk, legacy.pk)
+        self.assertEqual(exercise.midi.name, f"Tonal/lesson_1/ex.{digest(b'MThd one')}.mid")
+        self.assertEqual(get_or_create_exercise("Tonal/lesson_1/ex.mid", source, dry_run=False).pk, legacy.pk)
+        self.assertEqual(Exercise.objects.count(), 1)
+
+    def prune(self, *args):
+        call_command("prune_media", *args, stdout=StringIO())
+
+    def test_prune_fingerprints_legacy_files_and_deletes_old_unreferenced_ones(self):
+        self.write_media("midi/legacy.mid", b"MThd legacy", age_hours=48)
+        legacy = Exercise.objects.create(midi="midi/legacy.mid")
+        current = Exercise.objects.create(midi=exercise_storage.save("midi/current.mid", ContentFile(b"MThd now")))
+        superseded = exercise_storage.save("midi/current.mid", ContentFile(b"MThd before"))
+        os.utime(exercise_storage.path(superseded), (time.time() - 48 * 3600,) * 2)
+        fresh = exercise_storage.save("midi/upload.mid", ContentFile(b"MThd uploading"))
+        self.write_media("midi/stray.mid", b"MThd stray", age_hours=48)
+
+        self.prune("--fingerprint", "--dry-run")
+        self.assertEqual(Exercise.objects.get(pk=legacy.pk).midi.name, "midi/legacy.mid")
+        self.assertTrue(exercise_storage.exists(superseded))
+
+        self.prune("--fingerprint")
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.midi.name, f"midi/legacy.{digest(b'MThd legacy')}.mid")
+        self.assertEqual(legacy.midi.read(), b"MThd legacy")
+        self.assertTrue(exercise_storage.exists(current.midi.name))
+        self.assertFalse(exercise_storage.exists(superseded))
+        # Too young to be collected, and names without a hash are never touched
+        self.assertTrue(exercise_storage.exists(fresh))
+        self.assertTrue(exercise_storage.exists("midi/stray.mid"))
+        self.assertTrue(exercise_storage.exists("midi/legacy.mid"))
+
+
+class DictationTests(CurriculumTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.make_curriculum()
+        cls.a_minor = Key.objects.create(tonic="A", mode=Key.MINOR, folder_code="AMinor")
+
+    def rule(self, **params):
+        return DictationRule(lesson_type=self.lesson_type, name="Steps", **params)
+
+    def test_generation_fills_the_measures_from_the_allowed_material(self):
+        rule = self.rule(meter="3/4", measures=3, note_values=[1, 0.5], scale_degrees=[1, 2, 3, 5], intervals=[1])
+        notes = generate_notes(rule, 7)
+        self.assertEqual(generate_notes(rule, 7), notes)
+        self.assertNotEqual(generate_notes(rule, 8), notes)
+        self.assertEqual(sum(note["duration"] for note in notes), 9)
+        self.assertEqual([note["beat"] for note in notes[1:]], [n["beat"] + n["duration"] for n in notes[:-1]])
+        self.assertTrue({note["duration"] for note in notes} <= {1, 0.5})
+        self.assertTrue({note["pitch"] for note in notes} <= {degree_pitch(d, 60) for d in (1, 2, 3, 5)})
+
+    def test_rhythmic_dictation_repeats_the_tonic(self):
+        rule = self.rule(kind=DictationRule.RHYTHMIC, key=self.a_minor, measures=1)
+        self.assertEqual({note["pitch"] for note in generate_notes(rule, 1)}, {69})
+
+    def test_invalid_parameters_are_rejected(self):
+        for field, value in (
+            ("note_values", [0.0]),
+            ("note_values", [-1]),
+            ("note_values", ["x"]),
+            ("note_values", [{"beats": 1}]),
+            ("note_values", [8]),  # longer than a 4/4 measure
+            ("scale_degrees", ["1"]),
+            ("scale_degrees", [200]),
+            ("scale_degrees", [1, 60]),  # above MIDI pitch 127
+            ("intervals", [-1]),
+            ("measures", 0),
+            ("pool_size", MAX_POOL_SIZE + 1),
+        ):
+            with self.subTest(field=field, value=value), self.assertRaises(ValidationError) as raised:
+                check_rule(self.rule(**{field: value}))
+            self.assertIn(field, raised.exception.message_dict)
+        check_rule(self.rule(note_values=[4, 2], scale_degrees=[1, 8, 15], intervals=[0, 7]))
+
+    def test_invalid_rules_are_never_generated(self):
+        rule = DictationRule.objects.create(
+            lesson_type=self.lesson_type, name="Stuck", kind=DictationRule.RHYTHMIC, note_values=[0.0],
+        )
+        with self.assertRaises(ValueError):
+            generate_notes(rule, 1)
+        with self.assertRaises(ValidationError):
+            fill_pool(rule)
+        out = StringIO()
+        call_command("generate_dictations", stdout=out)
+        self.assertIn("Skipping", out.getvalue())
+        self.assertFalse(rule.pool.exists())
+
+    def test_admin_save_leaves_generation_to_the_command(self):
+        admin = User.objects.create_superuser("admin", password="pw")
+        self.client.force_login(admin)
+        rule = DictationRule.objects.create(lesson_type=self.lesson_type, name="Steps", pool_size=3)
+        fill_pool(rule)
+        form = {
+            "lesson_type": self.lesson_type.pk, "key": "", "name": "Steps", "kind": DictationRule.MELODIC,
+            "meter": "4/4", "measures": 2, "tempo": 90, "note_values": "[1]", "scale_degrees": "[]",
+            "intervals": "[]", "seed": 0, "pool_size": 3,
+            # The hidden initial values the admin renders for callable defaults
+            "initial-note_values": "[]", "initial-scale_degrees": "[]", "initial-intervals": "[]",
+        }
+        url = f"/admin/library/dictationrule/{rule.pk}/change/"
+
+        self.assertEqual(self.client.post(url, {**form, "note_values": "[0]"}).status_code, 200)
+        self.assertEqual(rule.pool.count(), 3)
+
+        self.assertEqual(self.client.post(url, {**form, "name": "Renamed", "note_values": "[]"}).status_code, 302)
+        self.assertEqual(rule.pool.count(), 3)
+
+        self.assertEqual(self.client.post(url, form).status_code, 302)
+        self.assertEqual(rule.pool.count(), 0)
+        call_command("generate_dictations", stdout=StringIO())
+        self.assertEqual(
+            [entry.notes[0]["duration"] for entry in DictationExercise.objects.filter(rule=rule)], [1.0] * 3,
+        )
+
+
+def wav_bytes(samples, sample_rate):
+    out = BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+    return out.getvalue()
+
+
+def reference_track(samples, sample_rate, frame_rate=pitch.FRAME_RATE):
+    """track_pitch worked out frame by frame with the literal yin_reference port."""
+    hop = int(round(sample_rate / frame_rate))
+    half = pitch.FFT_SIZE // 2
+    padded = np.pad(np.asarray(samples, dtype=np.float64), (half, half))
+    offset = (pitch.FFT_SIZE - pitch.WINDOW_SIZE) // 2
+    hann = np.hanning(pitch.WINDOW_SIZE)
+    frequency, confidence, level_db = [], [], []
+    n_frames = len(samples) // hop + 1
+    for i in range(n_frames):
+        buffer = padded[i * hop:i * hop + pitch.FFT_SIZE]
+        mean_sq = float(np.mean(buffer * buffer))
+        level_db.append(10 * np.log10(mean_sq) if mean_sq > 0 else -100.0)
+        f, c = pitch.yin_reference(buffer[offset:offset + pitch.WINDOW_SIZE] * hann, sample_rate)
+        frequency.append(f)
+        confidence.append(c)
+    frequency = pitch.smooth_pitch(
+        np.array(frequency), pitch.SMOOTHING_FACTOR ** (pitch.BROWSER_FRAME_RATE / frame_rate)
+    )
+    confidence, level_db = np.array(confidence), np.array(level_db)
+    voiced = (confidence > pitch.NOTE_CONFIDENCE_THRESHOLD) & (level_db > pitch.MIN_LEVEL_DB)
+    return pitch.PitchTrack(np.arange(n_frames) * hop / sample_rate, frequency, confidence, level_db, voiced)
+
+
+def sung_notes(signal, transpose=0):
+    return [{"pitch": midi + transpose, "start": start, "end": start + 0.5} for start, midi in signal.onsets]
+
+
+class PitchTrackingTests(SimpleTestCase):
+    """The vectorised YIN against the literal port, on the synthetic signal suite."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.signals = suite()
+
+    def test_yin_frames_matches_the_reference(self):
+        hann = np.hanning(pitch.WINDOW_SIZE)
+        for signal in self.signals:
+            starts = np.linspace(0, len(signal.samples) - pitch.WINDOW_SIZE, 8).astype(int)
+            frames = np.stack([signal.samples[s:s + pitch.WINDOW_SIZE] * hann for s in starts])
+            frequency, confidence = pitch.yin_frames(frames, signal.sample_rate)
+            for frame, f, c in zip(frames, frequency, confidence):
+                ref_f, ref_c = pitch.yin_reference(frame, signal.sample_rate)
+                with self.subTest(signal=signal.name):
+                    self.assertLess(abs(f - ref_f), 1e-3)
+                    self.assertLess(abs(c - ref_c), 1e-5)
+
+    def test_track_and_assessment_match_the_reference(self):
+        for signal in self.signals:
+            if signal.name not in ("steady_low", "vibrato", "octave_trap", "noise_10db"):
+                continue
+            with self.subTest(signal=signal.name):
+                track = pitch.track_pitch(signal.samples, signal.sample_rate)
+                reference = reference_track(signal.samples, signal.sample_rate)
+                np.testing.assert_array_equal(track.times, reference.times)
+                np.testing.assert_array_equal(track.voiced, reference.voiced)
+                self.assertTrue(track.voiced.any())
+                self.assertLess(np.abs(track.frequency - reference.frequency)[track.voiced].max(), 1e-3)
+                np.testing.assert_allclose(track.level_db, reference.level_db, atol=1e-6)
+
+                result = pitch.assess_take(track, sung_notes(signal))
+                self.assertEqual(result, pitch.assess_take(reference, sung_notes(signal)))
+                self.assertEqual(result["score"], 100.0)
+                self.assertEqual(pitch.assess_take(track, sung_notes(signal, transpose=2))["score"], 0.0)
+
+
+class AssessEndpointTests(TemporaryMediaMixin, TestCase):
+
+    NOTES = [{"pitch": pitch_, "beat": beat, "duration": 1.0} for beat, pitch_ in enumerate([60, 62, 64, 65])]
+
+    def setUp(self):
+        self.use_temporary_media()
+        self.midi = write_midi(self.NOTES, tempo=120)
+        self.exercise = Exercise.objects.create(midi=exercise_storage.save("midi/scale.mid", ContentFile(self.midi)))
+        samples, _f0, _onsets = sing([60, 62, 64, 65], note_length=0.5, gap=0.0, lead_in=0.3)
+        self.take = wav_bytes(samples, 44100)
+        self.client.force_login(User.objects.create_user("student", password="pw", user_type="student"))
+
+    def assess(self, recording, **data):
+        upload = SimpleUploadedFile("take.wav", recording, content_type="audio/wav")
+        return self.client.post(f"/api/exercises/{self.exercise.pk}/assess/", {"recording": upload, **data})
+
+    def test_grades_a_take(self):
+        response = self.assess(self.take, offset=0.3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()["score"], response.json()["total_notes"]), (100.0, 4))
+
+    def test_truncated_midi_is_a_bad_request(self):
+        for cut in range(len(self.midi)):
+            try:
+                read_midi(self.midi[:cut])
+            except ValueError:
+                pass
+        self.exercise.midi = exercise_storage.save("midi/cut.mid", ContentFile(self.midi[:30]))
+        self.exercise.save()
+        response = self.assess(self.take)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("MIDI", response.json()["detail"])
+
+    def test_bad_recordings_are_rejected(self):
+        self.assertEqual(self.assess(b"RIFF not a wave").status_code, 400)
+        # A truncated upload still decodes what arrived
+        self.assertEqual(self.assess(self.take[:len(self.take) // 2 + 1]).status_code, 200)
+
+        # The header claims more than MAX_TAKE_SECONDS: refused before decoding
+        frames = pitch.MAX_TAKE_SECONDS * 44100 + 1
+        header = self.take[:40] + struct.pack("<I", frames * 2)
+        response = self.assess(header + self.take[44:])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("seconds", response.json()["detail"])
+
+        with mock.patch.object(serializers, "MAX_RECORDING_SIZE", 1024):
+            response = self.assess(self.take)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("recording", response.json())
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class LessonTypeQueryTests(CurriculumTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.make_curriculum()
+        cls.user = User.objects.create_user("teacher", password="pw", user_type="teacher")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+
+    def test_lesson_type_found_three_levels_up(self):
+        [lesson] = self.add_lessons(self.leaf, 1)
+        data, _ = self.get(f"/api/lessons/{lesson.pk}/")
+        self.assertEqual(data["lesson_type"]["name"], "Intervals")
+        self.assertEqual(data["lesson_type"]["approach"]["category"]["name"], Category.TONAL)
+        self.assertEqual(data["group_detail"]["breadcrumb"], ["Octave", "Ascending", "Melodic"])
+        self.assertEqual(data["group_detail"]["depth"], 2)
+
+    def test_list_queries_do_not_grow_with_depth_or_page_size(self):
+        self.add_lessons(self.root, 1)
+        data, shallow = self.get("/api/lessons/", expand="lesson_type,group_detail")
+        self.assertEqual(data["results"][0]["lesson_type"]["slug"], "intervals")
+
+        self.add_lessons(self.leaf, 8, start=1)
+        data, deep = self.get("/api/lessons/", expand="lesson_type,group_detail")
+        self.assertEqual(len(data["results"]), 9)
+        self.assertEqual({row["lesson_type"]["slug"] for row in data["results"]}, {"intervals"})
+        self.assertEqual(data["results"][-1]["group_detail"]["breadcrumb"], ["Octave", "Ascending", "Melodic"])
+        self.assertEqual(deep, shallow)
+
+    def test_key_from_any_level_on_both_list_paths(self):
+        self.middle.key = Key.objects.create(tonic="A", mode=Key.MINOR, folder_code="AMinor")
+        self.middle.save()
+        self.add_lessons(self.leaf, 2)
+        self.add_lessons(self.root, 1, start=2)
+        plain, _ = self.get("/api/lessons/")
+        expanded, _ = self.get("/api/lessons/", expand="lesson_type")
+        self.assertEqual([row["key"] for row in plain["results"]], ["A Minor", "A Minor", None])
+        self.assertEqual([row["key"] for row in expanded["results"]], ["A Minor", "A Minor", None])
+
+
+@override_settings(CACHES=LOCMEM_CACHE, ALLOWED_HOSTS=["testserver", "other.example"])
+class ResponseCacheTests(CurriculumTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.make_curriculum()
+        cls.add_lessons(cls.leaf, 3)
+        cls.user = User.objects.create_user("teacher", password="pw", user_type="teacher")
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url="/api/lessons/", **extra):
+        """The response and whether the view read any lessons (a cache miss)."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, **extra)
+        self.assertEqual(response.status_code, 200)
+        return response, any("library_lesson" in q["sql"] for q in queries)
+
+    def test_anonymous_reads_hit_the_cache(self):
+        first, missed = self.get()
+        self.assertTrue(missed)
+        second, missed = self.get()
+        self.assertFalse(missed)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["Content-Type"], first["Content-Type"])
+
+    def test_query_string_host_and_scheme_are_part_of_the_key(self):
+        self.get()
+        for extra in ({"data": {"page_size": 2}}, {"HTTP_HOST": "other.example"}, {"secure": True}):
+            response, missed = self.get(**extra)
+            self.assertTrue(missed, extra)
+        response, _ = self.get(HTTP_HOST="other.example", data={"page_size": 2})
+        self.assertTrue(response.json()["next"].startswith("http://other.example/"))
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        self.client.force_login(self.user)
+        self.assertTrue(self.get()[1])
+        self.assertTrue(self.get()[1])
+        self.client.logout()
+        self.assertTrue(self.get()[1])
+
+    def test_curriculum_change_invalidates(self):
+        self.get()
+        self.add_lessons(self.leaf, 1, start=3)
+        response, missed = self.get()
+        self.assertTrue(missed)
+        self.assertEqual(len(response.json()["results"]), 4)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ConditionalGetTests(CurriculumTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.make_curriculum()
+        cls.add_lessons(cls.leaf, 2)
+        cls.user = User.objects.create_user("teacher", password="pw", user_type="teacher")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def get(self, url="/api/lessons/", **headers):
+        """The response and whether the view read any lessons."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, headers=headers)
+        return response, any("library_lesson" in q["sql"] for q in queries)
+
+    def test_validators_follow_the_version(self):
+        response, _ = self.get()
+        state = versioning.current()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["ETag"].startswith(f'"c{state.version}-'))
+        self.assertEqual(response["Last-Modified"], http_date(state.changed_at.timestamp()))
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertIn("private", response["Cache-Control"])
+
+        # Same version, same validators, on the list and on a detail
+        self.assertEqual(self.get()[0]["ETag"], response["ETag"])
+        detail, _ = self.get(f"/api/lessons/{Lesson.objects.first().pk}/")
+        self.assertEqual(detail["ETag"], response["ETag"])
+
+    def test_not_modified_without_touching_the_data(self):
+        first, _ = self.get()
+        for headers in ({"if-none-match": first["ETag"]}, {"if-modified-since": first["Last-Modified"]}):
+            response, read = self.get(**headers)
+            self.assertEqual(response.status_code, 304, headers)
+            self.assertEqual(response.content, b"")
+            self.assertEqual(response["ETag"], first["ETag"])
+            self.assertFalse(read)
+
+    def test_version_bump_invalidates(self):
+        first, _ = self.get()
+        self.add_lessons(self.leaf, 1, start=2)
+        response, read = self.get(**{"if-none-match": first["ETag"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(read)
+        self.assertNotEqual(response["ETag"], first["ETag"])
+        self.assertEqual(len(response.json()["results"]), 3)
+
+    def test_etag_varies_with_user_and_media_type(self):
+        etag = self.get()[0]["ETag"]
+        self.assertNotEqual(self.get(accept="text/html")[0]["ETag"], etag)
+        self.client.logout()
+        self.assertNotEqual(self.get()[0]["ETag"], etag)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FastListTests(CurriculumTestMixin, TestCase):
+    """The ``.values()`` list path renders exactly what the serializers would."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.make_curriculum()
+        cls.middle.key = Key.objects.create(tonic="A", mode=Key.MINOR, folder_code="AMinor")
+        cls.middle.save()
+        cls.add_lessons(cls.leaf, 3)
+        cls.add_lessons(cls.root, 2, start=3)
+        Exercise.objects.filter(pk=cls.exercises[0].pk).update(
+            midi="exercises/scale.0123456789abcdef.mid", svg="exercises/scale.0123456789abcdef.svg", polyphonic=True,
+        )
+        cls.user = User.objects.create_user("teacher", password="pw", user_type="teacher")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def both(self, url, **params):
+        """The fast-path response and the one rendered by the serializers."""
+        with mock.patch.object(
+            ValuesListMixin, "render_values", autospec=True, side_effect=ValuesListMixin.render_values,
+        ) as render_values:
+            fast = self.client.get(url, params)
+        with mock.patch.object(ValuesListMixin, "values_plan", return_value=None):
+            slow = self.client.get(url, params)
+        self.assertEqual((fast.status_code, slow.status_code), (200, 200))
+        return fast.json(), slow.json(), render_values.called
+
+    def test_exercise_list(self):
+        for params in ({}, {"fields": "id,midi,created"}, {"page_size": 2}, {"category": "pitch"}):
+            fast, slow, used = self.both("/api/exercises/", **params)
+            self.assertTrue(used, params)
+            self.assertEqual(fast, slow, params)
+        fast, _, _ = self.both("/api/exercises/")
+        [row] = [row for row in fast["results"] if row["id"] == self.exercises[0].pk]
+        self.assertTrue(row["midi"].endswith("/exercises/scale.0123456789abcdef.mid"))
+        self.assertTrue(row["polyphonic"])
+
+    def test_lesson_list(self):
+        for params in ({"ordering": "-title"}, {"fields": "id,key,group_name"}, {"page_size": 2}, {}):
+            fast, slow, used = self.both("/api/lessons/", **params)
+            self.assertTrue(used, params)
+            self.assertEqual(fast, slow, params)
+        self.assertEqual([row["key"] for row in fast["results"]], ["A Minor"] * 3 + [None] * 2)
+
+        # Nested expansions have no fast path; both renderings still agree
+        fast, slow, used = self.both("/api/lessons/", expand="lesson_type,exercises_detail")
+        self.assertFalse(used)
+        self.assertEqual(fast, slow)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class BatchLookupTests(CurriculumTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.make_curriculum()
+        cls.lessons = cls.add_lessons(cls.leaf, 5)
+        cls.user = User.objects.create_user("teacher", password="pw", user_type="teacher")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get_ids(self, url, ids):
+        return self.client.get(url, {"ids": ",".join(str(pk) for pk in ids)})
+
+    def test_results_in_requested_order_with_missing(self):
+        a, b, c = (lesson.pk for lesson in self.lessons[:3])
+        absent = max(lesson.pk for lesson in self.lessons) + 1
+        response = self.get_ids("/api/lessons/", [c, absent, a, c, b])
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(
+            [row and row["id"] for row in data["results"]],
+            [c, None, a, c, b],
+        )
+        self.assertEqual(data["missing"], [absent])
+        # The detail representation, not the compact list one
+        self.assertEqual(data["results"][0]["lesson_type"]["slug"], "intervals")
+
+    def test_exercises(self):
+        ids = [self.exercises[2].pk, self.exercises[0].pk]
+        data = self.get_ids("/api/exercises/", ids).json()
+        self.assertEqual([row["id"] for row in data["results"]], ids)
+        self.assertEqual(data["missing"], [])
+
+    def test_fixed_number_of_queries(self):
+        with CaptureQueriesContext(connection) as few:
+            self.get_ids("/api/lessons/", [self.lessons[0].pk])
+        with CaptureQueriesContext(connection) as many:
+            self.get_ids("/api/lessons/", [lesson.pk for lesson in self.lessons])
+        self.assertEqual(len(many), len(few))
+
+    def test_id_limit_and_format(self):
+        response = self.get_ids("/api/lessons/", range(1, MAX_BATCH_IDS + 1))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), MAX_BATCH_IDS)
+
+        response = self.get_ids("/api/lessons/", range(1, MAX_BATCH_IDS + 2))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("ids", response.json())
+
+        response = self.client.get("/api/lessons/", {"ids": "1,two"})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class KeysetPaginationTests(CurriculumTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.make_curriculum()
+        # Lessons tie on order across groups, and on (order, folder_name)
+        # between the two groups; only the id separates those
+        cls.add_lessons(cls.leaf, 4)
+        cls.add_lessons(cls.middle, 3)
+        cls.add_lessons(cls.root, 2, start=1)
+        cls.lessons = list(Lesson.objects.order_by("order", "folder_name", "id").values_list("pk", flat=True))
+        cls.user = User.objects.create_user("teacher", password="pw", user_type="teacher")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def walk(self, url, link, **params):
+        """Ids of every page from ``url`` on, following ``link`` (next / previous)."""
+        pages = []
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            pages.append([row["id"] for row in data["results"]])
+            url, params = data[link], {}
+        return pages
+
+    def test_forward_and_back_through_ties(self):
+        forward = self.walk("/api/lessons/", "next", page_size=2)
+        self.assertEqual([pk for page in forward for pk in page], self.lessons)
+        self.assertEqual([len(page) for page in forward], [2, 2, 2, 2, 1])
+
+        # Back from the last page: the same pages in reverse, none skipped
+        data = self.client.get("/api/lessons/", {"page_size": 2}).json()
+        while data["next"]:
+            data = self.client.get(data["next"]).json()
+        self.assertIsNone(data["next"])
+        backward = [[row["id"] for row in data["results"]]] + self.walk(data["previous"], "previous")
+        self.assertEqual(backward, forward[::-1])
+
+    def test_page_boundary_on_a_tie(self):
+        # The cursor row shares (order, folder_name) with the next row
+        response = self.client.get("/api/lessons/", {"page_size": 1})
+        page = [response.json()["results"][0]["id"]]
+        following = self.client.get(response.json()["next"]).json()["results"]
+        self.assertEqual(page + [following[0]["id"]], self.lessons[:2])
+        self.assertEqual(
+            Lesson.objects.filter(pk__in=self.lessons[:2]).values("order", "folder_name").distinct().count(), 1,
+        )
+
+    def test_descending_keys_with_equal_timestamps(self):
+        Exercise.objects.update(created=timezone.now())
+        expected = list(Exercise.objects.order_by("-created", "id").values_list("pk", flat=True))
+        forward = self.walk("/api/exercises/", "next", page_size=2)
+        self.assertEqual([pk for page in forward for pk in page], expected)
+
+    def test_invalid_cursor(self):
+        wrong_length = base64.b64encode(json.dumps({"v": [0, "lesson_000"]}).encode()).decode()
+        wrong_type = base64.b64encode(json.dumps({"v": ["x", "lesson_000", 1]}).encode()).decode()
+        for cursor in ("not-base64!", base64.b64encode(b"{").decode(), wrong_length, wrong_type):
+            response = self.client.get("/api/lessons/", {"cursor": cursor})
+            self.assertEqual(response.status_code, 404, cursor)
+            self.assertEqual(response.json()["detail"], "Invalid cursor")
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class BulkWriteTests(CurriculumTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.make_curriculum()
+        cls.user = User.objects.create_user("teacher", password="pw", user_type="teacher")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def send(self, method, url, items):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, json.dumps(items), content_type="application/json")
+        return response, len(queries)
+
+    def links(self):
+        """``{folder_name: [exercise ids]}`` straight from the through table."""
+        links = {}
+        for folder, exercise in Lesson.exercises.through.objects.order_by("pk").values_list(
+            "lesson__folder_name", "exercise_id",
+        ):
+            links.setdefault(folder, []).append(exercise)
+        return links
+
+    def new_lessons(self, count, start=0, **fields):
+        return [
+            {"group": self.leaf.pk, "folder_name": f"lesson_{i:03}", "title": f"Lesson {i}", **fields}
+            for i in range(start, start + count)
+        ]
+
+    def test_create_with_links_in_fixed_queries(self):
+        a, b, c = (exercise.pk for exercise in self.exercises)
+        response, few = self.send("post", "/api/lessons/", self.new_lessons(1, exercise_ids=[a]))
+        self.assertEqual(response.status_code, 201)
+        response, many = self.send("post", "/api/lessons/", self.new_lessons(20, start=1, exercise_ids=[b, c, b]))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(many, few)
+
+        self.assertEqual(Lesson.objects.filter(group=self.leaf).count(), 21)
+        links = self.links()
+        self.assertEqual(links["lesson_000"], [a])
+        self.assertEqual(links["lesson_020"], [b, c])  # duplicates linked once
+
+    def test_update_replaces_only_the_links_sent(self):
+        a, b, c = (exercise.pk for exercise in self.exercises)
+        created, _ = self.send("post", "/api/lessons/", self.new_lessons(3, exercise_ids=[a, b]))
+        first, second, third = (row["id"] for row in created.json())
+        before = list(Lesson.exercises.through.objects.filter(lesson_id=third).values_list("pk", flat=True))
+
+        response, one = self.send("patch", "/api/lessons/bulk/", [{"id": first, "exercise_ids": [c]}])
+        self.assertEqual(response.status_code, 200)
+        response, two = self.send("patch", "/api/lessons/bulk/", [
+            {"id": first, "exercise_ids": [c, a]},
+            {"id": second, "title": "Renamed", "exercise_ids": []},
+            {"id": third, "order": 7},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(two, one)
+
+        self.assertEqual(self.links(), {"lesson_000": [c, a], "lesson_002": [a, b]})
+        # Lessons sent without exercise_ids keep their through rows untouched
+        self.assertEqual(
+            list(Lesson.exercises.through.objects.filter(lesson_id=third).values_list("pk", flat=True)), before,
+        )
+        self.assertEqual(
+            list(Lesson.objects.order_by("pk").values_list("title", "order")),
+            [("Lesson 0", 0), ("Renamed", 0), ("Lesson 2", 7)],
+        )
+
+    def test_upsert_matches_on_id_or_natural_key(self):
+        created, _ = self.send("post", "/api/lessons/", self.new_lessons(2))
+        first = created.json()[0]["id"]
+        response, _ = self.send("put", "/api/lessons/bulk/", [
+            {"id": first, "group": self.leaf.pk, "folder_name": "lesson_000", "title": "By id"},
+            {"group": self.leaf.pk, "folder_name": "lesson_001", "title": "By key"},
+            {"group": self.leaf.pk, "folder_name": "lesson_002", "title": "New"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(Lesson.objects.order_by("folder_name").values_list("folder_name", "title")),
+            [("lesson_000", "By id"), ("lesson_001", "By key"), ("lesson_002", "New")],
+        )
+
+    def test_malformed_ids_are_rejected(self):
+        created, _ = self.send("post", "/api/lessons/", self.new_lessons(1))
+        pk = created.json()[0]["id"]
+        for item in (
+            {"id": "abc"}, {"id": True}, {"id": 2 ** 63}, {"id": -1}, {"id": pk + 100},
+            {"id": pk, "group": 2 ** 63}, {"id": pk, "exercise_ids": [2 ** 63]},
+            {"id": pk, "exercise_ids": [0]}, {"id": pk, "exercise_ids": ["x"]},
+        ):
+            response, _ = self.send("patch", "/api/lessons/bulk/", [{"title": "Changed", **item}])
+            self.assertEqual(response.status_code, 400, item)
+        response, _ = self.send("patch", "/api/lessons/bulk/", [{"id": pk}, {"id": pk}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Lesson.objects.filter(title="Changed").exists())
+
+
+class SearchTests(CurriculumTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.make_curriculum()
+        cls.a_minor = Key.objects.create(tonic="A", mode=Key.MINOR, folder_code="AMinor")
+        cls.c_major = Key.objects.create(tonic="C", mode=Key.MAJOR, folder_code="CMajor")
+        cls.middle.key = cls.a_minor
+        cls.middle.save()
+        chords = LessonType.objects.create(approach=cls.approach, name="Chords", slug="chords")
+        cls.triads = LessonGroup.objects.create(lesson_type=chords, name="Triads", key=cls.c_major)
+        cls.chords = chords
+
+        # The title match has the highest id: ranking must not favour low ids
+        cls.path_match = Lesson.objects.create(group=cls.leaf, folder_name="1_AF-8_1_dio", title="Seconds drill")
+        cls.other = Lesson.objects.create(group=cls.triads, folder_name="2_tri", title="Major triad drill")
+        cls.title_match = Lesson.objects.create(group=cls.triads, folder_name="3_mel", title="Melodic drill")
+        cls.user = User.objects.create_user("teacher", password="pw", user_type="teacher")
+
+    def ids(self, results):
+        return [hit.lesson_id for hit in results.hits]
+
+    def test_title_matches_rank_first(self):
+        results = search.search("melodic")
+        self.assertEqual(results.total, 2)
+        self.assertEqual(self.ids(results), [self.title_match.pk, self.path_match.pk])
+        self.assertEqual(results.hits[0].title, "<mark>Melodic</mark> drill")
+
+    def test_words_are_prefixes_and_all_required(self):
+        self.assertEqual(self.ids(search.search("af-8 dio")), [self.path_match.pk])
+        self.assertEqual(self.ids(search.search("melod sec")), [self.path_match.pk])
+        self.assertEqual(search.search('"NEAR(x y)').total, 0)
+
+    def test_paging(self):
+        results = search.search("melodic", limit=1, offset=1)
+        self.assertEqual((results.total, self.ids(results)), (2, [self.path_match.pk]))
+
+    def test_facet_counts_are_disjunctive(self):
+        results = search.search("drill")
+        counts = {name: {row["value"]: row["count"] for row in rows} for name, rows in results.facets.items()}
+        self.assertEqual(counts["lesson_type"], {self.lesson_type.pk: 1, self.chords.pk: 2})
+        self.assertEqual(counts["key"], {self.a_minor.pk: 1, self.c_major.pk: 2})
+        self.assertEqual(counts["mode"], {Key.MINOR: 1, Key.MAJOR: 2})
+        self.assertEqual(counts["category"], {self.category.pk: 3})
+
+        selected = search.parse_facets({"lesson_type": str(self.chords.pk)})
+        results = search.search("drill", facets=selected)
+        self.assertEqual(results.total, 2)
+        self.assertEqual(set(self.ids(results)), {self.other.pk, self.title_match.pk})
+        lesson_types = {row["value"]: (row["count"], row["selected"]) for row in results.facets["lesson_type"]}
+        # Its own dimension ignores the selection, the others follow it
+        self.assertEqual(lesson_types, {self.lesson_type.pk: (1, False), self.chords.pk: (2, True)})
+        self.assertEqual([row["value"] for row in results.facets["key"]], [self.c_major.pk])
+
+        results = search.search("drill", facets=search.parse_facets({"mode": "minor"}))
+        self.assertEqual(self.ids(results), [self.path_match.pk])
+
+    def test_unknown_facet_values(self):
+        with self.assertRaises(ValueError):
+            search.parse_facets({"mode": "dorian"})
+        with self.assertRaises(ValueError):
+            search.parse_facets({"key": "A"})
+
+    def test_renaming_a_group_reindexes_its_lessons(self):
+        self.triads.name = "Sevenths"
+        self.triads.save()
+        self.assertEqual(set(self.ids(search.search("sevenths"))), {self.other.pk, self.title_match.pk})
+
+    def test_endpoint_and_list_filter(self):
+        self.client.force_login(self.user)
+        data = self.client.get("/api/lessons/search/", {"search": "melodic", "limit": 1}).json()
+        self.assertEqual(data["count"], 2)
+        self.assertEqual([row["id"] for row in data["results"]], [self.title_match.pk])
+        self.assertEqual(self.client.get("/api/lessons/search/", {"search": "a", "mode": "x"}).status_code, 400)
+
+        data = self.client.get("/api/lessons/", {"search": "seconds"}).json()
+        self.assertEqual([row["id"] for row in data["results"]], [self.path_match.pk])
+
+    def test_fallback_without_full_text_index(self):
+        with mock.patch.object(search, "available", return_value=False):
+            results = search.search("melodic DRILL")
+            self.assertEqual((results.total, self.ids(results)), (1, [self.title_match.pk]))
+            self.assertEqual(results.facets["lesson_type"], [])
+
+            self.client.force_login(self.user)
+            data = self.client.get("/api/lessons/", {"search": "major tri"}).json()
+            self.assertEqual([row["id"] for row in data["results"]], [self.other.pk])
+
+
+class PrefixIndexTests(SimpleTestCase):
+
+    index = PrefixIndex([
+        (LESSON, "Interval inversions", 1),
+        (LESSON, "Absolute formula inverse", 2),
+        (GROUP, "Inversions", 3),
+        (LESSON_TYPE, "Inversions", 4),
+        (KEY, "E♭ Minor", 5),
+        (LESSON, "1_AF-8_1_dio", 6),
+        (LESSON, "Crème brûlée", 7),
+        (GROUP, "inversions", 8),  # same kind and folded label as 3
+        (LESSON, "", 9),
+    ])
+
+    def ids(self, prefix, limit=10):
+        return [pk for _kind, _label, pk in self.index.complete(prefix, limit)]
+
+    def test_ranking(self):
+        # Label starts first; among those the broader level, then shorter
+        # labels; then matches on a later word
+        self.assertEqual(self.ids("inv"), [4, 3, 1, 2])
+        self.assertEqual(self.ids("inv", limit=2), [4, 3])
+
+    def test_every_word_start_completes(self):
+        self.assertEqual(self.ids("form"), [2])
+        self.assertEqual(self.ids("absolute form"), [2])
+        self.assertEqual(self.ids("abs form"), [])
+        self.assertEqual(self.ids("ormula"), [])
+
+    def test_folding(self):
+        self.assertEqual(self.ids("af-8"), [6])
+        self.assertEqual(self.ids("AF 8 1"), [6])
+        self.assertEqual(self.ids("creme BRU"), [7])
+        self.assertEqual(self.ids("e minor"), [5])
+
+    def test_empty_prefix(self):
+        self.assertEqual(self.ids(""), [])
+        self.assertEqual(self.ids(" -_ "), [])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AutocompleteEndpointTests(CurriculumTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.make_curriculum()
+        cls.add_lessons(cls.leaf, 2)
+        cls.user = User.objects.create_user("teacher", password="pw", user_type="teacher")
+
+    def setUp(self):
+        autocomplete._index = None
+        self.client.force_login(self.user)
+
+    def complete(self, q, **params):
+        response = self.client.get("/api/lessons/autocomplete/", {"q": q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(row["kind"], row["text"]) for row in response.json()["results"]]
+
+    def test_suggestions(self):
+        self.assertEqual(self.complete("mel"), [("group", "Melodic")])
+        self.assertEqual(self.complete("lesson", limit=1), [("lesson", "Lesson 0")])
+        self.assertEqual(self.client.get("/api/lessons/autocomplete/", {"limit": "x"}).status_code, 400)
+
+    def test_index_follows_curriculum_changes(self):
+        self.assertEqual(self.complete("cadence"), [])
+        LessonType.objects.create(approach=self.approach, name="Cadences", slug="cadences")
+        with mock.patch.object(autocomplete, "RECHECK_SECONDS", 0):
+            self.assertEqual(self.complete("cadence"), [("lesson_type", "Cadences")])
+
+
+class SnapshotTests(TemporaryMediaMixin, CurriculumTestMixin, TestCase):
+
+    def setUp(self):
+        self.use_temporary_media()
+        self.make_curriculum()
+        self.leaf.key = Key.objects.create(tonic="E♭", mode=Key.MINOR, folder_code="EsMinor")
+        self.leaf.save()
+        self.lessons = self.add_lessons(self.leaf, 3)
+        # Two exercises share one file's content
+        for exercise, data in zip(self.exercises, (b"MThd one", b"MThd one", b"MThd two")):
+            exercise.midi.save("dictation.mid", ContentFile(data))
+        rule = DictationRule.objects.create(lesson_type=self.lesson_type, name="Steps", pool_size=3)
+        fill_pool(rule)
+
+    def tables(self):
+        return {
+            snapshot._label(model): list(model._base_manager.order_by("pk").values_list())
+            for model in snapshot.MODELS
+        }
+
+    def test_export_load_round_trip(self):
+        before = self.tables()
+        self.assertEqual([label for label, rows in before.items() if not rows], ["library.module"])
+        media = {exercise.pk: exercise.midi.read() for exercise in Exercise.objects.all()}
+        path = f"{settings.MEDIA_ROOT}/snapshot.zip"
+        manifest = snapshot.export(path)
+        self.assertEqual(manifest["blobs"], 2)
+        self.assertEqual(
+            {entry["model"]: entry["rows"] for entry in manifest["models"]},
+            {label: len(rows) for label, rows in before.items()},
+        )
+
+        snapshot.clear()
+        self.assertTrue(snapshot.is_empty())
+        for name in {exercise.midi.name for exercise in self.exercises}:
+            exercise_storage.delete(name)
+
+        with zipfile.ZipFile(path) as archive:
+            loaded = snapshot.load(archive)
+        self.assertEqual(loaded, {label: len(rows) for label, rows in before.items()})
+        self.assertEqual(self.tables(), before)
+        self.assertEqual({exercise.pk: exercise.midi.read() for exercise in Exercise.objects.all()}, media)
+        self.assertEqual([hit.lesson_id for hit in search.search("lesson 1").hits], [self.lessons[1].pk])
+
+    def test_rejects_other_archives(self):
+        path = f"{settings.MEDIA_ROOT}/other.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("manifest.json", '{"format": "something-else"}')
+        with zipfile.ZipFile(path) as archive, self.assertRaises(snapshot.SnapshotError):
+            snapshot.load(archive)
+
+
+class SvgThumbnailTests(SimpleTestCase):
+
+    def thumbnail(self, view_box, attrs):
+        """``{(tag, attribute): value}`` drawn in a score and read back from its thumbnail."""
+        shapes = "".join(f'<{tag} {name}="{value}"/>' for (tag, name), value in attrs.items())
+        svg = f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{view_box}">{shapes}</svg>'
+        root = ET.fromstring(thumbnails.svg_thumbnail(svg.encode()))
+        return {name: root.find(f"{{{thumbnails.SVG_NS}}}{tag}").get(name) for tag, name in attrs}
+
+    def test_numbers_that_run_together_stay_apart(self):
+        self.assertEqual(
+            self.thumbnail("0 0 480 160", {("path", "d"): "M10.5.5l.3-.2.4.6L20.25 30.75"}),
+            {"d": "M10 0l0 0 0 1L20 31"},
+        )
+        self.assertEqual(
+            self.thumbnail("0 0 48 16", {("path", "d"): "M10.5.5l.3-.2.4.6L20.25 30.75"}),
+            {"d": "M10.5 .5l.3-.2 .4 .6L20.2 30.8"},
+        )
+
+    def test_exponents_are_kept(self):
+        self.assertEqual(
+            self.thumbnail("0 0 480 160", {("rect", "x"): "1.5e2", ("polyline", "points"): "1e1,-2.5E-1 3,4"}),
+            {"x": "150", "points": "10,0 3,4"},
+        )
+
+
+SCORE = b'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 480 160"><path d="M10.5 20.25h100"/></svg>'
+
+
+class ThumbnailGenerationTests(TemporaryMediaMixin, TestCase):
+
+    def setUp(self):
+        self.use_temporary_media()
+
+    def test_made_when_an_exercise_is_saved(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            exercise = Exercise.objects.create(svg=exercise_storage.save("svg/scale.svg", ContentFile(SCORE)))
+        exercise.refresh_from_db()
+        self.assertEqual(exercise.thumbnail_source, exercise.svg.name)
+        self.assertTrue(exercise.thumbnail.name.startswith("thumbnails/scale."))
+        self.assertIn(b"M10 20h100", exercise.thumbnail.read())
+
+        # Saving without a media change does not make it again
+        with self.captureOnCommitCallbacks() as callbacks:
+            exercise.polyphonic = True
+            exercise.save()
+        self.assertEqual(callbacks, [])
+
+    def test_command_catches_rows_written_without_signals(self):
+        Exercise.objects.bulk_create([Exercise(), Exercise()])
+        Exercise.objects.filter(pk=Exercise.objects.first().pk).update(
+            svg=exercise_storage.save("svg/scale.svg", ContentFile(SCORE)),
+        )
+        self.assertEqual(thumbnails.stale().count(), 1)
+
+        out = StringIO()
+        call_command("make_thumbnails", "--dry-run", stdout=out)
+        self.assertIn("needing a thumbnail: 1", out.getvalue())
+        self.assertEqual(thumbnails.stale().count(), 1)
+
+        call_command("make_thumbnails", stdout=StringIO())
+        self.assertFalse(thumbnails.stale().exists())
+        self.assertEqual(Exercise.objects.exclude(thumbnail="").count(), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ExerciseFilterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Exercise.objects.create(category="pitch")
+        Exercise.objects.create(category="rhythm", polyphonic=True)
+        cls.user = User.objects.create_user("teacher", password="pw", user_type="teacher")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def categories(self, **params):
+        response = self.client.get("/api/exercises/", params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(row["category"] for row in response.json()["results"])
+
+    def test_filters(self):
+        self.assertEqual(self.categories(category="rhythm"), ["rhythm"])
+        self.assertEqual(self.categories(polyphonic="0"), ["pitch"])
+
+    def test_unknown_parameters_are_ignored(self):
+        for params in ({"context": "tonal"}, {"category": "melody"}, {"polyphonic": "yes"}):
+            self.assertEqual(self.categories(**params), ["pitch", "rhythm"], params)
@@ -0,0 +1,226 @@
+"""
+Small preview images for exercise lists.
+
+Lists used to show each exercise's full SVG score, so a page grew with
+every score's size.  Instead each exercise gets one small thumbnail,
+stored in exercise storage under a content-fingerprinted name (see
+library/storage.py) and recorded on the row together with the file it was
+made from:
+
+* an SVG score becomes a minified SVG — comments, metadata, editor
+  namespaces, scripts and insignificant whitespace dropped, coordinates
+  rounded to what still shows at THUMBNAIL_WIDTH pixels wide;
+* an exercise with only a MIDI file gets a piano-roll PNG drawn with
+  Pillow (which has no SVG rasteriser).
+
+Thumbnails are made off the page request: when an exercise is saved (once
+the transaction commits) and, for rows written without signals — bulk
+writes, imports, prune_media renaming files — by ``manage.py
+make_thumbnails`` from cron.  A thumbnail is made once per source file: it
+is remade only when the exercise's svg / midi changes, a source that cannot
+be previewed is remembered as such, and identical sources share one stored
+file.  prune_media collects thumbnails no exercise refers to any more.
+"""
+
+import io
+import re
+import xml.etree.ElementTree as ET
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Case, F, Q, When
+from django.db.models.signals import post_save
+from PIL import Image, ImageDraw
+
+from .midi import read_midi
+from .models import Exercise
+from .storage import exercise_storage
+
+
+THUMBNAIL_WIDTH = 240
+THUMBNAIL_HEIGHT = 80
+
+SVG_NS = "http://www.w3.org/2000/svg"
+XLINK_NS = "http://www.w3.org/1999/xlink"
+ET.register_namespace("", SVG_NS)
+ET.register_namespace("xlink", XLINK_NS)
+
+# Elements and attribute namespaces with no effect on how the score looks
+DROPPED_TAGS = {f"{{{SVG_NS}}}{tag}" for tag in ("metadata", "title", "desc", "script")}
+KEPT_NAMESPACES = {SVG_NS, XLINK_NS}
+# Whitespace inside these is content
+TEXT_TAGS = {f"{{{SVG_NS}}}{tag}" for tag in ("text", "tspan", "textPath", "style")}
+# Coordinates and lengths in user units; transforms, opacities etc. are left alone
+ROUNDED_ATTRIBUTES = {
+    "d", "points", "x", "y", "x1", "y1", "x2", "y2", "cx", "cy", "r", "rx", "ry", "width", "height",
+}
+
+# A whole number as SVG writes them: "10", "-.5", "1.5e2" (path data may
+# run numbers together, as in "M10.5.5l.3-.2")
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_LENGTH = re.compile(r"^\s*([\d.]+)\s*(px)?\s*$")
+
+
+def _namespace(name: str):
+    return name[1:].split("}", 1)[0] if name.startswith("{") else None
+
+
+def _rounder(digits: int):
+    def round_number(number: str) -> str:
+        text = f"{float(number):.{digits}f}"
+        if digits:
+            text = text.rstrip("0").rstrip(".")
+        if text in ("-0", ""):
+            return "0"
+        # "0.5" → ".5", "-0.5" → "-.5"
+        return re.sub(r"^(-?)0\.", r"\1.", text)
+    return round_number
+
+
+def _round_numbers(value: str, round_number) -> str:
+    """``value`` with every number rounded, keeping numbers that touched apart."""
+    out = []
+    last = 0
+    for match in _NUMBER.finditer(value):
+        between = value[last:match.start()]
+        number = round_number(match.group(0))
+        # "10.5.5" rounds to "10" and "0", which must not run together
+        if not between and out and not number.startswith("-"):
+            between = " "
+        out += [between, number]
+        last = match.end()
+    out.append(value[last:])
+    return "".join(out)
+
+
+def _minify(element, round_number) -> None:
+    for child in list(element):
+        if not isinstance(child.tag, str) or child.tag in DROPPED_TAGS or _namespace(child.tag) not in KEPT_NAMESPACES:
+            element.remove(child)
+            continue
+        _minify(child, round_number)
+
+    for name in list(element.attrib):
+        namespace = _namespace(name)
+        if (namespace is not None and namespace not in KEPT_NAMESPACES) or name.startswith("on"):
+            del element.attrib[name]
+        elif name in ROUNDED_ATTRIBUTES:
+            element.attrib[name] = _round_numbers(element.attrib[name], round_number)
+
+    if element.tag not in TEXT_TAGS:
+        if element.text and not element.text.strip():
+            element.text = None
+        for child in element:
+            if child.tail and not child.tail.strip():
+                child.tail = None
+
+
+def svg_thumbnail(data: bytes):
+    """Minified, THUMBNAIL_WIDTH-wide SVG bytes of an SVG score, or None if it can't be read."""
+    try:
+        root = ET.fromstring(data)
+    except ET.ParseError:
+        return None
+    if root.tag != f"{{{SVG_NS}}}svg":
+        return None
+
+    view_box = root.get("viewBox")
+    if view_box is None:
+        width, height = (_LENGTH.match(root.get(attr, "")) for attr in ("width", "height"))
+        if not (width and height):
+            return None
+        view_box = f"0 0 {width.group(1)} {height.group(1)}"
+    try:
+        _x, _y, box_width, box_height = (float(part) for part in view_box.replace(",", " ").split())
+    except ValueError:
+        return None
+    if box_width <= 0 or box_height <= 0:
+        return None
+
+    # Whole user units are finer than a thumbnail pixel once the score is
+    # at least as wide as the thumbnail
+    _minify(root, _rounder(0 if box_width >= THUMBNAIL_WIDTH else 1))
+    root.set("viewBox", view_box)
+    root.set("width", str(THUMBNAIL_WIDTH))
+    root.set("height", str(max(1, round(THUMBNAIL_WIDTH * box_height / box_width))))
+    return ET.tostring(root, encoding="utf-8", xml_declaration=False)
+
+
+def midi_thumbnail(data: bytes):
+    """Piano-roll PNG bytes of a MIDI file, or None if it holds no notes."""
+    try:
+        notes = read_midi(data)
+    except ValueError:
+        return None
+    if not notes:
+        return None
+
+    first = min(note["beat"] for note in notes)
+    last = max(note["beat"] + note["duration"] for note in notes)
+    low = min(note["pitch"] for note in notes) - 1
+    high = max(note["pitch"] for note in notes) + 1
+    x_scale = (THUMBNAIL_WIDTH - 1) / max(last - first, 1e-6)
+    row = THUMBNAIL_HEIGHT / (high - low + 1)
+
+    image = Image.new("L", (THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT), 255)
+    draw = ImageDraw.Draw(image)
+    for note in notes:
+        left = (note["beat"] - first) * x_scale
+        right = max(left + 1, (note["beat"] + note["duration"] - first) * x_scale - 1)
+        top = (high - note["pitch"]) * row
+        draw.rectangle([left, top, right, top + max(row - 1, 1)], fill=60)
+
+    out = io.BytesIO()
+    image.save(out, format="PNG", optimize=True)
+    return out.getvalue()
+
+
+def _stem(name: str) -> str:
+    return name.replace("\\", "/").rsplit("/", 1)[-1].split(".", 1)[0] or "exercise"
+
+
+def make(exercise) -> str:
+    """Store a thumbnail for ``exercise``'s current media; its name, or "" if none can be made."""
+    for field_file, render, ext in ((exercise.svg, svg_thumbnail, "svg"), (exercise.midi, midi_thumbnail, "png")):
+        if not field_file:
+            continue
+        try:
+            with exercise_storage.open(field_file.name, "rb") as fh:
+                data = fh.read()
+        except OSError:
+            continue
+        thumbnail = render(data)
+        if thumbnail:
+            return exercise_storage.save(f"thumbnails/{_stem(field_file.name)}.{ext}", ContentFile(thumbnail))
+    return ""
+
+
+def source(exercise) -> str:
+    """The file an up-to-date thumbnail of ``exercise`` is made from ("" without media)."""
+    return exercise.svg.name or exercise.midi.name or ""
+
+
+def ensure(exercises) -> None:
+    """Give every exercise in ``exercises`` an up-to-date thumbnail, making the missing ones."""
+    for exercise in exercises:
+        current = source(exercise)
+        if exercise.thumbnail_source == current:
+            continue
+        name = make(exercise) if current else ""
+        # A plain UPDATE: a preview is not a curriculum change
+        Exercise.objects.filter(pk=exercise.pk).update(thumbnail=name, thumbnail_source=current)
+        exercise.thumbnail.name, exercise.thumbnail_source = name, current
+
+
+def stale():
+    """Exercises whose thumbnail was not made from their current svg / midi."""
+    current = Case(When(~Q(svg=""), then=F("svg")), default=F("midi"))
+    return Exercise.objects.exclude(thumbnail_source=current)
+
+
+def _exercise_saved(sender, instance, raw=False, **kwargs):
+    if not raw and instance.thumbnail_source != source(instance):
+        transaction.on_commit(lambda: ensure([instance]))
+
+
+post_save.connect(_exercise_saved, sender=Exercise, dispatch_uid="thumbnails-exercise-save")
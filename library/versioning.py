@@ -0,0 +1,136 @@
+"""
+Curriculum version counter and conditional GET.
+
+Every save or delete of a curriculum model, and every change to a lesson's
+exercises, bumps the single CurriculumVersion row.  Reading it is one
+primary-key lookup, so anything derived purely from the curriculum can be
+validated against it without touching the data:
+
+* ``conditional`` answers If-None-Match / If-Modified-Since with 304 before
+  the wrapped view queries or renders anything;
+* CurriculumConditionalMixin applies it to a viewset's list and retrieve;
+* library/response_cache.py keys cached responses on it, so a bump
+  invalidates every entry at once.
+
+Bulk writes (``bulk_create``, ``QuerySet.update``) send no signals — code
+that uses them must call ``bump()`` itself.
+"""
+
+from calendar import timegm
+from functools import wraps
+from hashlib import md5
+
+from django.contrib.messages import get_messages
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.decorators import method_decorator
+from django.utils.http import http_date, quote_etag
+
+from .models import (
+    Approach, Category, CurriculumVersion, Exercise, Key, Lesson, LessonGroup, LessonType,
+)
+
+
+CURRICULUM_MODELS = [Category, Approach, LessonType, Key, LessonGroup, Lesson, Exercise]
+
+
+def current() -> CurriculumVersion:
+    """The current version row (created on first use)."""
+    state = CurriculumVersion.objects.filter(pk=1).first()
+    if state is None:
+        state, _ = CurriculumVersion.objects.get_or_create(pk=1)
+    return state
+
+
+def for_request(request) -> CurriculumVersion:
+    """``current()`` read once per request, however many layers ask for it."""
+    request = getattr(request, "_request", request)  # DRF wraps the HttpRequest
+    if not hasattr(request, "_curriculum_version"):
+        request._curriculum_version = current()
+    return request._curriculum_version
+
+
+def bump() -> None:
+    """Record a curriculum change."""
+    now = timezone.now()
+    updated = CurriculumVersion.objects.filter(pk=1).update(version=F("version") + 1, changed_at=now)
+    if not updated:
+        CurriculumVersion.objects.get_or_create(pk=1, defaults={"version": 1, "changed_at": now})
+
+
+def _changed(sender, **kwargs):
+    bump()
+
+
+def _exercises_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump()
+
+
+for _model in CURRICULUM_MODELS:
+    post_save.connect(_changed, sender=_model, dispatch_uid=f"curriculum-save-{_model.__name__}")
+    post_delete.connect(_changed, sender=_model, dispatch_uid=f"curriculum-delete-{_model.__name__}")
+m2m_changed.connect(_exercises_changed, sender=Lesson.exercises.through, dispatch_uid="curriculum-m2m")
+
+
+# ---------------------------------------------------------------------------
+# Conditional GET
+# ---------------------------------------------------------------------------
+
+def etag_for(request, version) -> str:
+    """
+    ETag of a curriculum-derived response.  Besides the version it covers
+    what else can change the bytes at the same URL: the user (pages show
+    their name), the negotiated media type, pending flash messages, and the
+    CSRF secret — pages embed a token derived from it, so a 304 after the
+    secret rotates would leave the browser posting a stale token.
+    """
+    user = getattr(request, "user", None)
+    variant = "|".join([
+        str(user.pk if user is not None and user.is_authenticated else ""),
+        request.META.get("HTTP_ACCEPT", ""),
+        str(len(get_messages(request))),
+        request.META.get("CSRF_COOKIE", ""),
+    ])
+    return quote_etag(f"c{version}-{md5(variant.encode()).hexdigest()[:12]}")
+
+
+def conditional(view):
+    """Conditional GET keyed on the curriculum version (plain views and viewset methods)."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return view(request, *args, **kwargs)
+
+        state = for_request(request)
+        etag = etag_for(request, state.version)
+        last_modified = timegm(state.changed_at.utctimetuple())
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = view(request, *args, **kwargs)
+        # A 304 repeats the validators so the client's cached copy keeps them
+        if response.status_code in (200, 304):
+            response.headers.setdefault("ETag", etag)
+            response.headers.setdefault("Last-Modified", http_date(last_modified))
+
+        # Clients may keep the response but must revalidate before reuse
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    return wrapper
+
+
+class CurriculumConditionalMixin:
+    """ViewSet mixin: 304 for unchanged list and detail responses."""
+
+    @method_decorator(conditional)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @method_decorator(conditional)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
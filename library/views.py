@@ -1,39 +1,175 @@
+from django.db import IntegrityError
+from django.http import HttpResponse, Http404
 from rest_framework import viewsets, filters
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import Exercise, Lesson, LessonGroup, LessonType, Category, Approach
+from rea.batch import BatchLookupMixin
+from rea.fastlist import ValuesListViewMixin
+from rea.fieldsets import SparseFieldsetViewMixin
+from . import autocomplete, dictation, search
+from .pagination import ExercisePagination, LessonPagination
+from .response_cache import ResponseCacheMixin
+from .versioning import CurriculumConditionalMixin
+from .midi import read_midi, retime, write_midi
+from .pitch import read_wav, track_pitch, assess_take
+from .models import (
+    Exercise, Lesson, LessonGroup, LessonType, Category, Approach,
+    DictationRule, DictationExercise,
+)
 from .serializers import (
+    AssessmentUploadSerializer,
     ExerciseSerializer,
+    ExerciseBulkSerializer,
     LessonSerializer,
+    LessonBulkSerializer,
     LessonListSerializer,
+    DictationRuleSerializer,
+    DictationExerciseSerializer,
 )
 
 
-class ExerciseViewSet(viewsets.ModelViewSet):
+MAX_SEARCH_LIMIT = 100
+
+EXERCISE_CATEGORIES = dict(Exercise._meta.get_field("category").choices)
+
+
+class BulkWriteMixin:
+    """
+    List payloads on a ModelViewSet, validated and written in one batch
+    (see library.serializers.BulkListSerializer):
+
+        POST  /…/        [{…}, …]       create
+        PATCH /…/bulk/   [{id, …}, …]   update; fields not sent are kept
+        PUT   /…/bulk/   [{…}, …]       upsert
+    """
+
+    bulk_serializer_class = None
+
+    def create(self, request, *args, **kwargs):
+        if isinstance(request.data, list):
+            return self._bulk_write(request, "create")
+        return super().create(request, *args, **kwargs)
+
+    @action(detail=False, methods=["put", "patch"])
+    def bulk(self, request):
+        if not isinstance(request.data, list):
+            raise ValidationError({"detail": "Expected a list of items."})
+        return self._bulk_write(request, "update" if request.method == "PATCH" else "upsert")
+
+    def _bulk_write(self, request, mode):
+        serializer = self.bulk_serializer_class(
+            data=request.data,
+            many=True,
+            partial=mode == "update",
+            context={**self.get_serializer_context(), "bulk": mode},
+        )
+        serializer.is_valid(raise_exception=True)
+        try:
+            serializer.save()
+        except IntegrityError as exc:
+            raise ValidationError({"detail": f"Batch rejected by the database: {exc}"})
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED if mode == "create" else status.HTTP_200_OK,
+        )
+
+
+class ExerciseViewSet(
+    BulkWriteMixin,
+    CurriculumConditionalMixin,
+    ResponseCacheMixin,
+    BatchLookupMixin,
+    ValuesListViewMixin,
+    SparseFieldsetViewMixin,
+    viewsets.ModelViewSet,
+):
     """
     ViewSet for viewing and editing exercises.
+
+    POST a list, or PATCH / PUT a list to bulk/, to write many at once;
+    GET ?ids=1,2,3 to fetch many (see rea/batch.py).
+
+    Filtering
+    ---------
+    ?category=pitch|rhythm   – filter by category
+    ?polyphonic=0|1          – mono or polyphonic exercises only
+    Unknown values are ignored rather than matching nothing.
     """
 
     queryset = Exercise.objects.all()
     serializer_class = ExerciseSerializer
+    bulk_serializer_class = ExerciseBulkSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = ExercisePagination
 
     def get_queryset(self):
-        queryset = Exercise.objects.all()
-
-        context = self.request.query_params.get("context")
-        if context is not None:
-            queryset = queryset.filter(context=context)
+        queryset = Exercise.objects.order_by("-created", "id")
 
         category = self.request.query_params.get("category")
-        if category is not None:
+        if category in EXERCISE_CATEGORIES:
             queryset = queryset.filter(category=category)
 
+        polyphonic = self.request.query_params.get("polyphonic")
+        if polyphonic in ("0", "1"):
+            queryset = queryset.filter(polyphonic=polyphonic == "1")
+
         return queryset
 
+    @action(detail=True, methods=["post"], parser_classes=[MultiPartParser, FormParser])
+    def assess(self, request, pk=None):
+        """
+        Grade a recorded take of this exercise on the server.
+
+        POST multipart: recording=<WAV file>, optional tempo (BPM) and
+        offset (seconds before the first note).  Returns a per-note
+        accuracy breakdown and an overall score.
+        """
+        exercise = self.get_object()
+        upload = AssessmentUploadSerializer(data=request.data)
+        upload.is_valid(raise_exception=True)
+
+        if not exercise.midi:
+            return Response(
+                {"detail": "This exercise has no MIDI note data to assess against."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            samples, sample_rate = read_wav(upload.validated_data["recording"])
+            with exercise.midi.open("rb") as fh:
+                notes = read_midi(fh.read())
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-class LessonViewSet(viewsets.ModelViewSet):
+        tempo = upload.validated_data.get("tempo")
+        if tempo:
+            retime(notes, tempo)
+
+        track = track_pitch(samples, sample_rate)
+        result = assess_take(track, notes, offset=upload.validated_data["offset"])
+        result.update({
+            "exercise": exercise.pk,
+            "duration": round(len(samples) / sample_rate, 3),
+            "frames": len(track.times),
+        })
+        return Response(result)
+
+
+class LessonViewSet(
+    BulkWriteMixin,
+    CurriculumConditionalMixin,
+    ResponseCacheMixin,
+    BatchLookupMixin,
+    ValuesListViewMixin,
+    SparseFieldsetViewMixin,
+    viewsets.ModelViewSet,
+):
     """
     ViewSet for viewing and editing lessons.
 
@@ -47,32 +183,63 @@ class LessonViewSet(viewsets.ModelViewSet):
     ?lesson_type=<id>        – filter by LessonType id
     ?group=<id>              – filter by direct LessonGroup id
     ?key=<id>                – filter by Key id (anywhere in group ancestry)
-    ?search=<term>           – searches title and folder_name
+    ?search=<term>           – full-text match on title, folder name, group path,
+                               lesson type and key (see library/search.py)
+    ?ids=<id>,<id>,…         – batch lookup in the detail form (see rea/batch.py)
 
     Ordering
     --------
     ?ordering=order,title,-created   (default: order, folder_name)
+
+    Fields
+    ------
+    ?fields=id,title,group_detail.name   – only these fields (see rea/fieldsets.py)
+    ?expand=exercises_detail,lesson_type – nested forms on the list endpoint
+
+    Pagination
+    ----------
+    Keyset cursors (?cursor=…, ?page_size=…); see library/pagination.py.
+
+    Ranked search
+    -------------
+    GET /api/lessons/search/?search=<term>&limit=20&offset=0
+    Best matches first, with <mark> highlights in title, folder_name and
+    group_path, and facet counts for the whole match.  Narrow with
+    ?category=<id>, ?approach=<id>, ?lesson_type=<id>, ?key=<id> and
+    ?mode=major|minor.  Without SQLite's full-text index, a plain
+    title / folder name match (see library/search.py).
+
+    Autocomplete
+    ------------
+    GET /api/lessons/autocomplete/?q=<prefix>&limit=10
+    Lesson, group, lesson type and key names completing the prefix, served
+    from an in-memory index (see library/autocomplete.py).
+
+    Caching
+    -------
+    List and detail responses carry an ETag / Last-Modified from the
+    curriculum version and answer conditional requests with 304.
+    Anonymous JSON reads are served from the response cache
+    (library/response_cache.py).
+
+    Bulk writes
+    -----------
+    POST /api/lessons/        [{group, folder_name, …}, …]   create
+    PATCH /api/lessons/bulk/  [{id, …}, …]                   update
+    PUT /api/lessons/bulk/    [{…}, …]                       upsert, matching
+                              on id or else (group, folder_name)
     """
 
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ["title", "folder_name"]
+    bulk_serializer_class = LessonBulkSerializer
+    pagination_class = LessonPagination
+    filter_backends = [DjangoFilterBackend, search.LessonSearchFilter, filters.OrderingFilter]
     ordering_fields = ["order", "title", "folder_name", "created"]
     ordering = ["order", "folder_name"]
 
     def get_queryset(self):
-        qs = (
-            Lesson.objects.select_related(
-                "group",
-                "group__parent",
-                "group__lesson_type",
-                "group__lesson_type__approach",
-                "group__lesson_type__approach__category",
-                "group__key",
-            )
-            .prefetch_related("exercises")
-            .order_by("order", "folder_name")
-        )
+        # Joins and prefetches follow the fields being rendered
+        qs = self.with_related(Lesson.objects.order_by("order", "folder_name", "id"))
 
         # --- direct FK filters ---
         group_id = self.request.query_params.get("group")
@@ -106,4 +273,116 @@ class LessonViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action == "list":
             return LessonListSerializer
-        return LessonSerializer
\ No newline at end of file
+        return LessonSerializer
+
+    @action(detail=False, methods=["get"], url_path="search")
+    def ranked_search(self, request):
+        """Full-text search, best first, with highlighted matches."""
+        term = request.query_params.get("search", "").replace("\x00", "")
+        try:
+            limit = min(max(int(request.query_params.get("limit", 20)), 0), MAX_SEARCH_LIMIT)
+            offset = max(int(request.query_params.get("offset", 0)), 0)
+        except ValueError:
+            raise ValidationError({"detail": "limit and offset must be integers."})
+        try:
+            facets = search.parse_facets(request.query_params)
+        except ValueError as exc:
+            raise ValidationError({"detail": str(exc)})
+
+        results = search.search(term, limit=limit, offset=offset, facets=facets)
+        return Response({
+            "count": results.total,
+            "facets": results.facets,
+            "results": [
+                {
+                    "id": hit.lesson_id,
+                    "title": hit.title,
+                    "folder_name": hit.folder_name,
+                    "group_path": hit.group_path,
+                    "lesson_type": hit.lesson_type,
+                    "key": hit.key,
+                    "rank": round(hit.rank, 4),
+                }
+                for hit in results.hits
+            ],
+        })
+
+    @action(detail=False, methods=["get"])
+    def autocomplete(self, request):
+        """Typeahead suggestions for the search box."""
+        try:
+            limit = max(int(request.query_params.get("limit", 10)), 0)
+        except ValueError:
+            raise ValidationError({"limit": ["Expected an integer."]})
+
+        suggestions = autocomplete.complete(request.query_params.get("q", ""), limit=limit)
+        return Response({
+            "results": [
+                {"text": label, "kind": kind, "id": pk}
+                for kind, label, pk in suggestions
+            ],
+        })
+
+
+class DictationRuleViewSet(SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only access to generated dictation rule sets and their pools.
+
+    Filtering
+    ---------
+    ?lesson_type=<id>        – rules for a LessonType
+    ?key=<id>                – rules for a Key
+    ?kind=rhythmic|melodic
+
+    Actions
+    -------
+    draw/  – one pre-generated exercise (random, or ?index=<n>)
+    midi/  – the same exercise rendered as a MIDI file
+    """
+
+    serializer_class = DictationRuleSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get_queryset(self):
+        qs = DictationRule.objects.all()
+
+        lesson_type_id = self.request.query_params.get("lesson_type")
+        if lesson_type_id:
+            qs = qs.filter(lesson_type_id=lesson_type_id)
+
+        key_id = self.request.query_params.get("key")
+        if key_id:
+            qs = qs.filter(key_id=key_id)
+
+        kind = self.request.query_params.get("kind")
+        if kind:
+            qs = qs.filter(kind=kind)
+
+        return qs
+
+    def _draw(self, request):
+        rule = self.get_object()
+        index = request.query_params.get("index")
+        try:
+            return rule, dictation.draw(rule, int(index) if index is not None else None)
+        except (ValueError, DictationExercise.DoesNotExist):
+            raise Http404("No generated dictation at this index.")
+
+    @action(detail=True, methods=["get"])
+    def draw(self, request, pk=None):
+        _rule, exercise = self._draw(request)
+        return Response(DictationExerciseSerializer(exercise).data)
+
+    @action(detail=True, methods=["get"])
+    def midi(self, request, pk=None):
+        rule, exercise = self._draw(request)
+        try:
+            data = write_midi(exercise.notes, tempo=rule.tempo, meter=rule.meter)
+        except ValueError as exc:
+            # Rules saved before tempo / meter were validated
+            raise ValidationError({"detail": str(exc)})
+        response = HttpResponse(data, content_type="audio/midi")
+        response["Content-Disposition"] = (
+            f'attachment; filename="dictation-{rule.pk}-{exercise.index}.mid"'
+        )
+        return response
@@ -0,0 +1,28 @@
+from django.contrib import admin
+from .models import PracticeAttempt, ProgressRollup, ReviewItem
+
+
+@admin.register(PracticeAttempt)
+class PracticeAttemptAdmin(admin.ModelAdmin):
+    list_display = ["user", "exercise", "lesson", "score", "performed_at"]
+    list_filter = ["performed_at"]
+    search_fields = ["user__username"]
+    raw_id_fields = ["user", "exercise", "lesson"]
+    readonly_fields = ["created"]
+
+
+@admin.register(ReviewItem)
+class ReviewItemAdmin(admin.ModelAdmin):
+    list_display = ["user", "lesson", "exercise", "ease", "interval_days", "due_at"]
+    list_filter = ["due_at"]
+    search_fields = ["user__username"]
+    raw_id_fields = ["user", "lesson", "exercise"]
+    readonly_fields = ["created"]
+
+
+@admin.register(ProgressRollup)
+class ProgressRollupAdmin(admin.ModelAdmin):
+    list_display = ["user", "node_type", "node_id", "day", "attempts", "best_score"]
+    list_filter = ["node_type", "day"]
+    search_fields = ["user__username"]
+    raw_id_fields = ["user"]
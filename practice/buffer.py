@@ -0,0 +1,169 @@
+"""
+Write buffer for practice attempts.
+
+A class of students posting results every few seconds would otherwise be a
+stream of tiny write transactions, each queuing for SQLite's single writer
+lock.  Instead, attempts are queued in memory per worker process and written
+with one bulk_create when the queue reaches PRACTICE_BUFFER_SIZE rows or its
+oldest entry is PRACTICE_FLUSH_INTERVAL seconds old, whichever comes first.
+A timer thread enforces the age bound when traffic stops, and the queue is
+flushed when the worker exits.  After each write the teacher analytics
+rollups for the affected students and days are refreshed (practice/rollups.py).
+
+When a batch is rejected, its rows are retried one at a time so a single
+bad row (say, an exercise deleted since validation) costs only itself: rows
+the database refuses outright are dropped and logged, the rest are queued
+again.  A row is given up on after MAX_WRITE_ATTEMPTS tries, and when the
+database stays unavailable the oldest rows beyond PRACTICE_BUFFER_LIMIT are
+dropped, so the queue cannot grow without bound.
+
+The trade-off is durability: a worker killed hard can lose up to one flush
+interval of attempts.  Set PRACTICE_FLUSH_INTERVAL = 0 to write synchronously.
+"""
+
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import DataError, DatabaseError, IntegrityError, connection, transaction
+
+from . import rollups
+from .models import PracticeAttempt
+
+
+logger = logging.getLogger(__name__)
+
+BULK_BATCH_SIZE = 500
+MAX_WRITE_ATTEMPTS = 10
+
+
+class AttemptBuffer:
+    """Thread-safe, per-process queue of unsaved PracticeAttempt instances."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = []
+        self._timer = None
+
+    @property
+    def max_size(self) -> int:
+        return getattr(settings, "PRACTICE_BUFFER_SIZE", 200)
+
+    @property
+    def max_age(self) -> float:
+        return getattr(settings, "PRACTICE_FLUSH_INTERVAL", 2.0)
+
+    @property
+    def limit(self) -> int:
+        return getattr(settings, "PRACTICE_BUFFER_LIMIT", 10_000)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, attempts):
+        """Queue ``attempts``; writes immediately if a flush threshold is hit."""
+        with self._lock:
+            self._pending.extend(attempts)
+            if self.max_age <= 0 or len(self._pending) >= self.max_size:
+                batch = self._take()
+            else:
+                batch = None
+                self._schedule()
+        if batch:
+            self._write(batch)
+
+    def flush(self) -> int:
+        """Write everything queued so far. Returns the number of rows written."""
+        with self._lock:
+            batch = self._take()
+        return self._write(batch)
+
+    def _schedule(self):
+        if self._timer is None and self.max_age > 0:
+            self._timer = threading.Timer(self.max_age, self._flush_from_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _take(self):
+        batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread opened its own connection; don't leak it
+            connection.close()
+
+    def _requeue(self, rows):
+        """Put unwritten ``rows`` back at the head of the queue, within the limits."""
+        for row in rows:
+            row._write_attempts = getattr(row, "_write_attempts", 0) + 1
+        kept = [row for row in rows if row._write_attempts < MAX_WRITE_ATTEMPTS]
+        if len(kept) < len(rows):
+            logger.error("Dropping %d practice attempts after %d failed writes",
+                         len(rows) - len(kept), MAX_WRITE_ATTEMPTS)
+        with self._lock:
+            self._pending[:0] = kept
+            overflow = len(self._pending) - self.limit
+            if overflow > 0:
+                del self._pending[:overflow]
+                logger.error("Practice buffer full; dropped the %d oldest attempts", overflow)
+            if self._pending:
+                self._schedule()
+
+    def _write_rows(self, rows):
+        """
+        Write ``rows`` one at a time after their batch was rejected.
+
+        Returns the rows written.  Rows the database rejects (a constraint or
+        an out-of-range value) are dropped; on any other error the database is assumed unavailable and the row and
+        everything after it are queued again.
+        """
+        written = []
+        for i, row in enumerate(rows):
+            try:
+                with transaction.atomic():
+                    PracticeAttempt.objects.bulk_create([row], ignore_conflicts=True)
+            except (IntegrityError, DataError):
+                logger.exception(
+                    "Dropping practice attempt of user %s on exercise %s (lesson %s)",
+                    row.user_id, row.exercise_id, row.lesson_id,
+                )
+            except DatabaseError:
+                logger.exception("Failed to write %d practice attempts; re-queuing", len(rows) - i)
+                self._requeue(rows[i:])
+                break
+            else:
+                written.append(row)
+        return written
+
+    def _write(self, batch) -> int:
+        if not batch:
+            return 0
+        try:
+            with transaction.atomic():
+                PracticeAttempt.objects.bulk_create(
+                    batch, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True
+                )
+        except DatabaseError:
+            logger.warning("Batch of %d practice attempts rejected; writing row by row",
+                           len(batch), exc_info=True)
+            batch = self._write_rows(batch)
+            if not batch:
+                return 0
+
+        try:
+            rollups.refresh_for_attempts(batch)
+        except DatabaseError:
+            # compact_rollups repairs the affected days on its next run
+            logger.exception("Failed to refresh progress rollups")
+        return len(batch)
+
+
+attempt_buffer = AttemptBuffer()
+atexit.register(attempt_buffer.flush)
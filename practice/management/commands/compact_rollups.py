@@ -0,0 +1,78 @@
+"""
+Management command: compact_rollups
+
+Rebuilds the teacher analytics rollups (see practice/rollups.py) from the
+raw practice attempts.  Rollups are refreshed as attempts arrive; this
+command is the periodic safety net that recomputes whole days for every
+student, and the way to backfill after importing attempts.
+
+Run it on a schedule (see rea.cron).
+
+Usage
+-----
+    python manage.py compact_rollups
+    python manage.py compact_rollups --days 30
+    python manage.py compact_rollups --all
+
+Options
+-------
+    --days   Number of days to rebuild, ending today (default: 2).
+    --all    Rebuild every day that has attempts.
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from ...models import PracticeAttempt
+from ...rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute progress rollups from practice attempts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=2,
+            help="Rebuild this many days, ending today (default: 2).",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            default=False,
+            help="Rebuild every day that has practice attempts.",
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        if options["all"]:
+            bounds = PracticeAttempt.objects.aggregate(first=Min("performed_at"), last=Max("performed_at"))
+            if bounds["first"] is None:
+                self.stdout.write(self.style.SUCCESS("Done.  No practice attempts yet."))
+                return
+            start = timezone.localdate(bounds["first"])
+            end = max(today, timezone.localdate(bounds["last"]))
+        else:
+            if options["days"] < 1:
+                raise CommandError("--days must be at least 1.")
+            start = today - timedelta(days=options["days"] - 1)
+            end = today
+
+        # One day at a time keeps each transaction (and SQLite's write lock) short
+        written = 0
+        day = start
+        while day <= end:
+            count = rebuild(day, day)
+            if count:
+                self.stdout.write(f"  ✓  {day}: {count} rows")
+            written += count
+            day += timedelta(days=1)
+
+        self.stdout.write("")
+        self.stdout.write(self.style.SUCCESS(
+            f"Done.  Days rebuilt: {(end - start).days + 1}  |  Rollup rows: {written}"
+        ))
@@ -0,0 +1,68 @@
+"""
+Management command: reschedule_reviews
+
+Folds recent practice results into every student's spaced-repetition
+schedule (see practice/scheduler.py).  Attempts received since the previous
+run are aggregated per (student, exercise) and per (student, lesson), graded
+with SM-2 and written back in bulk.
+
+Run it nightly (see rea.cron).  Each run records how far it got, so
+re-running applies nothing twice and a missed night is caught up by the
+next run.
+
+Usage
+-----
+    python manage.py reschedule_reviews
+    python manage.py reschedule_reviews --hours 48
+    python manage.py reschedule_reviews --dry-run
+
+Options
+-------
+    --hours     On the first run only (nothing processed yet), fold in the
+                attempts received during the last N hours (default: 24).
+    --dry-run   Report how many items would change without writing anything.
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ...scheduler import processed_until, reschedule
+
+
+class Command(BaseCommand):
+    help = "Apply recent practice attempts to the students' review schedules (SM-2)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=float,
+            default=24,
+            help="First run only: fold in attempts received during the last N hours (default: 24).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            default=False,
+            help="Report what would change without writing to the database.",
+        )
+
+    def handle(self, *args, **options):
+        hours = options["hours"]
+        if hours <= 0:
+            raise CommandError("--hours must be positive.")
+
+        dry_run = options["dry_run"]
+        if dry_run:
+            self.stdout.write(self.style.WARNING("--- DRY RUN — nothing will be changed ---\n"))
+
+        now = timezone.now()
+        watermark = processed_until()
+        if watermark is not None:
+            self.stdout.write(f"Folding in attempts received since {watermark:%Y-%m-%d %H:%M:%S}.")
+        totals = reschedule(since=now - timedelta(hours=hours), now=now, dry_run=dry_run)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done.  Rescheduled: {totals['updated']}  |  Newly scheduled: {totals['created']}"
+        ))
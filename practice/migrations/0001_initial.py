@@ -0,0 +1,94 @@
+# Generated by Django 4.2 on 2026-10-19 11:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("library", "0008_dictation"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PracticeAttempt",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "score",
+                    models.FloatField(
+                        help_text="Percentage of notes sung correctly (0–100)."
+                    ),
+                ),
+                ("correct_notes", models.PositiveIntegerField(default=0)),
+                ("total_notes", models.PositiveIntegerField(default=0)),
+                ("detail", models.JSONField(blank=True, default=list)),
+                ("client_id", models.UUIDField(blank=True, null=True)),
+                (
+                    "performed_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                (
+                    "exercise",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="attempts",
+                        to="library.exercise",
+                    ),
+                ),
+                (
+                    "lesson",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="attempts",
+                        to="library.lesson",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="practice_attempts",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-performed_at"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="practiceattempt",
+            index=models.Index(
+                fields=["user", "-performed_at"], name="practice_pr_user_id_a166a0_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="practiceattempt",
+            index=models.Index(
+                fields=["exercise", "-performed_at"],
+                name="practice_pr_exercis_eef8cc_idx",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="practiceattempt",
+            unique_together={("user", "client_id")},
+        ),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 4.2 on 2026-10-19 11:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0008_dictation"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("practice", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReviewItem",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("ease", models.FloatField(default=2.5)),
+                ("interval_days", models.PositiveIntegerField(default=0)),
+                (
+                    "repetitions",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Successful reviews in a row."
+                    ),
+                ),
+                ("lapses", models.PositiveIntegerField(default=0)),
+                (
+                    "last_quality",
+                    models.PositiveSmallIntegerField(
+                        blank=True, help_text="Last SM-2 grade (0–5).", null=True
+                    ),
+                ),
+                ("due_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("last_reviewed_at", models.DateTimeField(blank=True, null=True)),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                (
+                    "exercise",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="review_items",
+                        to="library.exercise",
+                    ),
+                ),
+                (
+                    "lesson",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="review_items",
+                        to="library.lesson",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="review_items",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["due_at"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="reviewitem",
+            index=models.Index(
+                fields=["user", "due_at"], name="practice_re_user_id_c5aae8_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="reviewitem",
+            constraint=models.CheckConstraint(
+                check=models.Q(
+                    models.Q(("exercise__isnull", True), ("lesson__isnull", False)),
+                    models.Q(("exercise__isnull", False), ("lesson__isnull", True)),
+                    _connector="OR",
+                ),
+                name="review_item_one_target",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="reviewitem",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("lesson__isnull", False)),
+                fields=("user", "lesson"),
+                name="review_item_unique_lesson",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="reviewitem",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("exercise__isnull", False)),
+                fields=("user", "exercise"),
+                name="review_item_unique_exercise",
+            ),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 4.2 on 2026-10-19 12:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("practice", "0002_review_item"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProgressRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "node_type",
+                    models.CharField(
+                        choices=[
+                            ("category", "Category"),
+                            ("approach", "Approach"),
+                            ("lesson_type", "Lesson type"),
+                            ("group", "Lesson group"),
+                            ("lesson", "Lesson"),
+                        ],
+                        max_length=12,
+                    ),
+                ),
+                ("node_id", models.PositiveIntegerField()),
+                ("day", models.DateField()),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("score_sum", models.FloatField(default=0)),
+                ("best_score", models.FloatField(default=0)),
+                ("correct_notes", models.PositiveIntegerField(default=0)),
+                ("total_notes", models.PositiveIntegerField(default=0)),
+                ("last_attempt_at", models.DateTimeField()),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="progress_rollups",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-day"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="progressrollup",
+            index=models.Index(
+                fields=["node_type", "node_id", "day"],
+                name="practice_pr_node_ty_002d16_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="progressrollup",
+            index=models.Index(
+                fields=["user", "day"], name="practice_pr_user_id_a1ee8c_idx"
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="progressrollup",
+            unique_together={("user", "node_type", "node_id", "day")},
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-19 18:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("practice", "0003_progress_rollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReviewSchedulerState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("processed_until", models.DateTimeField()),
+                ("finished_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
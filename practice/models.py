@@ -0,0 +1,201 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from library.models import Exercise, Lesson
+
+
+class PracticeAttempt(models.Model):
+    """
+    One graded run-through of an Exercise by a student.
+
+    Rows arrive in batches through the ingestion API and are written with
+    bulk_create (see practice/buffer.py), so nothing here may rely on
+    save() or post_save signals.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="practice_attempts",
+    )
+    exercise = models.ForeignKey(
+        Exercise, on_delete=models.CASCADE, related_name="attempts"
+    )
+    # Curriculum context the exercise was practised in, when known
+    lesson = models.ForeignKey(
+        Lesson,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="attempts",
+    )
+    score = models.FloatField(help_text="Percentage of notes sung correctly (0–100).")
+    correct_notes = models.PositiveIntegerField(default=0)
+    total_notes = models.PositiveIntegerField(default=0)
+    # Per-note breakdown, e.g. [{"pitch": 60, "detected": 60.1, "correct": true}, …]
+    detail = models.JSONField(default=list, blank=True)
+    # Client-generated id so retried uploads don't create duplicates
+    client_id = models.UUIDField(null=True, blank=True)
+
+    performed_at = models.DateTimeField(default=timezone.now)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-performed_at"]
+        unique_together = ("user", "client_id")
+        indexes = [
+            models.Index(fields=["user", "-performed_at"]),
+            models.Index(fields=["exercise", "-performed_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user} – exercise {self.exercise_id} ({self.score:.0f}%)"
+
+
+class ReviewItem(models.Model):
+    """
+    Spaced-repetition state of one Lesson or Exercise for one student (SM-2).
+
+    ``due_at`` is indexed together with ``user`` so "what should I practise
+    now" is a single range scan; see practice/scheduler.py.
+    """
+
+    DEFAULT_EASE = 2.5
+    MIN_EASE = 1.3
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="review_items",
+    )
+    # Exactly one of lesson / exercise is set
+    lesson = models.ForeignKey(
+        Lesson,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="review_items",
+    )
+    exercise = models.ForeignKey(
+        Exercise,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="review_items",
+    )
+
+    ease = models.FloatField(default=DEFAULT_EASE)
+    interval_days = models.PositiveIntegerField(default=0)
+    repetitions = models.PositiveIntegerField(
+        default=0, help_text="Successful reviews in a row."
+    )
+    lapses = models.PositiveIntegerField(default=0)
+    last_quality = models.PositiveSmallIntegerField(
+        null=True, blank=True, help_text="Last SM-2 grade (0–5)."
+    )
+
+    due_at = models.DateTimeField(default=timezone.now)
+    last_reviewed_at = models.DateTimeField(null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["due_at"]
+        indexes = [models.Index(fields=["user", "due_at"])]
+        constraints = [
+            models.CheckConstraint(
+                check=(
+                    models.Q(lesson__isnull=False, exercise__isnull=True)
+                    | models.Q(lesson__isnull=True, exercise__isnull=False)
+                ),
+                name="review_item_one_target",
+            ),
+            models.UniqueConstraint(
+                fields=["user", "lesson"],
+                condition=models.Q(lesson__isnull=False),
+                name="review_item_unique_lesson",
+            ),
+            models.UniqueConstraint(
+                fields=["user", "exercise"],
+                condition=models.Q(exercise__isnull=False),
+                name="review_item_unique_exercise",
+            ),
+        ]
+
+    def __str__(self):
+        target = f"lesson {self.lesson_id}" if self.lesson_id else f"exercise {self.exercise_id}"
+        return f"{self.user} – {target} (due {self.due_at:%Y-%m-%d})"
+
+
+class ReviewSchedulerState(models.Model):
+    """
+    Progress of the nightly rescheduling (a single row).
+
+    ``processed_until`` is the end of the last window of PracticeAttempts
+    folded into the ReviewItems; the next run starts there, so a re-run
+    applies nothing twice and a missed night is caught up by the next one.
+    See practice/scheduler.py.
+    """
+
+    processed_until = models.DateTimeField()
+    finished_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"processed until {self.processed_until:%Y-%m-%d %H:%M:%S}"
+
+
+class ProgressRollup(models.Model):
+    """
+    Practice totals for one student, one curriculum node and one day.
+
+    Every attempt is counted once on its Lesson and once on each ancestor
+    (LessonGroups up to the root, LessonType, Approach, Category), so any
+    level of the tree is answered by reading the rows for that node.  Rows
+    are derived from PracticeAttempt and rebuilt by practice/rollups.py;
+    never edit them by hand.
+    """
+
+    CATEGORY = "category"
+    APPROACH = "approach"
+    LESSON_TYPE = "lesson_type"
+    GROUP = "group"
+    LESSON = "lesson"
+
+    NODE_TYPE_CHOICES = [
+        (CATEGORY, "Category"),
+        (APPROACH, "Approach"),
+        (LESSON_TYPE, "Lesson type"),
+        (GROUP, "Lesson group"),
+        (LESSON, "Lesson"),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="progress_rollups",
+    )
+    node_type = models.CharField(max_length=12, choices=NODE_TYPE_CHOICES)
+    node_id = models.PositiveIntegerField()
+    day = models.DateField()
+
+    attempts = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    best_score = models.FloatField(default=0)
+    correct_notes = models.PositiveIntegerField(default=0)
+    total_notes = models.PositiveIntegerField(default=0)
+    last_attempt_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-day"]
+        unique_together = ("user", "node_type", "node_id", "day")
+        indexes = [
+            models.Index(fields=["node_type", "node_id", "day"]),
+            models.Index(fields=["user", "day"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user} – {self.node_type} {self.node_id} on {self.day}"
+
+    @property
+    def mean_score(self):
+        return self.score_sum / self.attempts if self.attempts else 0.0
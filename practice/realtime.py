@@ -0,0 +1,463 @@
+"""
+Real-time assessment over WebSocket.
+
+    ws(s)://<host>/ws/exercises/<id>/assess/
+
+Served by the ASGI application in rea/asgi.py (see rea-asgi.service); the
+regular WSGI deployment is unaffected.  Browsers authenticate with the
+normal Django session cookie and must send an Origin we serve; clients that
+send no Origin must authenticate with an ``Authorization: Token <key>``
+header (rest_framework.authtoken) instead, as the cookie alone could be a
+victim's.
+
+Protocol
+--------
+Client → server (text frames are JSON):
+
+    {"type": "start", "tempo": 90, "offset": 0.5, "sample_rate": 48000}
+        Optional; must come first if sent.  ``tempo`` re-times the MIDI,
+        ``offset`` is the count-in before the first note, ``sample_rate`` is
+        required before sending audio.
+
+    {"type": "pitch", "frames": [[t, frequency, confidence], ...]}
+        Pitch frames detected on the client (t = seconds since start).
+
+    <binary>
+        Raw audio: little-endian float32 mono samples at ``sample_rate``.
+        Pitch is tracked on the server exactly like library.pitch.track_pitch,
+        but with the browser's trailing analyser buffer instead of a centred one.
+
+    {"type": "stop"}
+        Grade the remaining notes, reply with the result and close.
+
+Server → client:
+
+    {"type": "ready", "notes": [{"index", "pitch", "start", "end"}, ...]}
+    {"type": "note", "index": 3, ...grade_note fields}   – a note was graded
+    {"type": "progress", "t", "note", "detected", "cents", "in_tune"}
+    {"type": "result", ...assess_take fields}
+    {"type": "error", "detail": "..."}
+
+Scoring is incremental: each frame is filed under the note(s) whose graded
+span contains it, and a note is graded with library.pitch.grade_note as soon
+as a frame arrives past its span — so the totals match a server-side
+``assess_take`` of the same frames.
+
+Nothing on the per-frame path touches the database or blocks, so a single
+event loop can hold hundreds of sessions; only connecting and recording the
+final attempt go through ``sync_to_async``.
+"""
+
+import json
+import logging
+import math
+import re
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.contrib.auth.models import AnonymousUser
+from django.http.request import split_domain_port, validate_host
+from rest_framework.authtoken.models import Token
+
+from library.midi import read_midi, retime
+from library.models import Exercise
+from library.pitch import (
+    A4,
+    FFT_SIZE,
+    FRAME_RATE,
+    BROWSER_FRAME_RATE,
+    MIN_LEVEL_DB,
+    NOTE_CONFIDENCE_THRESHOLD,
+    PITCH_TOLERANCE,
+    SMOOTHING_FACTOR,
+    WINDOW_SIZE,
+    grade_note,
+    graded_span,
+    smooth_pitch,
+    summarize,
+    yin_frames,
+)
+
+from .buffer import attempt_buffer
+from .models import PracticeAttempt
+
+
+logger = logging.getLogger(__name__)
+
+PATH_RE = re.compile(r"^/ws/exercises/(?P<pk>\d+)/assess/$")
+
+# Guards against runaway clients
+MAX_MESSAGE_BYTES = 1024 * 1024
+MAX_SESSION_SECONDS = 15 * 60
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 192000
+
+# Application close codes (4000–4999 are free for application use)
+CLOSE_FORBIDDEN = 4403
+CLOSE_NOT_FOUND = 4404
+
+
+def _midi(frequency):
+    """Fractional MIDI pitch; works on arrays and (cheaply) on plain floats."""
+    if isinstance(frequency, float):
+        return 69 + 12 * math.log2(frequency / A4)
+    return 69 + 12 * np.log2(frequency / A4)
+
+
+# ---------------------------------------------------------------------------
+# Incremental scoring
+# ---------------------------------------------------------------------------
+
+class StreamingAssessment:
+    """Grades expected ``notes`` from pitch frames arriving in time order."""
+
+    def __init__(self, notes, offset=0.0, tolerance=PITCH_TOLERANCE):
+        self.notes = notes
+        self.tolerance = tolerance
+        spans = [graded_span(note, offset) for note in notes]
+        self._order = sorted(range(len(notes)), key=lambda i: spans[i][0])
+        self._spans = spans
+        self._next = 0          # position in _order of the next note to open
+        self._open = {}         # note index → list of per-frame MIDI values
+        self.results = {}       # note index → grade_note dict
+        self.last_time = float("-inf")
+
+    def add(self, t, midi):
+        """
+        File one frame (``midi`` is NaN when unvoiced).  Returns the indices
+        of notes that became gradeable; frames older than the last are ignored.
+        """
+        if t < self.last_time:
+            return []
+        self.last_time = t
+
+        while self._next < len(self._order) and self._spans[self._order[self._next]][0] <= t:
+            self._open[self._order[self._next]] = []
+            self._next += 1
+
+        done = [i for i in self._open if self._spans[i][1] <= t]
+        for i in done:
+            self.results[i] = grade_note(self.notes[i], self._open.pop(i), self.tolerance)
+        for frames in self._open.values():
+            frames.append(midi)
+        return done
+
+    def current(self):
+        """Index of the earliest note currently being sung, or None."""
+        return min(self._open) if self._open else None
+
+    def finish(self):
+        """Grade every note not graded yet and return the assess_take summary."""
+        for i in list(self._open):
+            self.results[i] = grade_note(self.notes[i], self._open.pop(i), self.tolerance)
+        for i in self._order[self._next:]:
+            self.results[i] = grade_note(self.notes[i], [], self.tolerance)
+        self._next = len(self._order)
+        return summarize([self.results[i] for i in range(len(self.notes))])
+
+
+class AudioTracker:
+    """
+    Chunk-by-chunk version of library.pitch.track_pitch.
+
+    Frames are analysed every 1/FRAME_RATE seconds over the FFT_SIZE samples
+    that end at the frame time — what the browser's AnalyserNode sees — so
+    feedback never waits for future audio.  Each chunk's frames go through
+    one batched ``yin_frames`` call.
+    """
+
+    def __init__(self, sample_rate, frame_rate=FRAME_RATE):
+        self.sample_rate = sample_rate
+        self.hop = max(1, int(round(sample_rate / frame_rate)))
+        self.factor = SMOOTHING_FACTOR ** (BROWSER_FRAME_RATE / frame_rate)
+        self.hann = np.hanning(WINDOW_SIZE).astype(np.float32)
+        # The analyser starts out full of silence
+        self._buffer = np.zeros(FFT_SIZE, dtype=np.float32)
+        self._base = -FFT_SIZE  # absolute index of _buffer[0]
+        self._next_end = self.hop
+        self._last = None
+
+    @property
+    def received(self) -> int:
+        return self._base + len(self._buffer)
+
+    def feed(self, samples):
+        """Append samples; returns (times, midi) for every completed frame."""
+        self._buffer = np.concatenate((self._buffer, samples))
+        ends = np.arange(self._next_end, self.received + 1, self.hop)
+        if not len(ends):
+            return np.empty(0), np.empty(0)
+
+        starts = ends - FFT_SIZE - self._base
+        buffers = np.lib.stride_tricks.sliding_window_view(self._buffer, FFT_SIZE)[starts]
+        level = np.einsum("ij,ij->i", buffers, buffers, dtype=np.float64) / FFT_SIZE
+        with np.errstate(divide="ignore"):
+            level_db = np.where(level > 0, 10 * np.log10(level), -100.0)
+
+        offset = (FFT_SIZE - WINDOW_SIZE) // 2
+        frequency, confidence = yin_frames(
+            buffers[:, offset:offset + WINDOW_SIZE] * self.hann, self.sample_rate
+        )
+        frequency = smooth_pitch(frequency, self.factor, last=self._last)
+        self._last = float(frequency[-1])
+
+        voiced = (confidence > NOTE_CONFIDENCE_THRESHOLD) & (level_db > MIN_LEVEL_DB) & (frequency > 0)
+        midi = np.full(len(ends), np.nan)
+        midi[voiced] = _midi(frequency[voiced])
+
+        self._next_end = int(ends[-1]) + self.hop
+        keep_from = self._next_end - FFT_SIZE
+        self._buffer = self._buffer[keep_from - self._base:]
+        self._base = keep_from
+        return ends / self.sample_rate, midi
+
+
+# ---------------------------------------------------------------------------
+# Database access (run through sync_to_async)
+# ---------------------------------------------------------------------------
+
+def _authenticate(scope):
+    """The session cookie's user; for sockets without an Origin, the token's."""
+    headers = dict(scope.get("headers", []))
+    if b"origin" not in headers:
+        return _token_user(headers.get(b"authorization", b""))
+
+    cookies = SimpleCookie()
+    for name, value in scope.get("headers", []):
+        if name == b"cookie":
+            cookies.load(value.decode("latin-1"))
+    morsel = cookies.get(settings.SESSION_COOKIE_NAME)
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore(morsel.value if morsel else None)
+    return get_user(SimpleNamespace(session=session))
+
+
+def _token_user(authorization: bytes):
+    keyword, _, key = authorization.decode("latin-1").partition(" ")
+    token = None
+    if keyword == "Token" and key.strip():
+        token = Token.objects.select_related("user").filter(key=key.strip()).first()
+    if token is None or not token.user.is_active:
+        return AnonymousUser()
+    return token.user
+
+
+def _load_notes(pk):
+    exercise = Exercise.objects.filter(pk=pk).only("id", "midi").first()
+    if exercise is None or not exercise.midi:
+        return None
+    with exercise.midi.open("rb") as fh:
+        return read_midi(fh.read())
+
+
+def _record_attempt(user, exercise_id, result):
+    attempt_buffer.add([
+        PracticeAttempt(
+            user=user,
+            exercise_id=exercise_id,
+            score=result["score"],
+            correct_notes=result["correct_notes"],
+            total_notes=result["total_notes"],
+            detail=result["notes"],
+        )
+    ])
+
+
+def _origin_allowed(scope) -> bool:
+    """
+    Reject cross-site sockets: the Origin host must be one we serve.  A
+    socket without one is let through here and must then present a token
+    (see _authenticate).
+    """
+    origin = dict(scope.get("headers", [])).get(b"origin")
+    if origin is None:
+        return True
+    host = origin.decode("latin-1").split("://", 1)[-1]
+    domain, _port = split_domain_port(host)
+    allowed = settings.ALLOWED_HOSTS
+    if settings.DEBUG and not allowed:
+        allowed = [".localhost", "127.0.0.1", "[::1]"]
+    return bool(domain) and validate_host(domain, allowed)
+
+
+# ---------------------------------------------------------------------------
+# ASGI application
+# ---------------------------------------------------------------------------
+
+class AssessmentSocket:
+    """One WebSocket assessment session."""
+
+    def __init__(self, scope, receive, send, exercise_id):
+        self.scope = scope
+        self.receive = receive
+        self.send = send
+        self.exercise_id = exercise_id
+        self.notes = None
+        self.assessment = None
+        self.tracker = None
+
+    async def send_json(self, payload):
+        await self.send({"type": "websocket.send", "text": json.dumps(payload)})
+
+    async def close(self, code=1000):
+        await self.send({"type": "websocket.close", "code": code})
+
+    async def run(self):
+        event = await self.receive()
+        if event["type"] != "websocket.connect":
+            return
+
+        if not _origin_allowed(self.scope):
+            return await self.close(CLOSE_FORBIDDEN)
+        self.user = await sync_to_async(_authenticate)(self.scope)
+        if not self.user.is_authenticated:
+            return await self.close(CLOSE_FORBIDDEN)
+        try:
+            self.notes = await sync_to_async(_load_notes)(self.exercise_id)
+        except ValueError:
+            self.notes = None
+        if not self.notes:
+            return await self.close(CLOSE_NOT_FOUND)
+
+        await self.send({"type": "websocket.accept"})
+        self.assessment = StreamingAssessment(self.notes)
+
+        while True:
+            event = await self.receive()
+            if event["type"] == "websocket.disconnect":
+                return
+            try:
+                if event.get("bytes") is not None:
+                    done = await self.on_audio(event["bytes"])
+                else:
+                    done = await self.on_message(event.get("text") or "")
+            except ValueError as exc:
+                await self.send_json({"type": "error", "detail": str(exc)})
+                continue
+            if done:
+                return await self.close()
+
+    async def on_message(self, text):
+        if len(text) > MAX_MESSAGE_BYTES:
+            raise ValueError("Message too large.")
+        try:
+            message = json.loads(text)
+            kind = message["type"]
+        except (ValueError, TypeError, KeyError):
+            raise ValueError("Messages must be JSON objects with a 'type'.")
+
+        if kind == "start":
+            return await self.on_start(message)
+        if kind == "pitch":
+            return await self.on_pitch(message.get("frames"))
+        if kind == "stop":
+            return await self.on_stop()
+        raise ValueError(f"Unknown message type: {kind!r}.")
+
+    async def on_start(self, message):
+        if self.assessment.last_time > float("-inf"):
+            raise ValueError("'start' must be sent before any frames.")
+        try:
+            tempo = float(message.get("tempo") or 0)
+            offset = float(message.get("offset") or 0)
+            sample_rate = int(message.get("sample_rate") or 0)
+        except (TypeError, ValueError):
+            raise ValueError("tempo, offset and sample_rate must be numbers.")
+
+        if tempo:
+            if not 20 <= tempo <= 400:
+                raise ValueError("tempo must be between 20 and 400 BPM.")
+            retime(self.notes, tempo)
+        if sample_rate:
+            if not MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE:
+                raise ValueError("Unsupported sample_rate.")
+            self.tracker = AudioTracker(sample_rate)
+
+        self.assessment = StreamingAssessment(self.notes, offset=offset)
+        await self.send_json({
+            "type": "ready",
+            "notes": [
+                {"index": i, "pitch": n["pitch"], "start": round(n["start"], 3), "end": round(n["end"], 3)}
+                for i, n in enumerate(self.notes)
+            ],
+        })
+
+    async def on_pitch(self, frames):
+        if not isinstance(frames, list):
+            raise ValueError("'frames' must be a list of [t, frequency, confidence].")
+        times, midi = [], []
+        try:
+            for t, frequency, confidence in frames:
+                # null or 0 frequency / confidence: nothing detected
+                t, frequency, confidence = float(t), float(frequency or 0), float(confidence or 0)
+                if not (math.isfinite(t) and math.isfinite(frequency) and math.isfinite(confidence)):
+                    raise ValueError
+                times.append(t)
+                voiced = frequency > 0 and confidence > NOTE_CONFIDENCE_THRESHOLD
+                midi.append(_midi(frequency) if voiced else math.nan)
+        except (TypeError, ValueError):
+            raise ValueError("'frames' must be a list of [t, frequency, confidence] finite numbers.")
+        return await self.feed(times, midi)
+
+    async def on_audio(self, data):
+        if self.tracker is None:
+            raise ValueError("Send 'start' with a sample_rate before audio.")
+        if len(data) > MAX_MESSAGE_BYTES or len(data) % 4:
+            raise ValueError("Audio chunks must be float32 samples, at most 1 MB.")
+        samples = np.frombuffer(data, dtype="<f4")
+        if not np.isfinite(samples).all():
+            raise ValueError("Audio samples must be finite.")
+        times, midi = self.tracker.feed(samples)
+        return await self.feed(times.tolist(), midi.tolist())
+
+    async def feed(self, times, midi):
+        assessment = self.assessment
+        for t, value in zip(times, midi):
+            for index in assessment.add(t, value):
+                await self.send_json({"type": "note", "index": index, **assessment.results[index]})
+        if not times:
+            return False
+
+        last = midi[-1]
+        note = assessment.current()
+        detected = None if math.isnan(last) else round(last, 2)
+        cents = None
+        if detected is not None and note is not None:
+            cents = int(round((last - self.notes[note]["pitch"]) * 100))
+        await self.send_json({
+            "type": "progress",
+            "t": round(times[-1], 3),
+            "note": note,
+            "detected": detected,
+            "cents": cents,
+            "in_tune": cents is not None and abs(cents) < assessment.tolerance * 100,
+        })
+
+        if assessment.last_time > MAX_SESSION_SECONDS:
+            return await self.on_stop()
+        return False
+
+    async def on_stop(self):
+        result = self.assessment.finish()
+        result["exercise"] = self.exercise_id
+        await self.send_json({"type": "result", **result})
+        try:
+            await sync_to_async(_record_attempt)(self.user, self.exercise_id, result)
+        except Exception:
+            logger.exception("Could not record streamed attempt for exercise %s", self.exercise_id)
+        return True
+
+
+async def websocket_application(scope, receive, send):
+    """Route WebSocket connections; unknown paths are rejected."""
+    match = PATH_RE.match(scope["path"])
+    if match is None:
+        await receive()  # websocket.connect
+        await send({"type": "websocket.close", "code": CLOSE_NOT_FOUND})
+        return
+    await AssessmentSocket(scope, receive, send, int(match.group("pk"))).run()
@@ -0,0 +1,253 @@
+"""
+Materialised progress rollups for teacher analytics.
+
+ProgressRollup holds per (student, curriculum node, day) totals.  They are
+always rebuilt from PracticeAttempt rather than incremented, so re-running
+is harmless and duplicates dropped at ingestion can never be double-counted:
+
+* ``refresh_for_attempts`` runs after every ingestion flush (see
+  practice/buffer.py) and rebuilds just the (student, day) slices the batch
+  touched;
+* the ``compact_rollups`` command rebuilds a whole window of days for every
+  student on a schedule, repairing anything a failed refresh left behind.
+
+A rebuild costs one grouped query over the window's attempts plus a few
+small lookups to map lessons onto their ancestors — independent of the
+size of the curriculum.
+"""
+
+import operator
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from library.models import Lesson, LessonGroup, LessonType
+from .models import PracticeAttempt, ProgressRollup
+
+
+BATCH_SIZE = 500
+
+
+def day_start(day):
+    """Aware datetime of local midnight at the start of ``day``."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+# ---------------------------------------------------------------------------
+# Curriculum lookups
+# ---------------------------------------------------------------------------
+
+def exercise_lessons(exercise_ids):
+    """Fallback lesson for attempts recorded without one: the exercise's first lesson."""
+    if not exercise_ids:
+        return {}
+    through = Lesson.exercises.through
+    return dict(
+        through.objects
+        .filter(exercise_id__in=exercise_ids)
+        .values("exercise_id")
+        .annotate(lesson_id=Min("lesson_id"))
+        .values_list("exercise_id", "lesson_id")
+    )
+
+
+def lesson_ancestors(lesson_ids):
+    """
+    ``{lesson_id: [(node_type, node_id), …]}`` — the lesson itself followed
+    by every group above it, its LessonType, Approach and Category.
+
+    One query per tree level of groups, plus one each for the lessons and
+    the lesson types.
+    """
+    lesson_group = dict(
+        Lesson.objects.filter(pk__in=lesson_ids).values_list("pk", "group_id")
+    )
+
+    groups = {}  # id → (parent_id, lesson_type_id)
+    pending = set(lesson_group.values())
+    while pending:
+        rows = LessonGroup.objects.filter(pk__in=pending).values_list("pk", "parent_id", "lesson_type_id")
+        for pk, parent_id, lesson_type_id in rows:
+            groups[pk] = (parent_id, lesson_type_id)
+        pending = {parent for parent, _lt in groups.values() if parent and parent not in groups}
+
+    type_ids = {lt for _parent, lt in groups.values() if lt}
+    types = {
+        pk: (approach_id, category_id)
+        for pk, approach_id, category_id in LessonType.objects.filter(pk__in=type_ids)
+        .values_list("pk", "approach_id", "approach__category_id")
+    }
+
+    ancestors = {}
+    for lesson_id, group_id in lesson_group.items():
+        nodes = [(ProgressRollup.LESSON, lesson_id)]
+        lesson_type_id = None
+        seen = set()
+        while group_id and group_id in groups and group_id not in seen:
+            seen.add(group_id)
+            nodes.append((ProgressRollup.GROUP, group_id))
+            group_id, lesson_type_id = groups[group_id]
+        if lesson_type_id in types:
+            approach_id, category_id = types[lesson_type_id]
+            nodes += [
+                (ProgressRollup.LESSON_TYPE, lesson_type_id),
+                (ProgressRollup.APPROACH, approach_id),
+                (ProgressRollup.CATEGORY, category_id),
+            ]
+        ancestors[lesson_id] = nodes
+    return ancestors
+
+
+# ---------------------------------------------------------------------------
+# Rebuilding
+# ---------------------------------------------------------------------------
+
+def rebuild(start_day, end_day, user_ids=None) -> int:
+    """
+    Recompute every rollup for days ``start_day``..``end_day`` (inclusive),
+    limited to ``user_ids`` when given.  Returns the number of rows written.
+    """
+    attempts = PracticeAttempt.objects.filter(
+        performed_at__gte=day_start(start_day),
+        performed_at__lt=day_start(end_day + timedelta(days=1)),
+    )
+    rollups = ProgressRollup.objects.filter(day__gte=start_day, day__lte=end_day)
+    if user_ids is not None:
+        attempts = attempts.filter(user_id__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+    return _rebuild(attempts, rollups)
+
+
+def _rebuild(attempts, rollups) -> int:
+    """Replace ``rollups`` with totals recomputed from ``attempts``."""
+    groups = list(
+        attempts
+        .annotate(day=TruncDate("performed_at"))
+        .values("user_id", "day", "lesson_id", "exercise_id")
+        .annotate(
+            n=Count("id"),
+            score_sum=Sum("score"),
+            best=Max("score"),
+            correct=Sum("correct_notes"),
+            total=Sum("total_notes"),
+            last=Max("performed_at"),
+        )
+        .order_by()
+    )
+
+    fallback = exercise_lessons({g["exercise_id"] for g in groups if g["lesson_id"] is None})
+    for group in groups:
+        if group["lesson_id"] is None:
+            group["lesson_id"] = fallback.get(group["exercise_id"])
+    ancestors = lesson_ancestors({g["lesson_id"] for g in groups if g["lesson_id"]})
+
+    totals = defaultdict(lambda: {"n": 0, "score_sum": 0.0, "best": 0.0, "correct": 0, "total": 0, "last": None})
+    for group in groups:
+        for node_type, node_id in ancestors.get(group["lesson_id"], ()):
+            row = totals[(group["user_id"], node_type, node_id, group["day"])]
+            row["n"] += group["n"]
+            row["score_sum"] += group["score_sum"] or 0.0
+            row["best"] = max(row["best"], group["best"] or 0.0)
+            row["correct"] += group["correct"] or 0
+            row["total"] += group["total"] or 0
+            if row["last"] is None or group["last"] > row["last"]:
+                row["last"] = group["last"]
+
+    objs = [
+        ProgressRollup(
+            user_id=user_id,
+            node_type=node_type,
+            node_id=node_id,
+            day=day,
+            attempts=row["n"],
+            score_sum=row["score_sum"],
+            best_score=row["best"],
+            correct_notes=row["correct"],
+            total_notes=row["total"],
+            last_attempt_at=row["last"],
+        )
+        for (user_id, node_type, node_id, day), row in totals.items()
+    ]
+
+    with transaction.atomic():
+        rollups.delete()
+        ProgressRollup.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+    return len(objs)
+
+
+def refresh_for_attempts(attempts) -> int:
+    """Rebuild the (student, day) slices touched by a batch of new attempts."""
+    if not attempts:
+        return 0
+    users_by_day = defaultdict(set)
+    for attempt in attempts:
+        users_by_day[timezone.localdate(attempt.performed_at)].add(attempt.user_id)
+
+    # One condition per day; ingestion keeps performed_at within a few weeks
+    # (see PracticeAttemptSerializer), so there are never many
+    attempts = PracticeAttempt.objects.filter(reduce(operator.or_, (
+        Q(
+            user_id__in=user_ids,
+            performed_at__gte=day_start(day),
+            performed_at__lt=day_start(day + timedelta(days=1)),
+        )
+        for day, user_ids in users_by_day.items()
+    )))
+    rollups = ProgressRollup.objects.filter(reduce(operator.or_, (
+        Q(user_id__in=user_ids, day=day) for day, user_ids in users_by_day.items()
+    )))
+    return _rebuild(attempts, rollups)
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def summarize(rows):
+    """Add ``mean_score`` to aggregated rollup dicts (see ``node_totals``)."""
+    for row in rows:
+        row["mean_score"] = row["score_sum"] / row["attempts"] if row["attempts"] else 0.0
+    return rows
+
+
+def node_totals(node_type, node_ids, since):
+    """Class-wide totals per node since ``since`` — ``{node_id: {...}}``."""
+    rows = (
+        ProgressRollup.objects
+        .filter(node_type=node_type, node_id__in=node_ids, day__gte=since)
+        .values("node_id")
+        .annotate(
+            students=Count("user_id", distinct=True),
+            attempts=Sum("attempts"),
+            score_sum=Sum("score_sum"),
+            best_score=Max("best_score"),
+            last_attempt_at=Max("last_attempt_at"),
+        )
+        .order_by()
+    )
+    return {row["node_id"]: row for row in summarize(list(rows))}
+
+
+def student_totals(node_type, node_ids, since):
+    """Per-student totals over ``node_ids`` since ``since``, most active first."""
+    rows = (
+        ProgressRollup.objects
+        .filter(node_type=node_type, node_id__in=node_ids, day__gte=since)
+        .values("user_id", "user__username", "user__first_name", "user__last_name")
+        .annotate(
+            attempts=Sum("attempts"),
+            score_sum=Sum("score_sum"),
+            best_score=Max("best_score"),
+            correct_notes=Sum("correct_notes"),
+            total_notes=Sum("total_notes"),
+            days_active=Count("day", distinct=True),
+            last_attempt_at=Max("last_attempt_at"),
+        )
+        .order_by("-attempts", "user__username")
+    )
+    return summarize(list(rows))
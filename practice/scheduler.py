@@ -0,0 +1,178 @@
+"""
+Spaced-repetition scheduling (SM-2).
+
+Each ReviewItem holds the SM-2 state of one Lesson or Exercise for one
+student.  Practice results are folded in nightly by ``reschedule`` (run by
+the ``reschedule_reviews`` command): the PracticeAttempts received since
+the previous run are aggregated per (user, exercise) and per (user, lesson)
+in two grouped queries, the new states are computed in Python, and the rows
+are written back with bulk_update / bulk_create — no per-row saves.
+
+``due_items`` answers "what should I practise now" with one range scan of
+the (user, due_at) index.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Avg
+from django.utils import timezone
+
+from .models import PracticeAttempt, ReviewItem, ReviewSchedulerState
+
+
+BATCH_SIZE = 500
+
+STATE_FIELDS = ["ease", "interval_days", "repetitions", "lapses", "last_quality", "due_at", "last_reviewed_at"]
+
+# Mean score (%) → SM-2 quality grade
+QUALITY_THRESHOLDS = [(90, 5), (75, 4), (60, 3), (40, 2), (20, 1)]
+
+
+def quality_from_score(score: float) -> int:
+    """Map a percentage score to an SM-2 grade 0–5 (3 and up is a pass)."""
+    for threshold, quality in QUALITY_THRESHOLDS:
+        if score >= threshold:
+            return quality
+    return 0
+
+
+def sm2(item, quality: int, now):
+    """Apply one SM-2 review of grade ``quality`` to ``item`` in place."""
+    if quality >= 3:
+        if item.repetitions == 0:
+            item.interval_days = 1
+        elif item.repetitions == 1:
+            item.interval_days = 6
+        else:
+            item.interval_days = max(1, round(item.interval_days * item.ease))
+        item.repetitions += 1
+    else:
+        item.repetitions = 0
+        item.interval_days = 1
+        item.lapses += 1
+
+    item.ease = max(
+        ReviewItem.MIN_EASE,
+        item.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02),
+    )
+    item.last_quality = quality
+    item.last_reviewed_at = now
+    item.due_at = now + timedelta(days=item.interval_days)
+    return item
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+
+def due_items(user, now=None, limit=20):
+    """The ``limit`` most overdue items for ``user``."""
+    now = now or timezone.now()
+    return (
+        ReviewItem.objects
+        .filter(user=user, due_at__lte=now)
+        .select_related("lesson", "exercise")
+        .order_by("due_at")[:limit]
+    )
+
+
+def enroll(user, lessons=(), exercises=(), now=None) -> int:
+    """Start scheduling ``lessons`` / ``exercises`` for ``user``, due now."""
+    now = now or timezone.now()
+    items = [ReviewItem(user=user, lesson=lesson, due_at=now) for lesson in lessons]
+    items += [ReviewItem(user=user, exercise=exercise, due_at=now) for exercise in exercises]
+    # Already-scheduled targets are skipped by the unique constraints
+    created = ReviewItem.objects.bulk_create(items, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    return len(created)
+
+
+# ---------------------------------------------------------------------------
+# Nightly rescheduling
+#
+# Each run folds in the attempts received between the previous run's
+# watermark (ReviewSchedulerState.processed_until) and ``now`` and moves the
+# watermark to ``now`` in the same transaction as the ReviewItem writes.
+# Every attempt is therefore applied exactly once: re-running straight away
+# finds an empty window, and after a missed night the next run covers both.
+# ---------------------------------------------------------------------------
+
+def _attempt_groups(target: str, since, now):
+    """Mean score per (user, <target>) for attempts received in [since, now)."""
+    return (
+        PracticeAttempt.objects
+        .filter(created__gte=since, created__lt=now, **{f"{target}__isnull": False})
+        .values("user_id", f"{target}_id")
+        .annotate(score=Avg("score"))
+        .order_by("user_id", f"{target}_id")
+    )
+
+
+def _reschedule_batch(target: str, groups, now, dry_run: bool):
+    key = f"{target}_id"
+    existing = {
+        (item.user_id, getattr(item, key)): item
+        for item in ReviewItem.objects.filter(
+            user_id__in={g["user_id"] for g in groups},
+            **{f"{key}__in": {g[key] for g in groups}},
+        )
+    }
+
+    to_update, to_create = [], []
+    for group in groups:
+        item = existing.get((group["user_id"], group[key]))
+        if item is None:
+            item = ReviewItem(user_id=group["user_id"], **{key: group[key]})
+            to_create.append(item)
+        else:
+            to_update.append(item)
+        sm2(item, quality_from_score(group["score"]), now)
+
+    if not dry_run:
+        ReviewItem.objects.bulk_update(to_update, STATE_FIELDS, batch_size=BATCH_SIZE)
+        ReviewItem.objects.bulk_create(to_create, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    return len(to_update), len(to_create)
+
+
+def processed_until():
+    """End of the last window folded in, or None before the first run."""
+    return ReviewSchedulerState.objects.filter(pk=1).values_list("processed_until", flat=True).first()
+
+
+def reschedule(since=None, now=None, dry_run: bool = False):
+    """
+    Fold PracticeAttempts received since the last run, up to ``now``, into
+    the students' schedules.  Returns ``{"updated": n, "created": n}``.
+
+    ``since`` is only the start of the very first window, before any run
+    has recorded a watermark (default: ``now``, i.e. start from scratch).
+    A dry run reports the same numbers but leaves the watermark alone.
+    """
+    now = now or timezone.now()
+    totals = {"updated": 0, "created": 0}
+    with transaction.atomic():
+        # Locks the row so overlapping runs cannot fold in the same window
+        state = ReviewSchedulerState.objects.select_for_update().filter(pk=1).first()
+        start = state.processed_until if state else (since or now)
+        if start >= now:
+            return totals
+
+        for target in ("exercise", "lesson"):
+            batch = []
+            for group in _attempt_groups(target, start, now).iterator(chunk_size=BATCH_SIZE):
+                batch.append(group)
+                if len(batch) >= BATCH_SIZE:
+                    updated, created = _reschedule_batch(target, batch, now, dry_run)
+                    totals["updated"] += updated
+                    totals["created"] += created
+                    batch = []
+            if batch:
+                updated, created = _reschedule_batch(target, batch, now, dry_run)
+                totals["updated"] += updated
+                totals["created"] += created
+
+        if not dry_run:
+            ReviewSchedulerState.objects.update_or_create(
+                pk=1, defaults={"processed_until": now, "finished_at": timezone.now()},
+            )
+    return totals
@@ -0,0 +1,125 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework import serializers
+
+from library.models import Exercise, Lesson
+from .models import PracticeAttempt, ReviewItem
+
+
+MAX_BATCH_SIZE = 500
+# performed_at is set by the client: allow offline practice synced later and
+# some clock skew, but nothing that would make a flush rebuild months of
+# rollups (practice/rollups.py)
+MAX_BACKDATE = timedelta(days=30)
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+
+class PracticeAttemptListSerializer(serializers.ListSerializer):
+    """
+    Validates a batch of attempts with a fixed number of queries: exercise
+    and lesson ids are checked for the whole batch at once instead of one
+    related-field lookup per row.
+    """
+
+    def validate(self, attrs):
+        if len(attrs) > MAX_BATCH_SIZE:
+            raise serializers.ValidationError(
+                f"At most {MAX_BATCH_SIZE} attempts may be sent per request."
+            )
+
+        exercise_ids = {item["exercise_id"] for item in attrs}
+        known = set(Exercise.objects.filter(pk__in=exercise_ids).values_list("pk", flat=True))
+        missing = exercise_ids - known
+        if missing:
+            raise serializers.ValidationError(f"Unknown exercise id(s): {sorted(missing)}")
+
+        lesson_ids = {item["lesson_id"] for item in attrs if item.get("lesson_id") is not None}
+        if lesson_ids:
+            known = set(Lesson.objects.filter(pk__in=lesson_ids).values_list("pk", flat=True))
+            missing = lesson_ids - known
+            if missing:
+                raise serializers.ValidationError(f"Unknown lesson id(s): {sorted(missing)}")
+
+        return attrs
+
+
+class PracticeAttemptSerializer(serializers.ModelSerializer):
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
+    exercise = serializers.IntegerField(source="exercise_id")
+    lesson = serializers.IntegerField(source="lesson_id", required=False, allow_null=True)
+    score = serializers.FloatField(min_value=0, max_value=100)
+
+    class Meta:
+        model = PracticeAttempt
+        list_serializer_class = PracticeAttemptListSerializer
+        fields = [
+            "id",
+            "user",
+            "exercise",
+            "lesson",
+            "score",
+            "correct_notes",
+            "total_notes",
+            "detail",
+            "client_id",
+            "performed_at",
+            "created",
+        ]
+        read_only_fields = ["created"]
+        # Uniqueness of (user, client_id) is enforced by the insert itself
+        validators = []
+
+    def validate_performed_at(self, value):
+        now = timezone.now()
+        if value > now + MAX_CLOCK_SKEW:
+            raise serializers.ValidationError("Must not be in the future.")
+        if value < now - MAX_BACKDATE:
+            raise serializers.ValidationError(f"Must be within the last {MAX_BACKDATE.days} days.")
+        return min(value, now)
+
+
+class ReviewItemSerializer(serializers.ModelSerializer):
+    """A student's schedule entry; POST with a lesson *or* an exercise to enrol it."""
+
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
+    lesson = serializers.PrimaryKeyRelatedField(
+        queryset=Lesson.objects.all(), required=False, allow_null=True
+    )
+    exercise = serializers.PrimaryKeyRelatedField(
+        queryset=Exercise.objects.all(), required=False, allow_null=True
+    )
+    lesson_title = serializers.CharField(source="lesson.title", read_only=True, default=None)
+
+    class Meta:
+        model = ReviewItem
+        fields = [
+            "id",
+            "user",
+            "lesson",
+            "lesson_title",
+            "exercise",
+            "ease",
+            "interval_days",
+            "repetitions",
+            "lapses",
+            "last_quality",
+            "due_at",
+            "last_reviewed_at",
+            "created",
+        ]
+        read_only_fields = [
+            "ease",
+            "interval_days",
+            "repetitions",
+            "lapses",
+            "last_quality",
+            "due_at",
+            "last_reviewed_at",
+            "created",
+        ]
+
+    def validate(self, attrs):
+        if bool(attrs.get("lesson")) == bool(attrs.get("exercise")):
+            raise serializers.ValidationError("Give either a lesson or an exercise.")
+        return attrs
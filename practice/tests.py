@@ -0,0 +1,455 @@
+import json
+import math
+import tempfile
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from library.midi import write_midi
+from library.models import Approach, Category, Exercise, Lesson, LessonGroup, LessonType
+from library.pitch import assess_take, track_pitch
+from library.pitch_signals import sing
+from library.storage import exercise_storage
+from users.models import User
+from . import buffer, realtime, rollups, scheduler
+from .buffer import AttemptBuffer
+from .models import PracticeAttempt, ProgressRollup, ReviewItem
+from .serializers import MAX_BACKDATE, MAX_BATCH_SIZE, PracticeAttemptSerializer
+
+
+def attempts_data(exercise, count=1, **extra):
+    return [{"exercise": exercise.pk, "score": 80, **extra} for _ in range(count)]
+
+
+class PracticeAttemptValidationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.exercise = Exercise.objects.create()
+
+    def validate(self, data):
+        serializer = PracticeAttemptSerializer(data=data, many=True)
+        return serializer.is_valid(), serializer.errors
+
+    def test_valid_batch(self):
+        valid, errors = self.validate(attempts_data(self.exercise, 3, lesson=None))
+        self.assertTrue(valid, errors)
+
+    def test_unknown_exercise(self):
+        valid, errors = self.validate([{"exercise": self.exercise.pk + 1, "score": 50}])
+        self.assertFalse(valid)
+        self.assertIn("Unknown exercise", str(errors))
+
+    def test_falsy_lesson_id_is_checked(self):
+        valid, errors = self.validate(attempts_data(self.exercise, lesson=0))
+        self.assertFalse(valid)
+        self.assertIn("Unknown lesson id(s): [0]", str(errors))
+
+    def test_performed_at_window(self):
+        now = timezone.now()
+        valid, errors = self.validate(attempts_data(self.exercise, performed_at=now - timedelta(days=2)))
+        self.assertTrue(valid, errors)
+        for performed_at in (now + timedelta(days=1), now - MAX_BACKDATE - timedelta(days=1)):
+            valid, errors = self.validate(attempts_data(self.exercise, performed_at=performed_at))
+            self.assertFalse(valid)
+            self.assertIn("performed_at", str(errors))
+
+    def test_batch_size_limit(self):
+        valid, errors = self.validate(attempts_data(self.exercise, MAX_BATCH_SIZE + 1))
+        self.assertFalse(valid)
+        self.assertIn(f"At most {MAX_BATCH_SIZE}", str(errors))
+
+
+class BufferTestMixin:
+
+    @classmethod
+    def make_fixtures(cls):
+        cls.user = User.objects.create_user("student", password="pw", user_type="student")
+        cls.exercise = Exercise.objects.create()
+
+    def setUp(self):
+        self.buffer = AttemptBuffer()
+
+    def tearDown(self):
+        with self.buffer._lock:
+            self.buffer._take()
+
+    def attempts(self, count, **extra):
+        return [PracticeAttempt(user=self.user, exercise=self.exercise, score=75, **extra) for _ in range(count)]
+
+
+@override_settings(PRACTICE_BUFFER_SIZE=3, PRACTICE_FLUSH_INTERVAL=60)
+class AttemptBufferTests(BufferTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.make_fixtures()
+
+    def test_queues_until_size_threshold(self):
+        self.buffer.add(self.attempts(2))
+        self.assertEqual(len(self.buffer), 2)
+        self.assertEqual(PracticeAttempt.objects.count(), 0)
+
+        self.buffer.add(self.attempts(1))
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(PracticeAttempt.objects.count(), 3)
+
+    def test_flush_writes_everything_queued(self):
+        self.buffer.add(self.attempts(2))
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(PracticeAttempt.objects.count(), 2)
+
+    def test_retried_client_ids_are_written_once(self):
+        client_id = uuid.uuid4()
+        self.buffer.add(self.attempts(1, client_id=client_id))
+        self.buffer.flush()
+        self.buffer.add(self.attempts(1, client_id=client_id))
+        self.buffer.flush()
+        self.assertEqual(PracticeAttempt.objects.filter(client_id=client_id).count(), 1)
+
+    @override_settings(PRACTICE_FLUSH_INTERVAL=0)
+    def test_zero_interval_writes_synchronously(self):
+        self.buffer.add(self.attempts(1))
+        self.assertEqual(PracticeAttempt.objects.count(), 1)
+
+
+# SQLite checks foreign keys when a transaction commits, so these run in
+# autocommit mode rather than inside a test transaction
+@override_settings(PRACTICE_BUFFER_SIZE=100, PRACTICE_FLUSH_INTERVAL=60, PRACTICE_BUFFER_LIMIT=5)
+class AttemptBufferFailureTests(BufferTestMixin, TransactionTestCase):
+
+    def setUp(self):
+        self.make_fixtures()
+        super().setUp()
+
+    def test_rejected_rows_are_dropped_and_the_rest_written(self):
+        bad = PracticeAttempt(user=self.user, exercise_id=self.exercise.pk + 1, score=10)
+        self.buffer.add(self.attempts(2) + [bad] + self.attempts(1))
+        with self.assertLogs(buffer.logger, "ERROR"):
+            self.assertEqual(self.buffer.flush(), 3)
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(PracticeAttempt.objects.count(), 3)
+
+    def test_rows_are_requeued_while_the_database_is_unavailable(self):
+        self.buffer.add(self.attempts(2))
+        with mock.patch.object(PracticeAttempt.objects, "bulk_create", side_effect=OperationalError("locked")), \
+                self.assertLogs(buffer.logger):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(len(self.buffer), 2)
+
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(PracticeAttempt.objects.count(), 2)
+
+    def test_rows_are_dropped_after_max_write_attempts(self):
+        self.buffer.add(self.attempts(2))
+        with mock.patch.object(PracticeAttempt.objects, "bulk_create", side_effect=OperationalError("locked")), \
+                self.assertLogs(buffer.logger):
+            for _ in range(buffer.MAX_WRITE_ATTEMPTS):
+                self.buffer.flush()
+        self.assertEqual(len(self.buffer), 0)
+
+    def test_queue_is_capped(self):
+        self.buffer.add(self.attempts(4))
+        with mock.patch.object(PracticeAttempt.objects, "bulk_create", side_effect=OperationalError("locked")), \
+                self.assertLogs(buffer.logger):
+            self.buffer.flush()
+            self.buffer.add(self.attempts(4))
+            self.buffer.flush()
+        self.assertEqual(len(self.buffer), 5)
+
+
+class RollupRefreshTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user("student", password="pw", user_type="student")
+        cls.other = User.objects.create_user("other", password="pw", user_type="student")
+        category = Category.objects.create(name=Category.TONAL)
+        approach = Approach.objects.create(category=category, name=Approach.ABSOLUTE)
+        lesson_type = LessonType.objects.create(approach=approach, name="Intervals", slug="intervals")
+        group = LessonGroup.objects.create(lesson_type=lesson_type, name="Octave")
+        cls.lesson = Lesson.objects.create(group=group, folder_name="lesson_1")
+        cls.exercise = Exercise.objects.create()
+        cls.today = timezone.localdate()
+
+    def attempt(self, user, days_ago, score=50):
+        return PracticeAttempt.objects.create(
+            user=user, exercise=self.exercise, lesson=self.lesson, score=score,
+            performed_at=rollups.day_start(self.today - timedelta(days=days_ago)) + timedelta(hours=12),
+        )
+
+    def lesson_rollups(self):
+        """``{(username, days ago): attempts}`` of the per-lesson rollups."""
+        return {
+            (row.user.username, (self.today - row.day).days): row.attempts
+            for row in ProgressRollup.objects.filter(node_type=ProgressRollup.LESSON).select_related("user")
+        }
+
+    def test_rebuilds_each_node_level(self):
+        rollups.refresh_for_attempts([self.attempt(self.student, 0), self.attempt(self.student, 0)])
+        self.assertEqual(
+            sorted(ProgressRollup.objects.values_list("node_type", "attempts")),
+            [("approach", 2), ("category", 2), ("group", 2), ("lesson", 2), ("lesson_type", 2)],
+        )
+
+    def test_only_the_batch_user_days_are_rebuilt(self):
+        # Attempts from earlier flushes whose rollups are deliberately stale:
+        # a refresh must leave slices outside its batch alone
+        for user, days_ago in ((self.student, 2), (self.other, 4)):
+            self.attempt(user, days_ago)
+        batch = [self.attempt(self.student, 4), self.attempt(self.student, 1), self.attempt(self.other, 1)]
+        rollups.refresh_for_attempts(batch)
+        self.assertEqual(
+            self.lesson_rollups(),
+            {("student", 4): 1, ("student", 1): 1, ("other", 1): 1},
+        )
+
+        rollups.rebuild(self.today - timedelta(days=5), self.today)
+        self.assertEqual(
+            self.lesson_rollups(),
+            {("student", 4): 1, ("student", 2): 1, ("student", 1): 1, ("other", 4): 1, ("other", 1): 1},
+        )
+
+
+class SchedulerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user("student", password="pw", user_type="student")
+        cls.exercise = Exercise.objects.create()
+        cls.night = timezone.now().replace(hour=3, minute=0, second=0, microsecond=0)
+
+    def attempt(self, score, hours_before_run):
+        attempt = PracticeAttempt.objects.create(user=self.student, exercise=self.exercise, score=score)
+        # ``created`` is auto_now_add; move it into the window under test
+        PracticeAttempt.objects.filter(pk=attempt.pk).update(
+            created=self.night - timedelta(hours=hours_before_run),
+        )
+
+    def run_at(self, night, **kwargs):
+        return scheduler.reschedule(since=self.night - timedelta(days=1), now=night, **kwargs)
+
+    def item(self):
+        return ReviewItem.objects.get(user=self.student, exercise=self.exercise)
+
+    def test_sm2_intervals_and_ease(self):
+        item = ReviewItem(user=self.student, exercise=self.exercise)
+        now = self.night
+        scheduler.sm2(item, 5, now)
+        self.assertEqual((item.interval_days, item.repetitions), (1, 1))
+        self.assertAlmostEqual(item.ease, 2.6)
+        scheduler.sm2(item, 4, now)
+        self.assertEqual((item.interval_days, item.repetitions), (6, 2))
+        self.assertAlmostEqual(item.ease, 2.6)
+        scheduler.sm2(item, 3, now)
+        self.assertEqual((item.interval_days, item.repetitions), (16, 3))  # round(6 * 2.6)
+        self.assertAlmostEqual(item.ease, 2.46)
+        self.assertEqual(item.due_at, now + timedelta(days=16))
+
+        # A failed review starts the repetitions over and costs ease
+        scheduler.sm2(item, 1, now)
+        self.assertEqual((item.interval_days, item.repetitions, item.lapses), (1, 0, 1))
+        self.assertAlmostEqual(item.ease, 1.92)
+        for _ in range(3):
+            scheduler.sm2(item, 0, now)
+        self.assertEqual(item.ease, ReviewItem.MIN_EASE)
+
+    def test_rerun_applies_nothing_twice(self):
+        self.attempt(95, hours_before_run=5)
+        self.assertEqual(self.run_at(self.night), {"updated": 0, "created": 1})
+        self.assertEqual(scheduler.processed_until(), self.night)
+
+        # An attempt arriving after the run, then the same run again: only
+        # the new attempt is folded in, and only once
+        later = self.night + timedelta(hours=1)
+        self.attempt(95, hours_before_run=-0.5)
+        self.assertEqual(self.run_at(later), {"updated": 1, "created": 0})
+        self.assertEqual(self.run_at(later), {"updated": 0, "created": 0})
+        item = self.item()
+        self.assertEqual((item.repetitions, item.interval_days), (2, 6))
+
+    def test_missed_night_is_caught_up(self):
+        self.attempt(95, hours_before_run=5)
+        self.run_at(self.night)
+
+        # Nothing ran the next night; the one after covers both days
+        self.attempt(30, hours_before_run=-20)
+        self.attempt(90, hours_before_run=-40)
+        self.assertEqual(self.run_at(self.night + timedelta(days=2)), {"updated": 1, "created": 0})
+        item = self.item()
+        self.assertEqual(item.last_quality, scheduler.quality_from_score(60))
+        self.assertEqual((item.repetitions, item.interval_days), (2, 6))
+        self.assertEqual(scheduler.processed_until(), self.night + timedelta(days=2))
+
+    def test_dry_run_leaves_the_watermark(self):
+        self.attempt(95, hours_before_run=5)
+        self.assertEqual(self.run_at(self.night, dry_run=True), {"updated": 0, "created": 1})
+        self.assertIsNone(scheduler.processed_until())
+        self.assertFalse(ReviewItem.objects.exists())
+        self.assertEqual(self.run_at(self.night), {"updated": 0, "created": 1})
+
+
+# A C major phrase sung after a 0.3 s lead-in, half a second per note
+PHRASE = [60, 62, 64, 65, 67]
+LEAD_IN = 0.3
+SAMPLE_RATE = 44100
+
+
+def sung_take():
+    samples, _f0, onsets = sing(PHRASE, SAMPLE_RATE, note_length=0.5, gap=0.0, lead_in=LEAD_IN)
+    notes = [{"pitch": midi, "start": start - LEAD_IN, "end": start - LEAD_IN + 0.5} for start, midi in onsets]
+    return samples, notes
+
+
+class StreamingAssessmentTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.samples, cls.notes = sung_take()
+
+    def stream(self, times, midi, notes=None):
+        assessment = realtime.StreamingAssessment(notes or self.notes, offset=LEAD_IN)
+        graded = []
+        for t, value in zip(times, midi):
+            graded += assessment.add(t, value)
+        return graded, assessment.finish()
+
+    def test_streamed_frames_grade_like_assess_take(self):
+        track = track_pitch(self.samples, SAMPLE_RATE)
+        graded, result = self.stream(track.times.tolist(), track.midi.tolist())
+        self.assertEqual(result, assess_take(track, self.notes, offset=LEAD_IN))
+        self.assertEqual(result["score"], 100.0)
+        # Every note but the last is graded as soon as its span has passed
+        self.assertEqual(graded, list(range(len(PHRASE))))
+
+        wrong = [{**note, "pitch": note["pitch"] + 2} for note in self.notes]
+        _graded, result = self.stream(track.times.tolist(), track.midi.tolist(), wrong)
+        self.assertEqual(result, assess_take(track, wrong, offset=LEAD_IN))
+        self.assertEqual(result["score"], 0.0)
+
+    def test_audio_chunks_track_like_track_pitch(self):
+        tracker = realtime.AudioTracker(SAMPLE_RATE)
+        times, midi = [], []
+        rng = np.random.default_rng(0)
+        position = 0
+        while position < len(self.samples):
+            size = int(rng.integers(100, 5000))
+            chunk_times, chunk_midi = tracker.feed(self.samples[position:position + size])
+            times += chunk_times.tolist()
+            midi += chunk_midi.tolist()
+            position += size
+
+        # The live analyser buffer ends at the frame time; its first frame
+        # (nothing but silence) is never produced
+        track = track_pitch(self.samples, SAMPLE_RATE, trailing=True)
+        np.testing.assert_allclose(times, track.times[1:])
+        np.testing.assert_allclose(midi, track.midi[1:], atol=1e-6)
+
+        _graded, result = self.stream(times, midi)
+        self.assertEqual(result, assess_take(track, self.notes, offset=LEAD_IN))
+        self.assertEqual(result["score"], 100.0)
+
+
+@override_settings(PRACTICE_FLUSH_INTERVAL=0, ALLOWED_HOSTS=["testserver"])
+class AssessmentSocketTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("student", password="pw", user_type="student")
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.samples, self.notes = sung_take()
+        midi = write_midi([{"pitch": n, "beat": i, "duration": 1.0} for i, n in enumerate(PHRASE)], tempo=120)
+        self.exercise = Exercise.objects.create(midi=exercise_storage.save("midi/phrase.mid", ContentFile(midi)))
+        self.client.force_login(self.user)
+        self.session = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+
+    def converse(self, messages, origin=b"http://testserver", cookie=True, token=None):
+        """Run a socket session; the close code and every JSON message sent back."""
+        headers = []
+        if origin is not None:
+            headers.append((b"origin", origin))
+        if cookie:
+            headers.append((b"cookie", f"{settings.SESSION_COOKIE_NAME}={self.session}".encode()))
+        if token:
+            headers.append((b"authorization", f"Token {token}".encode()))
+        scope = {"type": "websocket", "path": f"/ws/exercises/{self.exercise.pk}/assess/", "headers": headers}
+        incoming = [{"type": "websocket.connect"}]
+        for message in messages:
+            if isinstance(message, bytes):
+                incoming.append({"type": "websocket.receive", "bytes": message})
+            else:
+                text = message if isinstance(message, str) else json.dumps(message)
+                incoming.append({"type": "websocket.receive", "text": text})
+        sent = []
+
+        async def receive():
+            return incoming.pop(0) if incoming else {"type": "websocket.disconnect"}
+
+        async def send(event):
+            sent.append(event)
+
+        async_to_sync(realtime.websocket_application)(scope, receive, send)
+        close = next((event["code"] for event in sent if event["type"] == "websocket.close"), None)
+        return close, [json.loads(event["text"]) for event in sent if event["type"] == "websocket.send"]
+
+    def pitch_frames(self):
+        track = track_pitch(self.samples, SAMPLE_RATE)
+        frequency = np.where(track.voiced, track.frequency, 0.0)
+        return track, [[t, f, c] for t, f, c in zip(track.times.tolist(), frequency.tolist(), track.confidence.tolist())]
+
+    def test_streamed_pitch_frames_are_graded_and_recorded(self):
+        track, frames = self.pitch_frames()
+        close, replies = self.converse([
+            {"type": "start", "offset": LEAD_IN},
+            {"type": "pitch", "frames": frames},
+            {"type": "stop"},
+        ])
+        self.assertEqual(close, 1000)
+        result = replies[-1]
+        self.assertEqual(result["type"], "result")
+        expected = assess_take(track, self.notes, offset=LEAD_IN)
+        self.assertEqual((result["score"], result["notes"]), (expected["score"], expected["notes"]))
+        self.assertEqual(result["score"], 100.0)
+        [attempt] = self.user.practice_attempts.all()
+        self.assertEqual((attempt.exercise_id, attempt.score), (self.exercise.pk, 100.0))
+
+    def test_non_finite_frames_are_rejected(self):
+        for frame in ("[0.5, NaN, 0.9]", "[0.5, Infinity, 0.9]", "[NaN, 440, 0.9]", "[0.5, 440, -Infinity]"):
+            _close, replies = self.converse(['{"type": "pitch", "frames": [%s]}' % frame, {"type": "stop"}])
+            self.assertEqual(replies[0]["type"], "error", frame)
+            self.assertEqual(replies[-1]["total_notes"], len(PHRASE))
+            self.assertFalse(any(reply["type"] == "progress" for reply in replies))
+
+    def test_audio_must_be_finite(self):
+        _close, replies = self.converse([
+            {"type": "start", "sample_rate": SAMPLE_RATE},
+            np.array([0.1, math.nan], dtype="<f4").tobytes(),
+        ])
+        self.assertEqual([reply["type"] for reply in replies], ["ready", "error"])
+
+    def test_origin_and_authentication(self):
+        messages = [{"type": "stop"}]
+        self.assertEqual(self.converse(messages, origin=b"https://evil.example")[0], realtime.CLOSE_FORBIDDEN)
+        # Without an Origin the session cookie is not enough...
+        self.assertEqual(self.converse(messages, origin=None)[0], realtime.CLOSE_FORBIDDEN)
+        self.assertEqual(self.converse(messages, origin=None, token="wrong")[0], realtime.CLOSE_FORBIDDEN)
+        # ...but a token is
+        self.assertEqual(self.converse(messages, origin=None, cookie=False, token=self.token.key)[0], 1000)
+        self.assertEqual(self.converse(messages, cookie=False)[0], realtime.CLOSE_FORBIDDEN)
+        self.assertEqual(self.converse(messages)[0], 1000)
@@ -0,0 +1,118 @@
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from . import scheduler
+from .buffer import attempt_buffer
+from .models import PracticeAttempt, ReviewItem
+from .serializers import PracticeAttemptSerializer, ReviewItemSerializer
+
+
+class PracticeAttemptViewSet(
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.CreateModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Practice results.
+
+    POST accepts a single attempt or a list of attempts and answers
+    202 Accepted once they are validated and queued; rows are written in
+    bulk shortly afterwards (see practice/buffer.py).  Attempts carrying a
+    ``client_id`` are de-duplicated, so clients can safely retry.
+
+    Students only see their own attempts; teachers and admins see everyone's.
+
+    Filtering
+    ---------
+    ?user=<id>        – attempts by one user (teachers / admins)
+    ?exercise=<id>    – attempts at one exercise
+    ?lesson=<id>      – attempts made within one lesson
+    """
+
+    serializer_class = PracticeAttemptSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = PracticeAttempt.objects.all()
+
+        if user.is_staff or user.user_type == "teacher":
+            user_id = self.request.query_params.get("user")
+            if user_id:
+                queryset = queryset.filter(user_id=user_id)
+        else:
+            queryset = queryset.filter(user=user)
+
+        exercise_id = self.request.query_params.get("exercise")
+        if exercise_id:
+            queryset = queryset.filter(exercise_id=exercise_id)
+
+        lesson_id = self.request.query_params.get("lesson")
+        if lesson_id:
+            queryset = queryset.filter(lesson_id=lesson_id)
+
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        items = request.data if isinstance(request.data, list) else [request.data]
+        serializer = self.get_serializer(data=items, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        attempts = [
+            PracticeAttempt(user=request.user, **data)
+            for data in serializer.validated_data
+        ]
+        attempt_buffer.add(attempts)
+        return Response({"accepted": len(attempts)}, status=status.HTTP_202_ACCEPTED)
+
+
+class ReviewItemViewSet(
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.CreateModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    The current user's spaced-repetition schedule.
+
+    POST {"lesson": id} or {"exercise": id} enrols an item (due immediately);
+    DELETE drops it.  Schedules are updated nightly from practice attempts
+    by the ``reschedule_reviews`` command.
+
+    Extra endpoints
+    ---------------
+    GET /api/reviews/due/?limit=20   – what to practise now, most overdue first
+    """
+
+    serializer_class = ReviewItemSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return ReviewItem.objects.filter(user=self.request.user).select_related("lesson")
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        scheduler.enroll(
+            request.user,
+            lessons=[serializer.validated_data["lesson"]] if serializer.validated_data.get("lesson") else [],
+            exercises=[serializer.validated_data["exercise"]] if serializer.validated_data.get("exercise") else [],
+        )
+        item = self.get_queryset().get(
+            lesson=serializer.validated_data.get("lesson"),
+            exercise=serializer.validated_data.get("exercise"),
+        )
+        return Response(self.get_serializer(item).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=["get"])
+    def due(self, request):
+        try:
+            limit = min(max(int(request.query_params.get("limit", 20)), 1), 100)
+        except ValueError:
+            limit = 20
+        items = scheduler.due_items(request.user, limit=limit)
+        return Response(self.get_serializer(items, many=True).data)
@@ -0,0 +1,55 @@
+"""
+Batch lookups: ``GET /api/<resource>/?ids=3,1,2``.
+
+One request and a fixed number of queries — an ``in_bulk`` over the
+viewset's (permission-scoped, prefetched) queryset — replace a detail
+request per id.  Items come back in the order requested, in the detail
+representation, with ``null`` in place of ids that do not exist or are not
+visible to the user, and those ids repeated under ``missing``:
+
+    {"results": [{"id": 3, …}, null, {"id": 2, …}], "missing": [1]}
+
+?fields= and ?expand= apply as usual.
+"""
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+
+MAX_BATCH_IDS = 500
+
+
+def parse_ids(value: str) -> list:
+    try:
+        ids = [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise ValidationError({"ids": ["Expected a comma-separated list of integer ids."]})
+    if len(ids) > MAX_BATCH_IDS:
+        raise ValidationError({"ids": [f"At most {MAX_BATCH_IDS} ids may be requested at once."]})
+    return ids
+
+
+class BatchLookupMixin:
+    """ViewSet mixin: ``?ids=`` on the list endpoint."""
+
+    # Batches are rendered like the detail endpoint
+    batch_action = "retrieve"
+
+    def list(self, request, *args, **kwargs):
+        raw = request.query_params.get("ids")
+        if raw is None:
+            return super().list(request, *args, **kwargs)
+
+        ids = parse_ids(raw)
+        self.action = self.batch_action
+        found = self.get_queryset().in_bulk(set(ids))
+
+        ordered = [found[pk] for pk in dict.fromkeys(ids) if pk in found]
+        rendered = dict(zip(
+            (obj.pk for obj in ordered),
+            self.get_serializer(ordered, many=True).data,
+        ))
+        return Response({
+            "results": [rendered.get(pk) for pk in ids],
+            "missing": [pk for pk in dict.fromkeys(ids) if pk not in found],
+        })
@@ -0,0 +1,178 @@
+"""
+Read-only fast path for large list responses.
+
+On big pages DRF spends most of its time in per-row serializer machinery:
+model instances built only to be read, ``get_attribute`` walks and a
+``to_representation`` call per field.  ValuesListMixin compiles a bound
+serializer's readable fields (already pruned by ?fields=, see
+rea/fieldsets.py) once into ``.values()`` columns plus a per-field plan,
+and renders plain dicts straight from the rows.  The output is identical
+to ``serializer(many=True).data``:
+
+* columns whose DRF field would return them unchanged are copied;
+* dates, times, files and other fields go through the bound field's own
+  ``to_representation``;
+* nested single-object serializers become prefixed columns;
+* anything else (method fields, to-many nesting) must be supplied by the
+  serializer as ``values_<field>(rows)`` with the columns it reads in
+  ``Meta.values_columns`` — otherwise there is no fast path and
+  ValuesListViewMixin falls back to the regular serializer.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.fields.files import FileField as ModelFileField
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+
+# DRF fields whose to_representation returns the database value unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.ChoiceField,
+    serializers.ReadOnlyField,
+    PrimaryKeyRelatedField,
+)
+
+COPY, CONVERT, NESTED, CUSTOM = range(4)
+
+
+class ValuesPlan:
+    def __init__(self, columns, steps):
+        self.columns = columns
+        self.steps = steps
+
+
+def _model_path(model, parts):
+    """
+    Model fields along ``parts``, or None unless every step before the last
+    is a non-null forward foreign key (DRF would skip the field on a null).
+    """
+    path = []
+    for i, part in enumerate(parts):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete or field.many_to_many:
+            return None
+        if i < len(parts) - 1:
+            if not field.is_relation or field.null:
+                return None
+            model = field.related_model
+        path.append(field)
+    return path
+
+
+def _compile(serializer, model, prefix=""):
+    columns, steps = [], []
+    custom_columns = getattr(serializer.Meta, "values_columns", {})
+
+    for field in serializer._readable_fields:
+        name = field.field_name
+        custom = getattr(serializer, f"values_{name}", None)
+        if custom is not None and not prefix:
+            columns.extend(custom_columns.get(name, ()))
+            steps.append((name, CUSTOM, custom))
+            continue
+        if field.source == "*" or isinstance(field, (serializers.ListSerializer, serializers.ManyRelatedField)):
+            return None
+
+        parts = field.source.split(".")
+        path = _model_path(model, parts)
+        if path is None:
+            return None
+        column = prefix + "__".join(parts)
+        last = path[-1]
+
+        if isinstance(field, serializers.BaseSerializer):
+            if not last.is_relation:
+                return None
+            nested = _compile(field, last.related_model, f"{column}__")
+            if nested is None:
+                return None
+            columns.append(column)
+            columns.extend(nested.columns)
+            steps.append((name, NESTED, (column, nested.steps)))
+        elif isinstance(field, PASSTHROUGH_FIELDS) and not isinstance(field, serializers.MultipleChoiceField):
+            columns.append(column)
+            steps.append((name, COPY, column))
+        elif isinstance(last, ModelFileField):
+            def file_value(file_name, field=field, model_field=last):
+                return field.to_representation(model_field.attr_class(None, model_field, file_name))
+            columns.append(column)
+            steps.append((name, CONVERT, (column, file_value)))
+        else:
+            columns.append(column)
+            steps.append((name, CONVERT, (column, field.to_representation)))
+
+    return ValuesPlan(list(dict.fromkeys(columns)), steps)
+
+
+def _render(steps, row, custom, index):
+    out = {}
+    for name, kind, data in steps:
+        if kind == COPY:
+            out[name] = row[data]
+        elif kind == CONVERT:
+            column, convert = data
+            value = row[column]
+            out[name] = None if value is None else convert(value)
+        elif kind == NESTED:
+            column, nested = data
+            out[name] = None if row[column] is None else _render(nested, row, custom, index)
+        else:
+            out[name] = custom[name][index]
+    return out
+
+
+class ValuesListMixin:
+    """Serializer mixin: render ``.values()`` rows without per-row serializer work."""
+
+    def values_plan(self):
+        """The compiled plan, or None when this serializer has no fast path."""
+        if not hasattr(self, "_values_plan"):
+            self._values_plan = _compile(self, self.Meta.model)
+        return self._values_plan
+
+    def render_values(self, rows):
+        plan = self.values_plan()
+        rows = list(rows)
+        custom = {
+            name: data(rows)
+            for name, kind, data in plan.steps
+            if kind == CUSTOM
+        }
+        return [_render(plan.steps, row, custom, i) for i, row in enumerate(rows)]
+
+    def render_queryset(self, queryset):
+        """Rendered list for ``queryset``, or None when there is no fast path."""
+        plan = self.values_plan()
+        if plan is None:
+            return None
+        return self.render_values(queryset.prefetch_related(None).values(*plan.columns))
+
+
+class ValuesListViewMixin:
+    """``list`` over ``.values()`` rows whenever the list serializer has a fast path."""
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer_class()(context=self.get_serializer_context())
+        plan = serializer.values_plan() if isinstance(serializer, ValuesListMixin) else None
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        columns = list(plan.columns)
+        # Keyset pagination reads its cursor from the rows
+        key_columns = getattr(self.paginator, "key_columns", None)
+        if key_columns is not None:
+            columns += [c for c in key_columns(request, queryset, self) if c not in columns]
+        rows = queryset.values(*columns)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.render_values(page))
+        return Response(serializer.render_values(rows))
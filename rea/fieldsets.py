@@ -0,0 +1,163 @@
+"""
+Sparse fieldsets and opt-in expansion for the REST API.
+
+    ?fields=id,title,group_detail.name   render only these fields; dotted
+                                         paths reach into nested serializers
+    ?expand=exercises_detail             add fields a serializer lists in
+                                         ``Meta.expandable_fields``, which
+                                         are left out by default
+
+Serializers opt in with SparseFieldsetMixin and viewsets with
+SparseFieldsetViewMixin.  Fields that are dropped are never serialized, and
+``related_lookups`` reports the select_related / prefetch_related lookups
+the remaining fields need, so ``with_related`` only joins and prefetches
+what will actually be rendered.  Relations reached through a nested
+serializer or a dotted ``source`` are found automatically; fields computed
+by methods or properties declare theirs in ``Meta.related_lookups``.
+
+Only safe requests are shaped — writes always validate against the full
+serializer.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def parse_paths(value: str) -> dict:
+    """``"a,b.c,b.d"`` → ``{"a": {}, "b": {"c": {}, "d": {}}}``."""
+    tree = {}
+    for path in value.split(","):
+        node = tree
+        for part in path.split("."):
+            part = part.strip()
+            if part:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def _walk_relations(model, parts):
+    """
+    ``(lookup, many)`` when every name in ``parts`` is a relation starting
+    at ``model``, else None.
+    """
+    many = False
+    for part in parts:
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+        if not field.is_relation:
+            return None
+        many = many or field.many_to_many or field.one_to_many
+        model = field.related_model
+    return "__".join(parts), many
+
+
+class SparseFieldsetMixin:
+    """ModelSerializer mixin honouring ``?fields=`` and ``?expand=``."""
+
+    def _fieldset_spec(self):
+        # Nested serializers are handed their slice of the spec by the parent
+        if hasattr(self, "_fieldset"):
+            return self._fieldset
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return {}, {}
+        return self.context.get("fields") or {}, self.context.get("expand") or {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        wanted, expand = self._fieldset_spec()
+        expandable = set(getattr(self.Meta, "expandable_fields", ()))
+
+        for option, requested in (("fields", wanted), ("expand", expand)):
+            unknown = set(requested) - set(fields)
+            if unknown:
+                raise serializers.ValidationError(
+                    {option: [f"Unknown field(s): {', '.join(sorted(unknown))}"]}
+                )
+
+        for name in list(fields):
+            field = fields[name]
+            if field.write_only:
+                continue
+            if wanted:
+                keep = name in wanted
+            else:
+                keep = name not in expandable or name in expand
+            if not keep:
+                del fields[name]
+                continue
+
+            nested = getattr(field, "child", field)
+            if isinstance(nested, SparseFieldsetMixin):
+                nested._fieldset = (wanted.get(name) or {}, expand.get(name) or {})
+        return fields
+
+    def related_lookups(self):
+        """``(select_related, prefetch_related)`` lookup sets for the fields kept."""
+        model = self.Meta.model
+        declared = getattr(self.Meta, "related_lookups", {})
+        select, prefetch = set(), set()
+
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+            if name in declared:
+                select.update(declared[name])
+                continue
+
+            parts = [] if field.source == "*" else field.source.split(".")
+            nested = getattr(field, "child", field)
+            if isinstance(nested, serializers.BaseSerializer):
+                relation = _walk_relations(model, parts)
+                if relation is None:
+                    continue
+                lookup, many = relation
+                sub_select, sub_prefetch = (
+                    nested.related_lookups()
+                    if isinstance(nested, SparseFieldsetMixin)
+                    else (set(), set())
+                )
+                if many:
+                    prefetch.add(lookup)
+                    prefetch.update(f"{lookup}__{sub}" for sub in sub_select | sub_prefetch)
+                else:
+                    select.add(lookup)
+                    select.update(f"{lookup}__{sub}" for sub in sub_select)
+                    prefetch.update(f"{lookup}__{sub}" for sub in sub_prefetch)
+            elif len(parts) > 1:
+                relation = _walk_relations(model, parts[:-1])
+                if relation is not None:
+                    lookup, many = relation
+                    (prefetch if many else select).add(lookup)
+
+        return select, prefetch
+
+
+class SparseFieldsetViewMixin:
+    """GenericAPIView mixin: passes ``?fields=`` / ``?expand=`` to the serializer."""
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        request = context.get("request")
+        if request is not None and request.method in SAFE_METHODS:
+            context["fields"] = parse_paths(request.query_params.get("fields", ""))
+            context["expand"] = parse_paths(request.query_params.get("expand", ""))
+        return context
+
+    def with_related(self, queryset, serializer_class=None):
+        """Apply select_related / prefetch_related for the fields that will be rendered."""
+        serializer_class = serializer_class or self.get_serializer_class()
+        if not issubclass(serializer_class, SparseFieldsetMixin):
+            return queryset
+        serializer = serializer_class(context=self.get_serializer_context())
+        select, prefetch = serializer.related_lookups()
+        if select:
+            queryset = queryset.select_related(*sorted(select))
+        if prefetch:
+            queryset = queryset.prefetch_related(*sorted(prefetch))
+        return queryset
@@ -0,0 +1,93 @@
+"""
+orjson-backed JSON renderer and parser for the API.
+
+DRF's JSONRenderer runs ``json.dumps`` with a Python ``default`` hook, which
+on large list pages (lesson detail with nested exercises, exercise lists,
+the curriculum tree) is a sizeable share of the request.  FastJSONRenderer
+serialises the same data with orjson and produces the same bytes:
+
+* compact separators, UTF-8 output, U+2028 / U+2029 escaped;
+* datetimes, dates, times, timedeltas, decimals, UUIDs, lazy translation
+  strings, querysets and anything else orjson does not handle natively go
+  through DRF's own JSONEncoder.default, so they render exactly as today;
+* dict keys that are not strings are converted the way ``json`` does.
+
+Whenever orjson cannot produce that output it hands over to the stdlib
+renderer, which then behaves (and fails) as before: indented output
+(``?format=json; indent=4``, the browsable API), integers beyond 64 bits,
+unpaired surrogates and circular data.  Two differences remain, neither of
+which our serializers produce: floats below 1e-4 or from 1e16 up are
+written without the ``+`` / leading zeros in the exponent (``1e-5`` rather
+than ``1e-05``), and NaN / infinity become ``null`` instead of an error.
+
+FastJSONParser reads request bodies with orjson and falls back to
+JSONParser on any error, so malformed JSON gets the same 400 message.
+
+JSON_BACKEND = "json" in settings (or orjson not being installed) turns
+both into the stdlib classes.  ``manage.py benchmark_json`` compares the
+two on the largest payloads.
+"""
+
+import io
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def fast_json_enabled() -> bool:
+    return orjson is not None and getattr(settings, "JSON_BACKEND", "orjson") == "orjson"
+
+
+if orjson is not None:
+    OPTIONS = (
+        orjson.OPT_NON_STR_KEYS
+        # Leave these to DRF's encoder: orjson formats them differently
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if (
+            not fast_json_enabled()
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same JavaScript-safe escaping as JSONRenderer
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if not fast_json_enabled() or encoding.lower().replace("_", "-") not in ("utf-8", "utf8"):
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            # Let the stdlib parser accept what it accepts and word the error
+            return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -50,6 +50,7 @@ INSTALLED_APPS = [
     'users',
     'frontend',
     'library',
+    'practice',
 ]
 
 MIDDLEWARE = [
@@ -152,9 +153,40 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # orjson with a stdlib fallback, same output (see rea/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'rea.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rea.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
 }
+# "orjson" (used when installed) or "json" for the standard library
+JSON_BACKEND = config('JSON_BACKEND', default='orjson')
+
+# Shared cache; also holds anonymous API responses keyed by curriculum version
+# (see library/response_cache.py). Set CACHE_BACKEND to
+# django.core.cache.backends.locmem.LocMemCache for a per-process cache.
+CACHES = {
+    "default": {
+        "BACKEND": config("CACHE_BACKEND", default="django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": config("CACHE_LOCATION", default=str(BASE_DIR / "cache")),
+        "OPTIONS": {"MAX_ENTRIES": config("CACHE_MAX_ENTRIES", cast=int, default=5000)},
+    }
+}
+RESPONSE_CACHE_TIMEOUT = config("RESPONSE_CACHE_TIMEOUT", cast=int, default=600)
+
+# Practice attempts are buffered per worker and written in bulk
+# (see practice/buffer.py). An interval of 0 writes synchronously; the limit
+# caps how many unwritten attempts are kept while the database is unavailable.
+PRACTICE_BUFFER_SIZE = config("PRACTICE_BUFFER_SIZE", cast=int, default=200)
+PRACTICE_FLUSH_INTERVAL = config("PRACTICE_FLUSH_INTERVAL", cast=float, default=2.0)
+PRACTICE_BUFFER_LIMIT = config("PRACTICE_BUFFER_LIMIT", cast=int, default=10_000)
 
 # Production Security Settings (only enabled when DEBUG=False)
 if not DEBUG:
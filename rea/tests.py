@@ -0,0 +1,63 @@
+import datetime
+import decimal
+import io
+import uuid
+from zoneinfo import ZoneInfo
+
+from django.test import SimpleTestCase, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from .renderers import FastJSONParser, FastJSONRenderer, orjson
+
+
+class FastJSONTests(SimpleTestCase):
+    """The orjson renderer and parser agree byte for byte with DRF's own."""
+
+    PAYLOADS = [
+        {"a": 1, "floats": [1.5, 0.1, 123.456, -0.0, 1e-4, 12345678901234.5], "s": "héllo \n\t\x01\"\\/  "},
+        {
+            "aware": datetime.datetime(2020, 1, 2, 3, 4, 5, 120, tzinfo=ZoneInfo("Europe/Amsterdam")),
+            "naive": datetime.datetime(2020, 1, 2, 3, 4, 5),
+            "date": datetime.date(2020, 1, 1),
+            "time": datetime.time(1, 2, 3, 4),
+            "duration": datetime.timedelta(seconds=90.5),
+            "decimal": decimal.Decimal("1.10"),
+            "uuid": uuid.UUID(int=1),
+            "lazy": gettext_lazy("Lesson"),
+        },
+        {1: "int key", None: 1, True: 2, 2.5: 3},
+        {"big": 2 ** 70, "tuple": (1, 2), "bytes": b"x"},
+        [],
+        "",
+    ]
+
+    def setUp(self):
+        if orjson is None:
+            self.skipTest("orjson is not installed")
+
+    def test_same_bytes_as_the_stdlib_renderer(self):
+        for payload in self.PAYLOADS:
+            self.assertEqual(FastJSONRenderer().render(payload), JSONRenderer().render(payload), payload)
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    def test_indented_output_falls_back(self):
+        self.assertEqual(
+            FastJSONRenderer().render({"a": 1}, "application/json; indent=2"),
+            JSONRenderer().render({"a": 1}, "application/json; indent=2"),
+        )
+
+    @override_settings(JSON_BACKEND="json")
+    def test_stdlib_backend_setting(self):
+        self.assertEqual(FastJSONRenderer().render(self.PAYLOADS[0]), JSONRenderer().render(self.PAYLOADS[0]))
+
+    def test_parser_matches_and_reports_the_same_errors(self):
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(b'{"a": [1, 2.5, "x"]}')), {"a": [1, 2.5, "x"]})
+        for body in (b'{"a": NaN}', b"{bad", b""):
+            with self.assertRaises(ParseError) as fast:
+                FastJSONParser().parse(io.BytesIO(body))
+            with self.assertRaises(ParseError) as std:
+                JSONParser().parse(io.BytesIO(body))
+            self.assertEqual(str(fast.exception), str(std.exception), body)
@@ -4,13 +4,18 @@ from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
 from users.views import UserViewSet, InstrumentViewSet, UserInstrumentViewSet
-from library.views import ExerciseViewSet
+from library.views import ExerciseViewSet, LessonViewSet, DictationRuleViewSet
+from practice.views import PracticeAttemptViewSet, ReviewItemViewSet
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet)
 router.register(r'instruments', InstrumentViewSet)
 router.register(r'user-instruments', UserInstrumentViewSet)
 router.register(r'exercises', ExerciseViewSet)
+router.register(r'lessons', LessonViewSet, basename='api-lesson')
+router.register(r'dictations', DictationRuleViewSet, basename='dictation')
+router.register(r'practice-attempts', PracticeAttemptViewSet, basename='practice-attempt')
+router.register(r'reviews', ReviewItemViewSet, basename='review')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
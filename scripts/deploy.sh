@@ -10,6 +10,7 @@ PRIMARY_DOMAIN="rea.vetgaaf.tech"                              # Primary domain
 WSGI_MODULE="rea.wsgi:application"                    # Django WSGI module (usually projectname.wsgi:application)
 
 SERVICE_NAME="gunicorn-${PROJECT_NAME}"
+ASGI_SERVICE_NAME="${PROJECT_NAME}-asgi"
 
 echo "================================"
 echo "${PROJECT_NAME} Django Deployment"
@@ -111,6 +112,18 @@ sudo systemctl daemon-reload
 sudo systemctl enable ${SERVICE_NAME}
 sudo systemctl restart ${SERVICE_NAME}
 
+# Setup ASGI (WebSocket) service
+echo "Setting up ASGI service..."
+sudo cp $PROJECT_DIR/rea-asgi.service /etc/systemd/system/${ASGI_SERVICE_NAME}.service
+sudo systemctl daemon-reload
+sudo systemctl enable ${ASGI_SERVICE_NAME}
+sudo systemctl restart ${ASGI_SERVICE_NAME}
+
+# Setup scheduled maintenance jobs
+echo "Installing cron jobs..."
+sudo cp $PROJECT_DIR/${PROJECT_NAME}.cron /etc/cron.d/${PROJECT_NAME}
+sudo chmod 644 /etc/cron.d/${PROJECT_NAME}
+
 # Setup Nginx
 echo "Setting up Nginx..."
 sudo cp $PROJECT_DIR/nginx.conf /etc/nginx/sites-available/${PROJECT_NAME}
@@ -186,7 +199,7 @@ echo ""
 echo "Useful commands:"
 echo "  View Gunicorn logs: sudo journalctl -u ${SERVICE_NAME} -f"
 echo "  View Nginx logs: sudo tail -f /var/log/nginx/error.log"
-echo "  Restart services: sudo systemctl restart ${SERVICE_NAME} nginx"
+echo "  Restart services: sudo systemctl restart ${SERVICE_NAME} ${ASGI_SERVICE_NAME} nginx"
 echo "  Update site: bash scripts/update.sh"
 echo ""
 echo "Don't forget to:"
@@ -7,6 +7,7 @@ PROJECT_DIR="/var/www/rea"                            # Project directory
 PRIMARY_DOMAIN="rea.vetgaaf.tech"                              # Primary domain
 
 SERVICE_NAME="gunicorn-${PROJECT_NAME}"
+ASGI_SERVICE_NAME="${PROJECT_NAME}-asgi"
 
 echo "================================"
 echo "${PROJECT_NAME} Update Script"
@@ -26,6 +27,12 @@ sudo -u www-data $PROJECT_DIR/venv/bin/pip install -r requirements.txt --upgrade
 echo "Running migrations..."
 sudo -u www-data $PROJECT_DIR/venv/bin/python manage.py migrate
 
+echo "Fingerprinting legacy exercise media..."
+sudo -u www-data $PROJECT_DIR/venv/bin/python manage.py prune_media --fingerprint
+
+echo "Making exercise thumbnails..."
+sudo -u www-data $PROJECT_DIR/venv/bin/python manage.py make_thumbnails
+
 echo "Compiling translations..."
 if [ -d "$PROJECT_DIR/locale" ]; then
     sudo -u www-data $PROJECT_DIR/venv/bin/python manage.py compilemessages || echo "No translations to compile"
@@ -34,8 +41,15 @@ fi
 echo "Collecting static files..."
 sudo -u www-data $PROJECT_DIR/venv/bin/python manage.py collectstatic --noinput
 
+echo "Updating cron jobs..."
+sudo cp $PROJECT_DIR/${PROJECT_NAME}.cron /etc/cron.d/${PROJECT_NAME}
+sudo chmod 644 /etc/cron.d/${PROJECT_NAME}
+
 echo "Restarting Gunicorn..."
-sudo systemctl restart ${SERVICE_NAME}
+sudo cp $PROJECT_DIR/rea-asgi.service /etc/systemd/system/${ASGI_SERVICE_NAME}.service
+sudo systemctl daemon-reload
+sudo systemctl enable ${ASGI_SERVICE_NAME}
+sudo systemctl restart ${SERVICE_NAME} ${ASGI_SERVICE_NAME}
 
 echo "Reloading Nginx..."
 sudo systemctl reload nginx
@@ -0,0 +1,98 @@
+"""
+Site-wide totals for the landing page.
+
+Counting instruments, teachers and students on every anonymous hit costs
+three aggregate queries.  Instead the totals live in SiteCounter rows that
+the handlers below adjust by ±1 whenever an Instrument is created or
+deleted, or a User is created, deleted or changes user_type; readers get
+all of them from one short-lived cache entry (one plain SELECT on a miss).
+
+Bulk writes (``bulk_create``, ``QuerySet.update`` / ``delete``) send no
+signals.  ``python manage.py recount_site_counters`` — run nightly from
+rea.cron — recomputes the rows from scratch and repairs any drift.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save
+
+from .models import Instrument, SiteCounter, User
+
+
+CACHE_KEY = 'site-counters'
+CACHE_TIMEOUT = 60
+
+USER_TYPE_COUNTERS = {
+    'teacher': SiteCounter.TEACHERS,
+    'student': SiteCounter.STUDENTS,
+}
+
+
+def get_counts() -> dict:
+    """``{'instruments': …, 'teachers': …, 'students': …}``, cached."""
+    counts = cache.get(CACHE_KEY)
+    if counts is None:
+        counts = {name: 0 for name in (SiteCounter.INSTRUMENTS, *USER_TYPE_COUNTERS.values())}
+        counts.update(SiteCounter.objects.values_list('name', 'value'))
+        cache.set(CACHE_KEY, counts, CACHE_TIMEOUT)
+    return counts
+
+
+def recount() -> dict:
+    """Recompute every counter from the tables."""
+    counts = {SiteCounter.INSTRUMENTS: Instrument.objects.count()}
+    for user_type, name in USER_TYPE_COUNTERS.items():
+        counts[name] = User.objects.filter(user_type=user_type).count()
+    for name, value in counts.items():
+        SiteCounter.objects.update_or_create(name=name, defaults={'value': value})
+    cache.delete(CACHE_KEY)
+    return counts
+
+
+def adjust(name, delta) -> None:
+    if name is None or not delta:
+        return
+    updated = SiteCounter.objects.filter(name=name).update(value=F('value') + delta)
+    if not updated:
+        SiteCounter.objects.get_or_create(name=name, defaults={'value': max(delta, 0)})
+    transaction.on_commit(lambda: cache.delete(CACHE_KEY))
+
+
+# ---------------------------------------------------------------------------
+# Signal handlers
+# ---------------------------------------------------------------------------
+
+def _instrument_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        adjust(SiteCounter.INSTRUMENTS, 1)
+
+
+def _instrument_deleted(sender, instance, **kwargs):
+    adjust(SiteCounter.INSTRUMENTS, -1)
+
+
+def _user_loaded(sender, instance, **kwargs):
+    # The type the counters currently account this user under
+    instance._counted_user_type = instance.user_type
+
+
+def _user_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'user_type' not in update_fields):
+        return
+    previous = None if created else instance._counted_user_type
+    if instance.user_type != previous:
+        adjust(USER_TYPE_COUNTERS.get(previous), -1)
+        adjust(USER_TYPE_COUNTERS.get(instance.user_type), 1)
+    instance._counted_user_type = instance.user_type
+
+
+def _user_deleted(sender, instance, **kwargs):
+    adjust(USER_TYPE_COUNTERS.get(instance._counted_user_type), -1)
+
+
+post_save.connect(_instrument_saved, sender=Instrument, dispatch_uid='counters-instrument-save')
+post_delete.connect(_instrument_deleted, sender=Instrument, dispatch_uid='counters-instrument-delete')
+post_init.connect(_user_loaded, sender=User, dispatch_uid='counters-user-init')
+post_save.connect(_user_saved, sender=User, dispatch_uid='counters-user-save')
+post_delete.connect(_user_deleted, sender=User, dispatch_uid='counters-user-delete')
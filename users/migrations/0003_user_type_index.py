@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-19 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_instrument_remove_user_bio_userinstrument_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["user_type", "username"], name="users_type_username_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2 on 2026-10-19 15:05
+
+from django.db import migrations, models
+
+
+def seed_counters(apps, schema_editor):
+    Instrument = apps.get_model("users", "Instrument")
+    SiteCounter = apps.get_model("users", "SiteCounter")
+    User = apps.get_model("users", "User")
+    SiteCounter.objects.bulk_create(
+        [
+            SiteCounter(name="instruments", value=Instrument.objects.count()),
+            SiteCounter(
+                name="teachers", value=User.objects.filter(user_type="teacher").count()
+            ),
+            SiteCounter(
+                name="students", value=User.objects.filter(user_type="student").count()
+            ),
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_user_type_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SiteCounter",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=30, primary_key=True, serialize=False),
+                ),
+                ("value", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -61,4 +61,21 @@ class User(AbstractUser):
     
     class Meta:
         db_table = 'users'
-        swappable = 'AUTH_USER_MODEL'
\ No newline at end of file
+        swappable = 'AUTH_USER_MODEL'
+        # Teacher / student rosters are filtered by type and listed by username
+        indexes = [models.Index(fields=['user_type', 'username'], name='users_type_username_idx')]
+
+class SiteCounter(models.Model):
+    """
+    Denormalised site-wide total shown on the landing page.
+    Kept current by the signal handlers in users/counters.py.
+    """
+    INSTRUMENTS = 'instruments'
+    TEACHERS = 'teachers'
+    STUDENTS = 'students'
+
+    name = models.CharField(max_length=30, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
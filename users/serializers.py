@@ -1,9 +1,11 @@
 # users/serializers.py
 from rest_framework import serializers
+from rea.fastlist import ValuesListMixin
+from rea.fieldsets import SparseFieldsetMixin
 from .models import User, Instrument, UserInstrument
 
 
-class InstrumentSerializer(serializers.ModelSerializer):
+class InstrumentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for the Instrument model.
     """
@@ -12,24 +14,20 @@ class InstrumentSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'family', 'description')
 
 
-class UserInstrumentSerializer(serializers.ModelSerializer):
+class UserInstrumentSerializer(ValuesListMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for the UserInstrument relationship.
     """
     instrument_details = InstrumentSerializer(source='instrument', read_only=True)
+    instrument_name = serializers.CharField(source='instrument.name', read_only=True)
     
     class Meta:
         model = UserInstrument
         fields = ('id', 'instrument', 'instrument_details', 'proficiency', 
-                  'years_of_experience', 'notes')
-        
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        representation['instrument_name'] = instance.instrument.name
-        return representation
+                  'years_of_experience', 'notes', 'instrument_name')
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for the User model with all fields.
     """
@@ -61,7 +59,7 @@ class UserCreateSerializer(serializers.ModelSerializer):
         return user
 
 
-class TeacherSerializer(serializers.ModelSerializer):
+class TeacherSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer specifically for teacher users.
     """
@@ -73,7 +71,7 @@ class TeacherSerializer(serializers.ModelSerializer):
                   'date_joined', 'user_instruments')
 
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer specifically for student users.
     """
@@ -1,3 +1,220 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rea.fastlist import ValuesListMixin
+
+from . import counters
+from .models import Instrument, SiteCounter, User, UserInstrument
+
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Session, user, page count, the page, and the prefetched user_instruments
+# with their instruments
+ROSTER_QUERY_BUDGET = 6
+
+
+class RosterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher', password='pw', user_type='teacher')
+        cls.piano = Instrument.objects.create(name='Piano', family='Keyboard')
+        cls.violin = Instrument.objects.create(name='Violin', family='String')
+        cls.students = {}
+        for name, instruments in (
+            ('anna', [(cls.piano, 'advanced')]),
+            ('ben', [(cls.piano, 'beginner'), (cls.violin, 'advanced')]),
+            ('cleo', [(cls.violin, 'intermediate')]),
+            ('dan', []),
+        ):
+            cls.add_student(name, instruments)
+
+    @classmethod
+    def add_student(cls, name, instruments):
+        student = User.objects.create_user(name, password='pw', user_type='student')
+        for instrument, proficiency in instruments:
+            UserInstrument.objects.create(user=student, instrument=instrument, proficiency=proficiency)
+        cls.students[name] = student
+        return student
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def usernames(self, url='/api/users/students/', **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return [row['username'] for row in response.json()['results']]
+
+    def test_rosters_are_split_by_user_type(self):
+        self.assertEqual(self.usernames(), ['anna', 'ben', 'cleo', 'dan'])
+        self.assertEqual(self.usernames('/api/users/teachers/'), ['teacher'])
+
+    def test_instrument_by_id_or_name(self):
+        self.assertEqual(self.usernames(instrument=self.violin.pk), ['ben', 'cleo'])
+        self.assertEqual(self.usernames(instrument='piano'), ['anna', 'ben'])
+        self.assertEqual(self.usernames(instrument='Cello'), [])
+
+    def test_proficiency_applies_to_the_same_instrument(self):
+        self.assertEqual(self.usernames(proficiency='advanced'), ['anna', 'ben'])
+        self.assertEqual(self.usernames(instrument='Piano', proficiency='advanced'), ['anna'])
+        self.assertEqual(self.usernames(instrument='Violin', proficiency='beginner'), [])
+
+    def test_unknown_proficiency_is_rejected(self):
+        response = self.client.get('/api/users/students/', {'proficiency': 'virtuoso'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('proficiency', response.json())
+
+    def test_search_and_ordering(self):
+        self.assertEqual(self.usernames(search='an'), ['anna', 'dan'])
+        self.assertEqual(self.usernames(ordering='-username'), ['dan', 'cleo', 'ben', 'anna'])
+
+    def test_instruments_are_listed(self):
+        response = self.client.get('/api/users/students/', {'search': 'ben'})
+        [ben] = response.json()['results']
+        self.assertEqual(
+            sorted((row['instrument'], row['proficiency']) for row in ben['user_instruments']),
+            [(self.piano.pk, 'beginner'), (self.violin.pk, 'advanced')],
+        )
+
+    def test_queries_do_not_grow_with_the_page(self):
+        def count(**params):
+            with CaptureQueriesContext(connection) as queries:
+                self.usernames(**params)
+            return len(queries)
+
+        small = count(instrument='Piano', proficiency='advanced')
+        for i in range(8):
+            self.add_student(f'extra{i}', [(self.piano, 'advanced'), (self.violin, 'expert')])
+        large = count(instrument='Piano', proficiency='advanced')
+        self.assertEqual(large, small)
+        self.assertLessEqual(large, ROSTER_QUERY_BUDGET)
+
+
+class FastListTests(TestCase):
+    """The ``.values()`` list paths render exactly what the serializers would."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='pw', user_type='teacher', is_staff=True)
+        cls.student = User.objects.create_user('student', password='pw', user_type='student')
+        piano = Instrument.objects.create(name='Piano', family='Keyboard', description='Grand')
+        violin = Instrument.objects.create(name='Violin', family='String')
+        UserInstrument.objects.create(user=cls.student, instrument=piano, proficiency='advanced', years_of_experience=7)
+        UserInstrument.objects.create(user=cls.student, instrument=violin, notes='Since last year')
+        UserInstrument.objects.create(user=cls.admin, instrument=piano)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def assertSameRendering(self, url, **params):
+        with mock.patch.object(
+            ValuesListMixin, 'render_values', autospec=True, side_effect=ValuesListMixin.render_values,
+        ) as render_values:
+            fast = self.client.get(url, params)
+        self.assertTrue(render_values.called)
+        with mock.patch.object(ValuesListMixin, 'values_plan', return_value=None):
+            slow = self.client.get(url, params)
+        self.assertEqual((fast.status_code, slow.status_code), (200, 200))
+        self.assertEqual(fast.json(), slow.json(), params)
+        return fast.json()
+
+    def test_user_instrument_list(self):
+        for params in ({}, {'user': self.student.pk}, {'fields': 'id,instrument_name,instrument_details'}):
+            self.assertSameRendering('/api/user-instruments/', **params)
+
+    def test_instruments_of_a_user(self):
+        data = self.assertSameRendering(f'/api/users/{self.student.pk}/instruments/')
+        self.assertEqual(
+            sorted((row['instrument_name'], row['instrument_details']['family']) for row in data),
+            [('Piano', 'Keyboard'), ('Violin', 'String')],
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class SiteCounterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def counts(self):
+        """The counter rows as stored (the cache is checked separately)."""
+        stored = dict.fromkeys((SiteCounter.INSTRUMENTS, SiteCounter.TEACHERS, SiteCounter.STUDENTS), 0)
+        stored.update(SiteCounter.objects.values_list('name', 'value'))
+        return stored
+
+    def assertCounts(self, instruments, teachers, students):
+        expected = {
+            SiteCounter.INSTRUMENTS: instruments,
+            SiteCounter.TEACHERS: teachers,
+            SiteCounter.STUDENTS: students,
+        }
+        self.assertEqual(self.counts(), expected)
+        self.assertEqual(counters.recount(), expected)  # the rows match the tables
+
+    def test_instrument_create_and_delete(self):
+        piano = Instrument.objects.create(name='Piano')
+        Instrument.objects.create(name='Violin')
+        self.assertCounts(2, 0, 0)
+        piano.name = 'Grand piano'
+        piano.save()
+        self.assertCounts(2, 0, 0)
+        piano.delete()
+        self.assertCounts(1, 0, 0)
+
+    def test_user_create_and_delete(self):
+        teacher = User.objects.create_user('teacher', password='pw', user_type='teacher')
+        User.objects.create_user('student', password='pw', user_type='student')
+        User.objects.create_superuser('root', password='pw')  # no user_type: not counted
+        self.assertCounts(0, 1, 1)
+        User.objects.get(pk=teacher.pk).delete()
+        self.assertCounts(0, 0, 1)
+
+    def test_user_type_change(self):
+        user = User.objects.create_user('anna', password='pw', user_type='student')
+        user.user_type = 'teacher'
+        user.save()
+        self.assertCounts(0, 1, 0)
+
+        # A freshly loaded instance starts from the stored type
+        user = User.objects.get(pk=user.pk)
+        user.user_type = 'student'
+        user.save(update_fields=['user_type'])
+        self.assertCounts(0, 0, 1)
+
+    def test_update_fields_without_user_type(self):
+        user = User.objects.create_user('anna', password='pw', user_type='student')
+        user.user_type = 'teacher'
+        user.first_name = 'Anna'
+        user.save(update_fields=['first_name'])
+        # The stored type did not change, so neither do the counters
+        self.assertEqual(User.objects.get(pk=user.pk).user_type, 'student')
+        self.assertCounts(0, 0, 1)
+
+        # The pending change is counted once it is actually written
+        user.save()
+        self.assertCounts(0, 1, 0)
+
+    def test_cached_counts_refresh_after_commit(self):
+        self.assertEqual(counters.get_counts()[SiteCounter.STUDENTS], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user('anna', password='pw', user_type='student')
+        self.assertEqual(counters.get_counts()[SiteCounter.STUDENTS], 1)
+
+    def test_recount_repairs_bulk_write_drift(self):
+        Instrument.objects.bulk_create([Instrument(name='Piano'), Instrument(name='Violin')])
+        User.objects.create_user('anna', password='pw', user_type='student')
+        User.objects.filter(username='anna').update(user_type='teacher')
+        self.assertEqual(self.counts(), {'instruments': 0, 'teachers': 0, 'students': 1})
+
+        out = StringIO()
+        call_command('recount_site_counters', stdout=out)
+        self.assertEqual(self.counts(), {'instruments': 2, 'teachers': 1, 'students': 0})
+        self.assertEqual(counters.get_counts(), self.counts())
+        self.assertIn('Corrected: 3', out.getvalue())
@@ -1,8 +1,13 @@
 # users/views.py
 from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from django.db.models import Exists, OuterRef
 from django.shortcuts import get_object_or_404
+from rea.batch import BatchLookupMixin
+from rea.fastlist import ValuesListViewMixin
+from rea.fieldsets import SparseFieldsetViewMixin
 from .models import User, Instrument, UserInstrument
 from .serializers import (
     UserSerializer, UserCreateSerializer, 
@@ -12,9 +17,10 @@ from .serializers import (
 from .permissions import IsUserOrAdmin, IsTeacherOrAdmin
 
 
-class InstrumentViewSet(viewsets.ModelViewSet):
+class InstrumentViewSet(BatchLookupMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing instruments.
+    GET ?ids=1,2,3 fetches several at once (see rea/batch.py).
     """
     queryset = Instrument.objects.all()
     serializer_class = InstrumentSerializer
@@ -34,7 +40,7 @@ class InstrumentViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
 
 
-class UserInstrumentViewSet(viewsets.ModelViewSet):
+class UserInstrumentViewSet(ValuesListViewMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing user-instrument relationships.
     """
@@ -45,7 +51,8 @@ class UserInstrumentViewSet(viewsets.ModelViewSet):
         """
         Filter queryset based on user permissions.
         """
-        queryset = UserInstrument.objects.all()
+        # A stable order, so pages agree whichever list path renders them
+        queryset = self.with_related(UserInstrument.objects.order_by('id'))
         
         # Filter by user ID if provided in query params
         user_id = self.request.query_params.get('user', None)
@@ -74,9 +81,10 @@ class UserInstrumentViewSet(viewsets.ModelViewSet):
             serializer.save(user_id=user_id)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(BatchLookupMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing users.
+    GET ?ids=1,2,3 fetches several at once (see rea/batch.py).
     """
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -98,6 +106,9 @@ class UserViewSet(viewsets.ModelViewSet):
             permission_classes = [permissions.IsAuthenticated]
         return [permission() for permission in permission_classes]
     
+    def get_queryset(self):
+        return self.with_related(User.objects.all())
+    
     def get_serializer_class(self):
         if self.action == 'create':
             return UserCreateSerializer
@@ -131,30 +142,61 @@ class UserViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    def _roster(self, request, user_type, serializer_class):
+        """
+        Paginated teachers or students, most filters applied in SQL:
+            ?instrument=<id or name>   – plays this instrument
+            ?proficiency=<level>       – at this level (on that instrument, if given)
+            ?search= / ?ordering=      – as on the user list
+        Instruments are prefetched, so a page costs a fixed number of queries.
+        """
+        queryset = User.objects.filter(user_type=user_type).order_by('username', 'id')
+
+        conditions = {}
+        instrument = request.query_params.get('instrument')
+        if instrument:
+            if instrument.isdigit():
+                conditions['instrument_id'] = int(instrument)
+            else:
+                conditions['instrument__name__iexact'] = instrument
+        proficiency = request.query_params.get('proficiency')
+        if proficiency:
+            if proficiency not in dict(UserInstrument.PROFICIENCY_CHOICES):
+                raise ValidationError({'proficiency': [f'Unknown proficiency "{proficiency}".']})
+            conditions['proficiency'] = proficiency
+        if conditions:
+            # Both conditions must hold for the same instrument
+            queryset = queryset.filter(
+                Exists(UserInstrument.objects.filter(user=OuterRef('pk'), **conditions))
+            )
+
+        queryset = self.with_related(self.filter_queryset(queryset), serializer_class)
+        context = self.get_serializer_context()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer_class(page, many=True, context=context).data)
+        return Response(serializer_class(queryset, many=True, context=context).data)
+    
     @action(detail=False, methods=['get'])
     def teachers(self, request):
         """
-        Return a list of all teachers.
+        Return a page of teachers (see _roster for filters).
         """
-        teachers = User.objects.filter(user_type='teacher')
-        serializer = TeacherSerializer(teachers, many=True)
-        return Response(serializer.data)
+        return self._roster(request, 'teacher', TeacherSerializer)
     
     @action(detail=False, methods=['get'])
     def students(self, request):
         """
-        Return a list of all students.
+        Return a page of students (see _roster for filters).
         """
-        students = User.objects.filter(user_type='student')
-        serializer = StudentSerializer(students, many=True)
-        return Response(serializer.data)
+        return self._roster(request, 'student', StudentSerializer)
     
     @action(detail=False, methods=['get'])
     def me(self, request):
         """
         Return the authenticated user's details.
         """
-        serializer = UserSerializer(request.user)
+        serializer = UserSerializer(request.user, context=self.get_serializer_context())
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
@@ -163,6 +205,10 @@ class UserViewSet(viewsets.ModelViewSet):
         List all instruments for a given user.
         """
         user = self.get_object()
-        instruments = UserInstrument.objects.filter(user=user)
-        serializer = UserInstrumentSerializer(instruments, many=True)
-        return Response(serializer.data)
+        instruments = UserInstrument.objects.filter(user=user).order_by('id')
+        context = self.get_serializer_context()
+        data = UserInstrumentSerializer(context=context).render_queryset(instruments)
+        if data is None:
+            instruments = self.with_related(instruments, UserInstrumentSerializer)
+            data = UserInstrumentSerializer(instruments, many=True, context=context).data
+        return Response(data)